@@ -0,0 +1,722 @@
+#!/usr/bin/env python3
+"""
+Header-Only Audio Reader
+Reads tags, duration, bitrate and stream parameters from MP3, FLAC, Ogg Vorbis/Opus,
+M4A and WAV files by parsing their container headers, without decoding any audio
+"""
+
+import io
+import os
+import struct
+from datetime import datetime
+from typing import BinaryIO, Dict, Optional, Tuple
+
+# Enough to cover the ID3v2 frames we want and the first MPEG frames in one read
+HEAD_BYTES = 64 * 1024
+
+# Ogg pages are at most ~64 KB, so the last granule position is always in the tail
+OGG_TAIL_BYTES = 64 * 1024
+
+# Upper bound on a comment packet we are willing to assemble (cover art lives there too)
+MAX_COMMENT_BYTES = 256 * 1024
+
+# ID3v2 frame ids (2.2 and 2.3/2.4) for the tags we report
+ID3_FRAMES = {
+    'TT2': 'title', 'TIT2': 'title',
+    'TP1': 'artist', 'TPE1': 'artist',
+    'TAL': 'album', 'TALB': 'album',
+    'TYE': 'year', 'TYER': 'year', 'TDRC': 'date',
+    'TDA': 'daymonth', 'TDAT': 'daymonth',
+    'TCO': 'genre', 'TCON': 'genre',
+    'TRK': 'track', 'TRCK': 'track',
+    'TLE': 'length', 'TLEN': 'length',
+}
+
+# Vorbis comment (FLAC, Ogg) and RIFF INFO field names
+VORBIS_FIELDS = {
+    'TITLE': 'title', 'ARTIST': 'artist', 'ALBUM': 'album',
+    'DATE': 'date', 'GENRE': 'genre', 'TRACKNUMBER': 'track',
+}
+RIFF_INFO_FIELDS = {
+    b'INAM': 'title', b'IART': 'artist', b'IPRD': 'album',
+    b'ICRD': 'date', b'IGNR': 'genre', b'ITRK': 'track',
+}
+
+# iTunes-style ilst atoms
+MP4_FIELDS = {
+    b'\xa9nam': 'title', b'\xa9ART': 'artist', b'\xa9alb': 'album',
+    b'\xa9day': 'date', b'\xa9gen': 'genre',
+}
+
+# The original ID3v1 genre list; numeric TCON values like "(17)" refer to it
+ID3V1_GENRES = (
+    'Blues', 'Classic Rock', 'Country', 'Dance', 'Disco', 'Funk', 'Grunge', 'Hip-Hop',
+    'Jazz', 'Metal', 'New Age', 'Oldies', 'Other', 'Pop', 'R&B', 'Rap', 'Reggae', 'Rock',
+    'Techno', 'Industrial', 'Alternative', 'Ska', 'Death Metal', 'Pranks', 'Soundtrack',
+    'Euro-Techno', 'Ambient', 'Trip-Hop', 'Vocal', 'Jazz+Funk', 'Fusion', 'Trance',
+    'Classical', 'Instrumental', 'Acid', 'House', 'Game', 'Sound Clip', 'Gospel', 'Noise',
+    'Alternative Rock', 'Bass', 'Soul', 'Punk', 'Space', 'Meditative', 'Instrumental Pop',
+    'Instrumental Rock', 'Ethnic', 'Gothic', 'Darkwave', 'Techno-Industrial', 'Electronic',
+    'Pop-Folk', 'Eurodance', 'Dream', 'Southern Rock', 'Comedy', 'Cult', 'Gangsta',
+    'Top 40', 'Christian Rap', 'Pop/Funk', 'Jungle', 'Native American', 'Cabaret',
+    'New Wave', 'Psychedelic', 'Rave', 'Showtunes', 'Trailer', 'Lo-Fi', 'Tribal',
+    'Acid Punk', 'Acid Jazz', 'Polka', 'Retro', 'Musical', 'Rock & Roll', 'Hard Rock',
+)
+
+# MPEG audio header tables, indexed by version bits (3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5)
+MPEG_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+MPEG_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+
+# Frames sampled to decide whether a file without a Xing/VBRI header is CBR
+CBR_PROBE_FRAMES = 8
+
+
+def _syncsafe(data: bytes) -> int:
+    return (data[0] << 21) | (data[1] << 14) | (data[2] << 7) | data[3]
+
+
+def _decode_text(data: bytes) -> str:
+    """ID3 text frame payload: an encoding byte, then one or more null-separated strings"""
+    if not data:
+        return ''
+    encoding, body = data[0], data[1:]
+    if encoding == 1:
+        text = body.decode('utf-16', 'replace')
+    elif encoding == 2:
+        text = body.decode('utf-16-be', 'replace')
+    elif encoding == 3:
+        text = body.decode('utf-8', 'replace')
+    else:
+        text = body.decode('latin-1')
+    return text.split('\0', 1)[0].strip()
+
+
+def _genre_name(value: str) -> str:
+    """'(17)', '17' or '(17)Rock' -> 'Rock'; free-text genres pass through"""
+    if value.startswith('(') and ')' in value:
+        number, rest = value[1:].split(')', 1)
+        if rest:
+            return rest
+        value = number
+    if value.isdigit() and int(value) < len(ID3V1_GENRES):
+        return ID3V1_GENRES[int(value)]
+    return value
+
+
+def _read_id3v2(f: BinaryIO, head: bytes) -> Tuple[Dict, int]:
+    """Wanted text frames from a leading ID3v2 tag, and the offset where audio starts.
+
+    Frames are walked header by header so attached pictures are skipped with a
+    seek rather than read.
+    """
+    version, flags = head[3], head[5]
+    tag_end = 10 + _syncsafe(head[6:10]) + (10 if flags & 0x10 else 0)
+    if version not in (2, 3, 4):
+        return {}, tag_end
+
+    if flags & 0x80 and version < 4:    # Whole-tag unsynchronisation: undo it in memory
+        f.seek(10)
+        stream = io.BytesIO(f.read(tag_end - 10).replace(b'\xff\x00', b'\xff'))
+        end = len(stream.getvalue())
+    else:
+        stream = f
+        stream.seek(10)
+        end = tag_end
+
+    if flags & 0x40 and version == 3:   # Extended header; its size excludes itself in 2.3...
+        stream.seek(struct.unpack('>I', stream.read(4))[0], 1)
+    elif flags & 0x40 and version == 4: # ...and includes itself in 2.4
+        stream.seek(_syncsafe(stream.read(4)) - 4, 1)
+
+    id_size, header_size = (3, 6) if version == 2 else (4, 10)
+    frames = {}
+    position = stream.tell()
+    while position + header_size <= end:
+        header = stream.read(header_size)
+        frame_id = header[:id_size]
+        if not frame_id.strip(b'\0') or len(header) < header_size:
+            break                       # Padding
+        if version == 2:
+            size = int.from_bytes(header[3:6], 'big')
+        elif version == 4:
+            size = _syncsafe(header[4:8])
+        else:
+            size = struct.unpack('>I', header[4:8])[0]
+        position += header_size + size
+        name = ID3_FRAMES.get(frame_id.decode('latin-1'))
+        if name is None:
+            stream.seek(position)
+            continue
+        data = stream.read(size)
+        if version == 4:
+            frame_flags = header[9]
+            if frame_flags & 0x02:
+                data = data.replace(b'\xff\x00', b'\xff')
+            if frame_flags & 0x01:      # Data length indicator
+                data = data[4:]
+        frames[name] = _decode_text(data)
+
+    tags = {key: value for key, value in frames.items()
+            if key in ('title', 'artist', 'album', 'genre', 'track') and value}
+    if 'genre' in tags:
+        tags['genre'] = _genre_name(tags['genre'])
+    date = frames.get('date') or frames.get('year')
+    if date and frames.get('daymonth', '').isdigit() and len(frames['daymonth']) == 4 and len(date) == 4:
+        day_month = frames['daymonth']
+        date = f"{date}-{day_month[2:]}-{day_month[:2]}"
+    if date:
+        tags['date'] = date
+    if frames.get('length', '').isdigit():
+        tags['length'] = int(frames['length']) / 1000
+    return tags, tag_end
+
+
+def _read_id3v1(tail: bytes) -> Dict:
+    """Fixed-width ID3v1(.1) tag from the last 128 bytes"""
+    def field(raw):
+        return raw.split(b'\0', 1)[0].decode('latin-1').strip()
+
+    tags = {
+        'title': field(tail[3:33]),
+        'artist': field(tail[33:63]),
+        'album': field(tail[63:93]),
+        'date': field(tail[93:97]),
+    }
+    if tail[125] == 0 and tail[126]:
+        tags['track'] = str(tail[126])
+    if tail[127] < len(ID3V1_GENRES):
+        tags['genre'] = ID3V1_GENRES[tail[127]]
+    return {key: value for key, value in tags.items() if value}
+
+
+def _mpeg_header(data: bytes, offset: int = 0) -> Optional[Dict]:
+    """Decode a 4-byte MPEG audio frame header; None if it is not one"""
+    if offset + 4 > len(data):
+        return None
+    b1, b2, b3 = data[offset + 1], data[offset + 2], data[offset + 3]
+    if data[offset] != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version, layer = (b1 >> 3) & 3, 4 - ((b1 >> 1) & 3)
+    bitrate_index, rate_index = b2 >> 4, (b2 >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = MPEG_BITRATES[(1 if version == 3 else 2, layer)][bitrate_index] * 1000
+    sample_rate = MPEG_SAMPLE_RATES[version][rate_index]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 576 if layer == 3 and version != 3 else 1152
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {
+        'version': version, 'layer': layer, 'bitrate': bitrate, 'sample_rate': sample_rate,
+        'channels': 1 if b3 >> 6 == 3 else 2, 'samples': samples, 'length': length,
+    }
+
+
+def _find_first_frame(data: bytes, start: int) -> Tuple[int, Optional[Dict]]:
+    """First frame header followed by a consistent second one (guards against false syncs)"""
+    offset = data.find(b'\xff', start)
+    while offset != -1:
+        header = _mpeg_header(data, offset)
+        if header:
+            following = _mpeg_header(data, offset + header['length'])
+            if offset + header['length'] + 4 > len(data) or (
+                    following and following['version'] == header['version']
+                    and following['sample_rate'] == header['sample_rate']):
+                return offset, header
+        offset = data.find(b'\xff', offset + 1)
+    return -1, None
+
+
+def _audio_end(f: BinaryIO, file_size: int) -> int:
+    """Where MPEG frames end: before a trailing ID3v1 and/or APEv2 tag"""
+    end = file_size
+    if file_size >= 128:
+        f.seek(file_size - 128)
+        if f.read(3) == b'TAG':
+            end -= 128
+    if end >= 32:
+        f.seek(end - 32)
+        footer = f.read(32)
+        if footer[:8] == b'APETAGEX':
+            size, flags = struct.unpack('<I', footer[12:16])[0], struct.unpack('<I', footer[20:24])[0]
+            end -= size + (32 if flags & 0x80000000 else 0)
+    return end
+
+
+def _read_mp3(f: BinaryIO, head: bytes, file_size: int) -> Optional[Dict]:
+    tags, base = {}, 0
+    if head[:3] == b'ID3':
+        tags, base = _read_id3v2(f, head)
+        f.seek(base)                    # Re-read from the end of the tag; it may hold large pictures
+        head = f.read(HEAD_BYTES)
+
+    offset, header = _find_first_frame(head, 0)
+    if header is None:
+        return None
+    first_frame = base + offset
+    audio_end = _audio_end(f, file_size)
+    if file_size >= 128:
+        f.seek(file_size - 128)
+        tail = f.read(128)
+        if tail[:3] == b'TAG':
+            for key, value in _read_id3v1(tail).items():
+                tags.setdefault(key, value)
+    tag_length = tags.pop('length', None)
+
+    sample_rate, samples = header['sample_rate'], header['samples']
+    duration = bitrate = None
+
+    # Xing/Info (LAME, most VBR encoders) sits after the side information of frame one
+    side_info = (32 if header['channels'] == 2 else 17) if header['version'] == 3 else \
+                (17 if header['channels'] == 2 else 9)
+    xing = offset + 4 + side_info
+    if head[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', head[xing + 4:xing + 8])[0]
+        position = xing + 8
+        frames = total_bytes = None
+        if flags & 1:
+            frames = struct.unpack('>I', head[position:position + 4])[0]
+            position += 4
+        if flags & 2:
+            total_bytes = struct.unpack('>I', head[position:position + 4])[0]
+            position += 4
+        if flags & 4:
+            position += 100             # Seek table
+        if flags & 8:
+            position += 4               # Quality
+        if frames:
+            total_samples = frames * samples
+            if head[position:position + 4] == b'LAME':  # Gapless info: encoder delay and padding
+                delay_padding = int.from_bytes(head[position + 21:position + 24], 'big')
+                total_samples -= (delay_padding >> 12) + (delay_padding & 0xFFF)
+            duration = max(total_samples, 0) / sample_rate
+            if total_bytes and duration:
+                bitrate = int(total_bytes * 8 / duration)
+
+    # VBRI (Fraunhofer) always sits 32 bytes after the header
+    elif head[offset + 36:offset + 40] == b'VBRI':
+        total_bytes, frames = struct.unpack('>II', head[offset + 46:offset + 54])
+        if frames:
+            duration = frames * samples / sample_rate
+            bitrate = int(total_bytes * 8 / duration)
+
+    if duration is None:
+        # Sample a few frames; if they agree it is CBR and the size gives the duration
+        position, bitrates = offset, set()
+        for _ in range(CBR_PROBE_FRAMES):
+            frame = _mpeg_header(head, position)
+            if frame is None:
+                break
+            bitrates.add(frame['bitrate'])
+            position += frame['length']
+        if len(bitrates) == 1:
+            bitrate = header['bitrate']
+            duration = (audio_end - first_frame) * 8 / bitrate
+        else:
+            duration, bitrate = _scan_frames(f, first_frame, audio_end)
+
+    info = {
+        'format': 'mp3',
+        'duration': duration or tag_length or 0.0,
+        'bitrate': bitrate or header['bitrate'],
+        'sample_rate': sample_rate,
+        'channels': header['channels'],
+    }
+    info.update(tags)
+    return info
+
+
+def _scan_frames(f: BinaryIO, position: int, end: int) -> Tuple[float, int]:
+    """Headerless VBR: walk every frame header, reading four bytes per frame"""
+    seconds, total_bytes = 0.0, 0
+    while position + 4 <= end:
+        f.seek(position)
+        frame = _mpeg_header(f.read(4))
+        if frame is None:
+            break
+        seconds += frame['samples'] / frame['sample_rate']
+        total_bytes += frame['length']
+        position += frame['length']
+    return seconds, int(total_bytes * 8 / seconds) if seconds else 0
+
+
+def _vorbis_comments(data: bytes, tags: Dict):
+    """Vorbis comment block (FLAC, Ogg): vendor string, then KEY=value pairs"""
+    vendor_length = struct.unpack_from('<I', data, 0)[0]
+    position = 4 + vendor_length
+    count = struct.unpack_from('<I', data, position)[0]
+    position += 4
+    for _ in range(count):
+        if position + 4 > len(data):
+            break                       # Truncated (oversized packet)
+        length = struct.unpack_from('<I', data, position)[0]
+        comment = data[position + 4:position + 4 + length].decode('utf-8', 'replace')
+        position += 4 + length
+        key, _, value = comment.partition('=')
+        name = VORBIS_FIELDS.get(key.upper())
+        if name and value.strip() and name not in tags:
+            tags[name] = value.strip()
+
+
+def _read_flac(f: BinaryIO, start: int, file_size: int) -> Optional[Dict]:
+    """STREAMINFO and VORBIS_COMMENT metadata blocks; pictures are skipped"""
+    info, tags = None, {}
+    position = start + 4
+    while True:
+        f.seek(position)
+        header = f.read(4)
+        if len(header) < 4:
+            return None
+        kind, length = header[0] & 0x7F, int.from_bytes(header[1:4], 'big')
+        if kind == 0:
+            block = f.read(length)
+            packed = int.from_bytes(block[10:18], 'big')
+            sample_rate = packed >> 44
+            channels = ((packed >> 41) & 0x7) + 1
+            total_samples = packed & 0xFFFFFFFFF
+            info = {
+                'format': 'flac',
+                'duration': total_samples / sample_rate if sample_rate else 0.0,
+                'sample_rate': sample_rate,
+                'channels': channels,
+            }
+        elif kind == 4:
+            _vorbis_comments(f.read(length), tags)
+        position += 4 + length
+        if header[0] & 0x80:            # Last metadata block
+            break
+    if info is None:
+        return None
+    audio_bytes = file_size - position
+    info['bitrate'] = int(audio_bytes * 8 / info['duration']) if info['duration'] else 0
+    info.update(tags)
+    return info
+
+
+def _ogg_pages(f: BinaryIO, position: int):
+    """Yield (header, body) for consecutive Ogg pages starting at position"""
+    while True:
+        f.seek(position)
+        header = f.read(27)
+        if len(header) < 27 or header[:4] != b'OggS':
+            return
+        segments = f.read(header[26])
+        body = f.read(sum(segments))
+        yield header, segments, body
+        position += 27 + len(segments) + len(body)
+
+
+def _ogg_packets(f: BinaryIO, limit: int):
+    """Yield the first few logical packets, assembling those that span pages"""
+    packet = b''
+    for _, segments, body in _ogg_pages(f, 0):
+        position = 0
+        for lacing in segments:
+            packet += body[position:position + lacing]
+            position += lacing
+            if lacing < 255:
+                yield packet
+                packet = b''
+        if len(packet) > limit:         # Oversized comment packet: parse what we have
+            yield packet
+            return
+
+
+def _last_granule(f: BinaryIO, serial: bytes, file_size: int) -> int:
+    """Granule position of the last page in the stream, searching back from the end"""
+    end = file_size
+    while end > 0:
+        start = max(0, end - OGG_TAIL_BYTES)
+        f.seek(start)
+        chunk = f.read(end - start + 27)
+        index = chunk.rfind(b'OggS', 0, end - start)
+        while index != -1:
+            header = chunk[index:index + 27]
+            granule = struct.unpack_from('<q', header, 6)[0] if len(header) == 27 else -1
+            if header[4] == 0 and header[14:18] == serial and granule >= 0:
+                return granule
+            index = chunk.rfind(b'OggS', 0, index)
+        end = start
+    return 0
+
+
+def _read_ogg(f: BinaryIO, file_size: int) -> Optional[Dict]:
+    f.seek(0)
+    serial = f.read(18)[14:18]
+    packets = _ogg_packets(f, MAX_COMMENT_BYTES)
+    identification = next(packets, b'')
+    tags = {}
+    if identification.startswith(b'\x01vorbis'):
+        channels, sample_rate, nominal = struct.unpack_from('<BIxxxxi', identification, 11)
+        comment = next(packets, b'')
+        if comment.startswith(b'\x03vorbis'):
+            _vorbis_comments(comment[7:], tags)
+        samples, pre_skip, kind = _last_granule(f, serial, file_size), 0, 'ogg'
+    elif identification.startswith(b'OpusHead'):
+        channels, pre_skip = struct.unpack_from('<BH', identification, 9)
+        sample_rate, nominal = 48000, 0     # Opus granules always count 48 kHz samples
+        comment = next(packets, b'')
+        if comment.startswith(b'OpusTags'):
+            _vorbis_comments(comment[8:], tags)
+        samples, kind = _last_granule(f, serial, file_size), 'opus'
+    else:
+        return None
+    duration = max(samples - pre_skip, 0) / sample_rate
+    bitrate = int(file_size * 8 / duration) if duration else max(nominal, 0)
+    info = {
+        'format': kind,
+        'duration': duration,
+        'bitrate': bitrate,
+        'sample_rate': sample_rate,
+        'channels': channels,
+    }
+    info.update(tags)
+    return info
+
+
+def _atoms(data: bytes, start: int = 0, end: Optional[int] = None):
+    """Yield (type, payload start, payload end) for the boxes in data[start:end]"""
+    end = len(data) if end is None else end
+    position = start
+    while position + 8 <= end:
+        size, kind = struct.unpack_from('>I4s', data, position)
+        header = 8
+        if size == 1:
+            size, header = struct.unpack_from('>Q', data, position + 8)[0], 16
+        elif size == 0:
+            size = end - position
+        if size < header:
+            return
+        yield kind, position + header, min(position + size, end)
+        position += size
+
+
+def _find_atom(data: bytes, path: tuple, start: int = 0, end: Optional[int] = None):
+    """Payload bounds of the first box along path (e.g. (b'mdia', b'mdhd')), or None"""
+    for kind, payload_start, payload_end in _atoms(data, start, end):
+        if kind == path[0]:
+            if len(path) == 1:
+                return payload_start, payload_end
+            return _find_atom(data, path[1:], payload_start, payload_end)
+    return None
+
+
+def _media_duration(data: bytes, start: int) -> Optional[float]:
+    """Duration from an mvhd/mdhd payload (version 0 or 1)"""
+    if data[start] == 1:
+        timescale, duration = struct.unpack_from('>IQ', data, start + 20)
+    else:
+        timescale, duration = struct.unpack_from('>II', data, start + 12)
+    return duration / timescale if timescale else None
+
+
+def _esds_bitrate(data: bytes) -> int:
+    """Average bitrate from the DecoderConfigDescriptor nested in an ES_Descriptor"""
+    position = 0
+    while position < len(data):
+        tag = data[position]
+        length, position = 0, position + 1
+        for _ in range(4):              # Expandable size: 7 bits per byte
+            byte = data[position]
+            position += 1
+            length = (length << 7) | (byte & 0x7F)
+            if not byte & 0x80:
+                break
+        if tag == 0x03:                 # ES_Descriptor: skip ES_ID and the optional fields
+            flags = data[position + 2]
+            position += 3
+            if flags & 0x80:
+                position += 2
+            if flags & 0x40:
+                position += 1 + data[position]
+            if flags & 0x20:
+                position += 2
+        elif tag == 0x04:               # DecoderConfigDescriptor
+            return struct.unpack_from('>I', data, position + 9)[0]
+        else:
+            position += length
+    return 0
+
+
+def _read_m4a(f: BinaryIO, file_size: int) -> Optional[Dict]:
+    """Find moov among the top-level boxes (it may follow mdat) and read it alone"""
+    moov, media_bytes = None, 0
+    position = 0
+    while position + 8 <= file_size:
+        f.seek(position)
+        header = f.read(16)
+        size, kind = struct.unpack('>I4s', header[:8])
+        if size == 1:
+            size = struct.unpack('>Q', header[8:16])[0]
+        elif size == 0:
+            size = file_size - position
+        if size < 8:
+            return None
+        if kind == b'moov':
+            f.seek(position)
+            moov = f.read(size)
+        elif kind == b'mdat':
+            media_bytes += size
+        position += size
+    if moov is None:
+        return None
+
+    info = {'format': 'm4a', 'duration': 0.0, 'bitrate': 0, 'sample_rate': 0, 'channels': 0}
+    mvhd = _find_atom(moov, (b'moov', b'mvhd'))
+    if mvhd:
+        info['duration'] = _media_duration(moov, mvhd[0]) or 0.0
+
+    # The audio track's own header is more precise than the movie's
+    trak_bounds = _find_atom(moov, (b'moov',))
+    for kind, start, end in _atoms(moov, *trak_bounds):
+        if kind != b'trak':
+            continue
+        hdlr = _find_atom(moov, (b'mdia', b'hdlr'), start, end)
+        if not hdlr or moov[hdlr[0] + 8:hdlr[0] + 12] != b'soun':
+            continue
+        mdhd = _find_atom(moov, (b'mdia', b'mdhd'), start, end)
+        if mdhd:
+            info['duration'] = _media_duration(moov, mdhd[0]) or info['duration']
+        stsd = _find_atom(moov, (b'mdia', b'minf', b'stbl', b'stsd'), start, end)
+        if stsd:
+            entry = stsd[0] + 8         # Full-box header and entry count
+            info['channels'], _, _, _, rate = struct.unpack_from('>HHHHI', moov, entry + 24)
+            info['sample_rate'] = rate >> 16
+            entry_size = struct.unpack_from('>I', moov, entry)[0]
+            esds = _find_atom(moov, (b'esds',), entry + 36, entry + entry_size)
+            if esds:
+                info['bitrate'] = _esds_bitrate(moov[esds[0] + 4:esds[1]])
+        break
+
+    meta = _find_atom(moov, (b'moov', b'udta', b'meta'))
+    if meta:
+        # ISO meta is a full box (4 bytes of version/flags); QuickTime's is not
+        start = meta[0] if moov[meta[0] + 4:meta[0] + 8] == b'hdlr' else meta[0] + 4
+        ilst = _find_atom(moov, (b'ilst',), start, meta[1])
+        if ilst:
+            for kind, item_start, item_end in _atoms(moov, *ilst):
+                data = _find_atom(moov, (b'data',), item_start, item_end)
+                if data is None:
+                    continue
+                value = moov[data[0] + 8:data[1]]
+                if kind in MP4_FIELDS:
+                    text = value.decode('utf-8', 'replace').strip()
+                    if text:
+                        info[MP4_FIELDS[kind]] = text
+                elif kind == b'trkn' and len(value) >= 4:
+                    track = struct.unpack_from('>H', value, 2)[0]
+                    if track:
+                        info['track'] = str(track)
+                elif kind == b'gnre' and len(value) >= 2:
+                    number = struct.unpack_from('>H', value)[0]
+                    if 0 < number <= len(ID3V1_GENRES):
+                        info.setdefault('genre', ID3V1_GENRES[number - 1])
+
+    if not info['bitrate'] and info['duration']:
+        info['bitrate'] = int(media_bytes * 8 / info['duration'])
+    return info
+
+
+def _read_wav(f: BinaryIO, file_size: int) -> Optional[Dict]:
+    info, tags, data_bytes = None, {}, 0
+    position = 12
+    while position + 8 <= file_size:
+        f.seek(position)
+        kind, size = struct.unpack('<4sI', f.read(8))
+        if kind == b'fmt ':
+            _, channels, sample_rate, byte_rate = struct.unpack('<HHII', f.read(12))
+            info = {'format': 'wav', 'sample_rate': sample_rate, 'channels': channels,
+                    'bitrate': byte_rate * 8}
+        elif kind == b'data':
+            data_bytes = min(size, file_size - position - 8)    # Streamed files leave size unset
+        elif kind == b'LIST' and size <= MAX_COMMENT_BYTES:
+            body = f.read(size)
+            if body[:4] == b'INFO':
+                for field, start, end in _atoms_le(body, 4):
+                    name = RIFF_INFO_FIELDS.get(field)
+                    text = body[start:end].split(b'\0', 1)[0].decode('latin-1').strip()
+                    if name and text:
+                        tags[name] = text
+        position += 8 + size + (size & 1)
+    if info is None:
+        return None
+    info['duration'] = data_bytes * 8 / info['bitrate'] if info['bitrate'] else 0.0
+    info.update(tags)
+    return info
+
+
+def _atoms_le(data: bytes, position: int):
+    """RIFF sub-chunks: (id, data start, data end)"""
+    while position + 8 <= len(data):
+        kind, size = struct.unpack_from('<4sI', data, position)
+        yield kind, position + 8, position + 8 + size
+        position += 8 + size + (size & 1)
+
+
+def read_audio_info(filepath: str) -> Optional[Dict]:
+    """Duration, bitrate, stream parameters and tags of an audio file.
+
+    Always present: format, duration (seconds), bitrate (bits/s), sample_rate
+    and channels. Tags (title, artist, album, date, genre, track) are included
+    when the file has them. Returns None when the format is not one this
+    reader understands or the headers are malformed, so the caller can fall
+    back to a full parser.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            file_size = os.fstat(f.fileno()).st_size
+            head = f.read(HEAD_BYTES)
+            if head[:4] == b'fLaC':
+                return _read_flac(f, 0, file_size)
+            if head[:3] == b'ID3':
+                tag_end = 10 + _syncsafe(head[6:10])
+                f.seek(tag_end)
+                if f.read(4) == b'fLaC':        # Some taggers prepend ID3 to FLAC
+                    return _read_flac(f, tag_end, file_size)
+                return _read_mp3(f, head, file_size)
+            if head[:4] == b'OggS':
+                return _read_ogg(f, file_size)
+            if head[4:8] == b'ftyp':
+                return _read_m4a(f, file_size)
+            if head[:4] == b'RIFF' and head[8:12] == b'WAVE':
+                return _read_wav(f, file_size)
+            if _find_first_frame(head[:4096], 0)[1] is not None:
+                return _read_mp3(f, head, file_size)
+            return None
+    except (OSError, ValueError, IndexError, ZeroDivisionError, struct.error):
+        return None
+
+
+def parse_audio_date(value: str) -> Optional[datetime]:
+    """Tag dates: '2024', '2024-01', '2024-01-25' or '2024-01-25T14:30:52' -> datetime"""
+    value = value.strip().replace(' ', 'T')
+    for length, fmt in ((19, '%Y-%m-%dT%H:%M:%S'), (16, '%Y-%m-%dT%H:%M'),
+                        (10, '%Y-%m-%d'), (7, '%Y-%m'), (4, '%Y')):
+        try:
+            return datetime.strptime(value[:length], fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def audio_date(info: Dict) -> Optional[datetime]:
+    """Recording date from the tags returned by read_audio_info"""
+    return parse_audio_date(info['date']) if info.get('date') else None
+
+
+def format_duration(seconds: float) -> str:
+    """183.4 -> '3:03'; hours are added for long mixes"""
+    minutes, secs = divmod(int(round(seconds)), 60)
+    if minutes >= 60:
+        hours, minutes = divmod(minutes, 60)
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
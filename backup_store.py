@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Content-Addressed Backup Store
+Backs up originals into original_backup/ as hash-named blobs using reflinks
+where possible, with a manifest that maps original names to blobs
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+MANIFEST_NAME = 'manifest.jsonl'
+BLOBS_DIR = 'blobs'
+
+# Linux FICLONE ioctl (_IOW(0x94, 9, int)): share extents on btrfs/XFS/bcachefs
+FICLONE = 0x40049409
+
+
+def hash_file(filepath: str) -> str:
+    """SHA-256 of a file's contents, streamed"""
+    with open(filepath, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+        return digest.hexdigest()
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """Copy-on-write clone of src to dst; False if the filesystem can't do it"""
+    if sys.platform.startswith('linux'):
+        try:
+            import fcntl
+        except ImportError:
+            return False
+        try:
+            with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            return True
+        except OSError:
+            if os.path.exists(dst):
+                os.remove(dst)
+            return False
+
+    if sys.platform == 'darwin':
+        # APFS clonefile(2)
+        try:
+            import ctypes
+            libc = ctypes.CDLL('libc.dylib', use_errno=True)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+        except (OSError, AttributeError):
+            return False
+
+    return False
+
+
+class BackupStore:
+    """Deduplicating backup store rooted at a backup directory.
+
+    Each original is stored once per distinct content under
+    blobs/<first two hex digits>/<sha256><ext>. Storing is tried as a reflink
+    first, then a plain copy (shutil.copyfile uses sendfile/fcopyfile, so even
+    that avoids user-space buffering).
+
+    allow_hardlink=True also tries a hardlink before copying. A hardlinked
+    blob shares its inode with the original, so editing the original in
+    place would edit the backup too; only pass it when the original is
+    removed right after it is backed up.
+    """
+
+    def __init__(self, backup_dir: str, allow_hardlink: bool = False):
+        self.backup_dir = backup_dir
+        self.allow_hardlink = allow_hardlink
+        self.manifest_path = os.path.join(backup_dir, MANIFEST_NAME)
+        self.stats = {'stored': 0, 'deduplicated': 0, 'reflinked': 0, 'hardlinked': 0, 'copied': 0}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(backup_dir, BLOBS_DIR), exist_ok=True)
+
+    def blob_path(self, digest: str, ext: str = '') -> str:
+        return os.path.join(self.backup_dir, BLOBS_DIR, digest[:2], f"{digest}{ext.lower()}")
+
+    def store(self, filepath: str, digest: str = None) -> str:
+        """Back up filepath and record it in the manifest; returns the blob path"""
+        digest = digest or hash_file(filepath)
+        blob = self.blob_path(digest, os.path.splitext(filepath)[1])
+
+        with self._lock:
+            if os.path.exists(blob):
+                method = 'existing'
+                self.stats['deduplicated'] += 1
+            else:
+                os.makedirs(os.path.dirname(blob), exist_ok=True)
+                method = self._place(filepath, blob)
+                self.stats[method] += 1
+                self.stats['stored'] += 1
+
+            self._append_manifest({
+                'original': os.path.basename(filepath),
+                'source': os.path.abspath(filepath),
+                'blob': os.path.relpath(blob, self.backup_dir),
+                'sha256': digest,
+                'size': os.path.getsize(blob),
+                'method': method,
+                'stored': datetime.now().isoformat(),
+            })
+        return blob
+
+    def _place(self, src: str, dst: str) -> str:
+        # Write under a temporary name so a crash never leaves a truncated blob
+        tmp = f"{dst}.tmp{os.getpid()}"
+        if _reflink(src, tmp):
+            shutil.copystat(src, tmp)
+            os.replace(tmp, dst)
+            return 'reflinked'
+        if self.allow_hardlink:
+            try:
+                os.link(src, dst)
+                return 'hardlinked'
+            except OSError:
+                pass
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+        return 'copied'
+
+    def _append_manifest(self, record: Dict):
+        with open(self.manifest_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def entries(self) -> List[Dict]:
+        """All manifest records, oldest first"""
+        if not os.path.exists(self.manifest_path):
+            return []
+        with open(self.manifest_path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def find(self, original_name: str) -> Optional[Dict]:
+        """Most recent manifest record for an original filename"""
+        matches = [e for e in self.entries() if e['original'] == original_name]
+        return matches[-1] if matches else None
+
+    def restore(self, original_name: str, dest_dir: str) -> str:
+        """Restore the latest backup of original_name into dest_dir.
+
+        Restored files are cloned or copied, never hardlinked, so they stay
+        independent of the blob.
+        """
+        record = self.find(original_name)
+        if record is None:
+            raise ValueError(f"No backup recorded for {original_name}")
+
+        blob = os.path.join(self.backup_dir, record['blob'])
+        dest = os.path.join(dest_dir, record['original'])
+        if os.path.exists(dest):
+            raise ValueError(f"Refusing to overwrite existing file {dest}")
+
+        os.makedirs(dest_dir, exist_ok=True)
+        if _reflink(blob, dest):
+            shutil.copystat(blob, dest)
+        else:
+            shutil.copy2(blob, dest)
+        return dest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or restore a content-addressed original_backup store')
+    parser.add_argument('backup_dir', help='Backup directory (e.g. photos/original_backup)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List backed-up originals')
+    restore_parser = subparsers.add_parser('restore', help='Restore originals by name')
+    restore_parser.add_argument('names', nargs='*', help='Original filenames (default: all)')
+    restore_parser.add_argument('-o', '--output', default='.', help='Directory to restore into')
+
+    args = parser.parse_args()
+    store = BackupStore(args.backup_dir)
+
+    if args.command == 'list':
+        for record in store.entries():
+            print(f"{record['original']} -> {record['blob']} ({record['method']})")
+        return 0
+
+    names = args.names or sorted({record['original'] for record in store.entries()})
+    errors = 0
+    for name in names:
+        try:
+            print(f"Restored: {store.restore(name, args.output)}")
+        except (OSError, ValueError) as e:
+            print(f"Error restoring {name}: {e}")
+            errors += 1
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -9,10 +9,20 @@ import shutil
 import argparse
 from datetime import datetime
 from pathlib import Path
-import re
 import json
 from typing import Dict, List, Tuple, Optional
 
+from audio_reader import read_audio_info, audio_date
+from backup_store import BackupStore
+from dedupe import find_duplicates, duplicate_paths, report_duplicates
+from exif_reader import read_exif, exif_date
+from ffmpeg_scheduler import FFmpegScheduler, run_ffmpeg_sync
+from filename_dates import converter_matcher
+from image_pool import DEFAULT_MAX_MEGAPIXELS, ImageConversionPool, convert_image_file
+from media_walker import walk_files
+from metadata_cache import MetadataCache, encode_date, decode_date
+from parallel_extract import extract_metadata
+
 # Import libraries with fallbacks
 try:
     from PIL import Image
@@ -34,7 +44,8 @@ except ImportError:
     print("Warning: Mutagen not available. Audio metadata extraction will be limited.")
 
 class BatchConverter:
-    def __init__(self):
+    def __init__(self, metadata_cache: Optional[MetadataCache] = None):
+        self.metadata_cache = metadata_cache
         self.supported_images = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp', '.gif'}
         self.supported_audio = {'.mp3', '.flac', '.m4a', '.wav', '.ogg', '.aac'}
         self.supported_video = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv'}
@@ -66,18 +77,18 @@ class BatchConverter:
             'custom': '{custom_pattern}'
         }
 
-    def get_file_date(self, filepath: str, file_type: str) -> datetime:
+    def get_file_date(self, filepath: str, file_type: str, st: os.stat_result = None) -> datetime:
         """Extract date from file using various methods"""
         
         # Try EXIF for images
         if file_type == 'image' and PILLOW_AVAILABLE:
-            date = self._get_exif_date(filepath)
+            date = self._get_exif_date(filepath, st)
             if date:
                 return date
         
         # Try audio metadata
-        if file_type == 'audio' and MUTAGEN_AVAILABLE:
-            date = self._get_audio_date(filepath)
+        if file_type == 'audio':
+            date = self._get_audio_date(filepath, st)
             if date:
                 return date
         
@@ -88,7 +99,7 @@ class BatchConverter:
         
         # Fallback to file modification time
         try:
-            timestamp = os.path.getmtime(filepath)
+            timestamp = st.st_mtime if st else os.path.getmtime(filepath)
             return datetime.fromtimestamp(timestamp)
         except:
             pass
@@ -96,8 +107,22 @@ class BatchConverter:
         # Last resort - current time
         return datetime.now()
 
-    def _get_exif_date(self, filepath: str) -> Optional[datetime]:
-        """Extract date from EXIF data"""
+    def _get_exif_date(self, filepath: str, st: os.stat_result = None) -> Optional[datetime]:
+        """Extract date from EXIF data, consulting the metadata cache first"""
+        if self.metadata_cache is None:
+            return self._read_exif_date(filepath)
+        return decode_date(self.metadata_cache.cached(
+            filepath, 'exif_date', lambda: encode_date(self._read_exif_date(filepath)), st
+        ))
+
+    def _read_exif_date(self, filepath: str) -> Optional[datetime]:
+        """Extract date from EXIF data, parsing the file header before falling back to Pillow"""
+        tags = read_exif(filepath)
+        if tags is not None:
+            return exif_date(tags)
+        if not PILLOW_AVAILABLE:
+            return None
+        
         try:
             with Image.open(filepath) as img:
                 exif_data = img._getexif()
@@ -113,8 +138,22 @@ class BatchConverter:
             print(f"Warning: Could not read EXIF from {filepath}: {e}")
         return None
 
-    def _get_audio_date(self, filepath: str) -> Optional[datetime]:
-        """Extract date from audio metadata"""
+    def _get_audio_date(self, filepath: str, st: os.stat_result = None) -> Optional[datetime]:
+        """Extract date from audio metadata, consulting the metadata cache first"""
+        if self.metadata_cache is None:
+            return self._read_audio_date(filepath)
+        return decode_date(self.metadata_cache.cached(
+            filepath, 'audio_date', lambda: encode_date(self._read_audio_date(filepath)), st
+        ))
+
+    def _read_audio_date(self, filepath: str) -> Optional[datetime]:
+        """Extract date from audio metadata, parsing the tag headers before falling back to mutagen"""
+        info = read_audio_info(filepath)
+        if info is not None:
+            return audio_date(info)
+        if not MUTAGEN_AVAILABLE:
+            return None
+        
         try:
             file = mutagen.File(filepath)
             if file is None:
@@ -137,33 +176,7 @@ class BatchConverter:
 
     def _get_filename_date(self, filepath: str) -> Optional[datetime]:
         """Extract date from filename patterns"""
-        filename = os.path.basename(filepath)
-        
-        patterns = [
-            # PXL_20240125_043347823.MP.jpg
-            (r'PXL_(\d{8})_(\d{6})', '%Y%m%d%H%M%S'),
-            # IMG_20240125_043347.jpg
-            (r'IMG_(\d{8})_(\d{6})', '%Y%m%d%H%M%S'),
-            # 20240125_043347.jpg
-            (r'(\d{8})_(\d{6})', '%Y%m%d%H%M%S'),
-            # 2024-01-25_04-33-47.jpg
-            (r'(\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})', '%Y-%m-%d_%H-%M-%S'),
-            # 20240125.jpg
-            (r'(\d{8})', '%Y%m%d'),
-            # 2024-01-25.jpg
-            (r'(\d{4})-(\d{2})-(\d{2})', '%Y-%m-%d'),
-        ]
-        
-        for pattern, fmt in patterns:
-            match = re.search(pattern, filename)
-            if match:
-                try:
-                    date_str = ''.join(match.groups())
-                    return datetime.strptime(date_str, fmt.replace('-', '').replace('_', '').replace(':', ''))
-                except:
-                    continue
-        
-        return None
+        return converter_matcher.match(os.path.basename(filepath))
 
     def detect_file_type(self, filepath: str) -> str:
         """Detect file type based on extension"""
@@ -180,43 +193,35 @@ class BatchConverter:
         else:
             return 'other'
 
+    def probe_file(self, item: Tuple[os.DirEntry, str]) -> Tuple[datetime, str, str]:
+        """Extract the (date, path, file_type) tuple used to order a scanned file"""
+        entry, file_type = item
+        try:
+            st = entry.stat()
+        except OSError:
+            st = None
+        return (self.get_file_date(entry.path, file_type, st), entry.path, file_type)
+
     def convert_image(self, input_path: str, output_path: str, quality: int = 95) -> bool:
         """Convert image format"""
         if not PILLOW_AVAILABLE:
             print(f"Error: Pillow not available for image conversion")
             return False
         
-        try:
-            with Image.open(input_path) as img:
-                # Convert RGBA to RGB for JPEG
-                if output_path.lower().endswith('.jpg') and img.mode in ('RGBA', 'LA'):
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                
-                # Save with quality settings
-                save_kwargs = {}
-                if output_path.lower().endswith(('.jpg', '.jpeg')):
-                    save_kwargs['quality'] = quality
-                    save_kwargs['optimize'] = True
-                elif output_path.lower().endswith('.png'):
-                    save_kwargs['optimize'] = True
-                elif output_path.lower().endswith('.webp'):
-                    save_kwargs['quality'] = quality
-                    save_kwargs['method'] = 6
-                
-                img.save(output_path, **save_kwargs)
-                return True
-        except Exception as e:
-            print(f"Error converting {input_path}: {e}")
+        error = convert_image_file(input_path, output_path, quality)
+        if error is not None:
+            print(f"Error converting {input_path}: {error}")
             return False
+        return True
+
+    def audio_command(self, input_path: str, output_path: str) -> List[str]:
+        """ffmpeg command converting audio by output extension"""
+        return ['ffmpeg', '-i', input_path, '-y', output_path]
 
     def convert_audio(self, input_path: str, output_path: str) -> bool:
         """Convert audio format using ffmpeg"""
         try:
-            import subprocess
-            cmd = ['ffmpeg', '-i', input_path, '-y', output_path]
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_ffmpeg_sync(self.audio_command(input_path, output_path))
             return result.returncode == 0
         except Exception as e:
             print(f"Error converting {input_path}: {e}")
@@ -258,8 +263,16 @@ class BatchConverter:
     def process_directory(self, directory: str, output_dir: str = None, 
                          convert_to: str = None, naming_pattern: str = 'date_sequence',
                          file_types: List[str] = None, dry_run: bool = False,
-                         quality: int = 95, backup: bool = True) -> Dict:
-        """Process all files in a directory"""
+                         quality: int = 95, backup: bool = True,
+                         jobs: int = None, dedupe: str = None,
+                         max_megapixels: float = DEFAULT_MAX_MEGAPIXELS) -> Dict:
+        """Process all files in a directory.
+
+        Image conversions run on a process pool (jobs processes, default one per
+        core) with at most max_megapixels of decoded images in flight, and audio
+        conversions in up to jobs concurrent ffmpeg processes; each file is still
+        counted in results exactly once, when its conversion finishes.
+        """
         
         if not os.path.exists(directory):
             raise ValueError(f"Directory {directory} does not exist")
@@ -272,25 +285,33 @@ class BatchConverter:
         
         # Create backup directory if needed
         if backup and not dry_run:
-            backup_dir = os.path.join(output_dir, 'original_backup')
-            os.makedirs(backup_dir, exist_ok=True)
+            backup_store = BackupStore(os.path.join(output_dir, 'original_backup'))
         
         # Collect files
         files_to_process = []
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
-            if os.path.isfile(filepath):
-                file_type = self.detect_file_type(filepath)
-                if file_types is None or file_type in file_types:
-                    files_to_process.append((filepath, file_type))
+        for entry in walk_files(directory):
+            file_type = self.detect_file_type(entry.name)
+            if file_types is None or file_type in file_types:
+                files_to_process.append((entry, file_type))
+        
+        # Find byte-identical copies before paying for date extraction, backup and conversion
+        duplicate_groups = []
+        duplicates_skipped = 0
+        if dedupe:
+            duplicate_groups = find_duplicates(
+                ((entry.path, entry.stat().st_size) for entry, _ in files_to_process), jobs
+            )
+            report_duplicates(duplicate_groups)
+            if dedupe == 'skip':
+                duplicates = duplicate_paths(duplicate_groups)
+                files_to_process = [item for item in files_to_process if item[0].path not in duplicates]
+                duplicates_skipped = len(duplicates)
         
         print(f"Found {len(files_to_process)} files to process...")
         
-        # Extract dates and sort
-        files_with_dates = []
-        for filepath, file_type in files_to_process:
-            file_date = self.get_file_date(filepath, file_type)
-            files_with_dates.append((file_date, filepath, file_type))
+        # Extract dates (in parallel) and sort
+        files_with_dates = extract_metadata(files_to_process, self.probe_file, jobs)
+        for file_date, filepath, file_type in files_with_dates:
             print(f"{os.path.basename(filepath)} -> {file_date.strftime('%Y-%m-%d %H:%M:%S')}")
         
         # Sort by date
@@ -300,10 +321,35 @@ class BatchConverter:
         results = {
             'processed': 0,
             'errors': 0,
-            'skipped': 0,
-            'details': []
+            'skipped': duplicates_skipped,
+            'details': [],
+            'duplicates': duplicate_groups
         }
         
+        def finish(original_path, new_filename, success):
+            if success:
+                print(f"Processed: {os.path.basename(original_path)} -> {new_filename}")
+                results['processed'] += 1
+            else:
+                print(f"Error processing: {os.path.basename(original_path)}")
+                results['errors'] += 1
+        
+        def conversion_done(original_path, new_filename):
+            def on_done(error):
+                if error is not None:
+                    print(f"Error converting {original_path}: {error}")
+                finish(original_path, new_filename, error is None)
+            return on_done
+        
+        # Image encodes go to worker processes and audio to concurrent ffmpeg
+        # processes; everything else stays in this loop
+        image_pool = None
+        if convert_to in self.supported_images and PILLOW_AVAILABLE and not dry_run:
+            image_pool = ImageConversionPool(jobs, max_megapixels)
+        ffmpeg_pool = None
+        if convert_to in self.supported_audio and not dry_run:
+            ffmpeg_pool = FFmpegScheduler(jobs)
+        
         current_date = None
         sequence = 1
         
@@ -339,16 +385,23 @@ class BatchConverter:
                 else:
                     # Backup original if requested
                     if backup:
-                        backup_path = os.path.join(backup_dir, os.path.basename(original_path))
-                        shutil.copy2(original_path, backup_path)
+                        backup_store.store(original_path)
                     
                     # Convert or copy file
                     success = False
                     if convert_to:
-                        if file_type == 'image' and convert_to in self.supported_images:
+                        if file_type == 'image' and image_pool is not None:
+                            # Counted by conversion_done once a worker has encoded it
+                            image_pool.submit(original_path, new_filepath, quality,
+                                              conversion_done(original_path, new_filename))
+                            success = None
+                        elif file_type == 'image' and convert_to in self.supported_images:
                             success = self.convert_image(original_path, new_filepath, quality)
-                        elif file_type == 'audio' and convert_to in self.supported_audio:
-                            success = self.convert_audio(original_path, new_filepath)
+                        elif file_type == 'audio' and ffmpeg_pool is not None:
+                            on_done = conversion_done(original_path, new_filename)
+                            ffmpeg_pool.submit(self.audio_command(original_path, new_filepath),
+                                               lambda result, error, on_done=on_done: on_done(error))
+                            success = None
                         else:
                             print(f"Warning: Conversion from {Path(original_path).suffix} to {convert_to} not supported")
                             shutil.copy2(original_path, new_filepath)
@@ -358,12 +411,8 @@ class BatchConverter:
                         shutil.move(original_path, new_filepath)
                         success = True
                     
-                    if success:
-                        print(f"Processed: {os.path.basename(original_path)} -> {new_filename}")
-                        results['processed'] += 1
-                    else:
-                        print(f"Error processing: {os.path.basename(original_path)}")
-                        results['errors'] += 1
+                    if success is not None:
+                        finish(original_path, new_filename, success)
                 
                 sequence += 1
                 
@@ -371,6 +420,11 @@ class BatchConverter:
                 print(f"Error processing {original_path}: {e}")
                 results['errors'] += 1
         
+        if image_pool is not None:
+            image_pool.close()
+        if ffmpeg_pool is not None:
+            ffmpeg_pool.close()
+        
         return results
 
 def main():
@@ -390,10 +444,22 @@ def main():
                        help='Skip creating backup of original files')
     parser.add_argument('--dry-run', action='store_true',
                        help='Preview changes without applying them')
+    parser.add_argument('-j', '--jobs', type=int,
+                       help='Worker threads for date extraction, processes for image conversion and '
+                            'concurrent ffmpeg audio conversions '
+                            '(default: CPU count + 4 threads, one process per core; 1 = serial)')
+    parser.add_argument('--max-megapixels', type=float, default=DEFAULT_MAX_MEGAPIXELS,
+                       help=f'Decoded megapixels allowed in flight during image conversion '
+                            f'(default: {DEFAULT_MAX_MEGAPIXELS})')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Ignore the persistent metadata cache and re-read every file')
+    parser.add_argument('--dedupe', choices=['report', 'skip'],
+                       help='Detect byte-identical files first; "skip" leaves duplicates untouched')
     
     args = parser.parse_args()
     
-    converter = BatchConverter()
+    metadata_cache = None if args.no_cache else MetadataCache()
+    converter = BatchConverter(metadata_cache)
     
     try:
         results = converter.process_directory(
@@ -404,7 +470,10 @@ def main():
             file_types=args.types,
             dry_run=args.dry_run,
             quality=args.quality,
-            backup=not args.no_backup
+            backup=not args.no_backup,
+            jobs=args.jobs,
+            dedupe=args.dedupe,
+            max_megapixels=args.max_megapixels
         )
         
         print(f"\n{'DRY RUN ' if args.dry_run else ''}Results:")
@@ -418,6 +487,9 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
         return 1
+    finally:
+        if metadata_cache:
+            metadata_cache.close()
     
     return 0
 
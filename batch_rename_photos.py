@@ -5,16 +5,40 @@ Renames photos to format: YYYYMMDD_001.jpg, YYYYMMDD_002.jpg, etc.
 """
 
 import os
-import shutil
 from datetime import datetime
-from PIL import Image
-from PIL.ExifTags import TAGS
 import re
 
+try:
+    from PIL import Image
+    from PIL.ExifTags import TAGS
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+from backup_store import BackupStore
+from exif_reader import read_exif, exif_date
+from media_walker import walk_files
+from parallel_extract import extract_metadata
+from rename_planner import RenamePlanner, apply_journal, load_journal, step_originals
+
 def get_photo_date(filepath):
     """Extract date from EXIF data or filename"""
+    # Try to get EXIF date first, from the file header alone when possible
+    tags = read_exif(filepath)
+    if tags is not None:
+        photo_date = exif_date(tags)
+        if photo_date:
+            return photo_date
+    elif PILLOW_AVAILABLE:
+        photo_date = _pillow_exif_date(filepath)
+        if photo_date:
+            return photo_date
+    
+    return _filename_date(filepath)
+
+def _pillow_exif_date(filepath):
+    """Full Pillow open, for formats the header reader does not understand"""
     try:
-        # Try to get EXIF date first
         with Image.open(filepath) as img:
             exif_data = img._getexif()
             if exif_data:
@@ -27,8 +51,10 @@ def get_photo_date(filepath):
                             continue
     except:
         pass
-    
-    # Fallback to filename patterns
+    return None
+
+def _filename_date(filepath):
+    """Fallback to filename patterns"""
     filename = os.path.basename(filepath)
     
     # PXL format: PXL_20240125_043347823.MP.jpg
@@ -60,26 +86,38 @@ def get_photo_date(filepath):
     # Default fallback
     return datetime(2023, 1, 1)
 
-def batch_rename_photos(photos_dir):
+def _print_rename(old_filepath, new_filepath):
+    print(f"Renamed: {os.path.basename(old_filepath)} -> {os.path.basename(new_filepath)}")
+
+def _probe_photo(filepath):
+    """Return the (date, path) pair used to order a photo"""
+    return (get_photo_date(filepath), filepath)
+
+def batch_rename_photos(photos_dir, jobs=None):
     """Batch rename all photos in chronological order"""
     
     # Get all image files
+    # Finish an interrupted run from its journal instead of rescanning
+    journal = load_journal(photos_dir)
+    if journal:
+        steps, done = journal
+        print(f"Resuming interrupted rename: {done} of {len(steps)} steps already applied")
+        renamed = apply_journal(photos_dir, steps, done, on_step=_print_rename)
+        print(f"\nCompleted! Renamed {renamed} photos.")
+        return
+    
     image_extensions = {'.jpg', '.jpeg', '.JPG', '.JPEG', '.png', '.PNG'}
     photo_files = []
     
-    for filename in os.listdir(photos_dir):
-        if any(filename.endswith(ext) for ext in image_extensions):
-            filepath = os.path.join(photos_dir, filename)
-            if os.path.isfile(filepath):
-                photo_files.append(filepath)
+    for entry in walk_files(photos_dir):
+        if any(entry.name.endswith(ext) for ext in image_extensions):
+            photo_files.append(entry.path)
     
     print(f"Found {len(photo_files)} photos to process...")
     
-    # Extract dates and sort
-    photos_with_dates = []
-    for filepath in photo_files:
-        photo_date = get_photo_date(filepath)
-        photos_with_dates.append((photo_date, filepath))
+    # Extract dates (in parallel) and sort
+    photos_with_dates = extract_metadata(photo_files, _probe_photo, jobs)
+    for photo_date, filepath in photos_with_dates:
         print(f"{os.path.basename(filepath)} -> {photo_date.strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Sort by date
@@ -87,9 +125,10 @@ def batch_rename_photos(photos_dir):
     
     # Create backup directory
     backup_dir = os.path.join(photos_dir, 'original_backup')
-    os.makedirs(backup_dir, exist_ok=True)
+    backup_store = BackupStore(backup_dir)
     
-    # Rename files
+    # Plan every rename up front so swaps between existing names are safe
+    planner = RenamePlanner(photos_dir)
     current_date = None
     counter = 1
     
@@ -107,18 +146,24 @@ def batch_rename_photos(photos_dir):
         
         new_filename = f"{date_str}_{counter:03d}{ext}"
         new_filepath = os.path.join(photos_dir, new_filename)
-        
-        # Backup original
-        backup_filepath = os.path.join(backup_dir, os.path.basename(old_filepath))
-        shutil.copy2(old_filepath, backup_filepath)
-        
-        # Rename file
-        shutil.move(old_filepath, new_filepath)
-        
-        print(f"Renamed: {os.path.basename(old_filepath)} -> {new_filename}")
+        planner.add(old_filepath, new_filepath)
         counter += 1
     
-    print(f"\nCompleted! Renamed {len(photos_with_dates)} photos.")
+    steps, rejected = planner.resolve()
+    for old_filepath, new_filepath in rejected:
+        print(f"Warning: Target exists, skipping: {os.path.basename(new_filepath)}")
+    
+    # Backup originals before anything moves
+    for src in step_originals(steps):
+        backup_store.store(src)
+    
+    # Journal the plan, then rename
+    renamed = 0
+    if steps:
+        planner.write_journal(steps)
+        renamed = apply_journal(photos_dir, steps, on_step=_print_rename)
+    
+    print(f"\nCompleted! Renamed {renamed} photos.")
     print(f"Original files backed up to: {backup_dir}")
 
 if __name__ == "__main__":
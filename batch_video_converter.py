@@ -4,17 +4,35 @@ Batch Video Converter and Renamer
 Converts videos to optimal MP4 format and renames by date
 """
 
+import asyncio
 import os
-import shutil
+import time
 import subprocess
-import json
 from datetime import datetime
-from pathlib import Path
-import re
 from typing import Dict, List, Tuple, Optional
 
+from backup_store import BackupStore
+from conversion_queue import (ENCODING, FAILED, QUEUE_NAME, TEMP_PREFIX, VERIFIED, ConversionJob,
+                              ConversionQueue)
+from ffmpeg_scheduler import DEFAULT_VIDEO_SLOTS, FFmpegResult, FFmpegScheduler, run_ffmpeg_sync
+from filename_dates import video_matcher
+from hls_package import package_videos
+from media_info import MediaInfo, probe_many, probe_media
+from media_walker import DEFAULT_EXCLUDES, walk_files
+from segment_encode import DEFAULT_MIN_DURATION, SegmentEncodeError, encode_segmented, verify_output
+from metadata_cache import MetadataCache
+from report_stream import JsonlReportWriter
+
+# Roughly what CRF 28 produces for 1080p; None disables the remux fast path
+DEFAULT_REMUX_MAX_BITRATE = 5_000_000
+
+# Pixel formats every browser decodes
+WEB_PIXEL_FORMATS = {'yuv420p', 'yuvj420p'}
+
 class BatchVideoConverter:
-    def __init__(self):
+    def __init__(self, metadata_cache: Optional[MetadataCache] = None):
+        self.metadata_cache = metadata_cache
+        self.media = {}  # path -> MediaInfo; one ffprobe per file, even with --no-cache
         self.supported_formats = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v'}
         
         # FFmpeg settings for optimal compression
@@ -25,8 +43,11 @@ class BatchVideoConverter:
             'audio_codec': 'aac',
             'audio_bitrate': '128k'
         }
+        
+        # Sources that are already H.264/AAC at or below this bitrate are remuxed, not re-encoded
+        self.remux_max_bitrate = DEFAULT_REMUX_MAX_BITRATE
 
-    def get_video_date(self, filepath: str) -> datetime:
+    def get_video_date(self, filepath: str, st: os.stat_result = None) -> datetime:
         """Extract date from video metadata or filename"""
         
         # Try to get creation date from video metadata
@@ -41,7 +62,7 @@ class BatchVideoConverter:
         
         # Fallback to file modification time
         try:
-            timestamp = os.path.getmtime(filepath)
+            timestamp = st.st_mtime if st else os.path.getmtime(filepath)
             return datetime.fromtimestamp(timestamp)
         except:
             pass
@@ -49,134 +70,62 @@ class BatchVideoConverter:
         # Last resort - current time
         return datetime.now()
 
+    def media_info(self, filepath: str) -> Optional[MediaInfo]:
+        """The file's single ffprobe result: prefetched, cached, or probed now"""
+        if filepath not in self.media:
+            self.media[filepath] = probe_media(filepath, self.metadata_cache)
+        return self.media[filepath]
+
+    def prefetch_probes(self, filepaths: List[str], slots: Optional[int] = None):
+        """Probe every file not already known, running ffprobe processes concurrently"""
+        self.media.update(probe_many([filepath for filepath in filepaths if filepath not in self.media],
+                                     self.metadata_cache, slots))
+
     def _get_metadata_date(self, filepath: str) -> Optional[datetime]:
-        """Extract creation date from video metadata using ffprobe"""
-        try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', filepath
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                import json
-                metadata = json.loads(result.stdout)
-                format_info = metadata.get('format', {})
-                tags = format_info.get('tags', {})
-                
-                # Try different date fields
-                date_fields = ['creation_time', 'date', 'DATE', 'com.apple.quicktime.creationdate']
-                for field in date_fields:
-                    if field in tags:
-                        date_str = tags[field]
-                        # Parse various date formats
-                        for fmt in ['%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d']:
-                            try:
-                                return datetime.strptime(date_str[:len(fmt.replace('%f', '000000'))], fmt)
-                            except:
-                                continue
-        except Exception as e:
-            print(f"Warning: Could not read metadata from {filepath}: {e}")
-        
-        return None
+        """Extract creation date from the container metadata"""
+        info = self.media_info(filepath)
+        return info.created if info else None
 
     def _get_filename_date(self, filepath: str) -> Optional[datetime]:
         """Extract date from common filename patterns"""
-        filename = os.path.basename(filepath)
-        
-        patterns = [
-            # Already renamed format: 20240125_001.mp4
-            (r'(\d{8})_(\d{3})', lambda m: datetime.strptime(m.group(1), '%Y%m%d')),
-            
-            # VID00004.AVI - assume older
-            (r'^VID\d+', lambda m: datetime(2020, 1, 1)),
-            
-            # MOV01275.AVI - assume mid-range
-            (r'^MOV\d+', lambda m: datetime(2021, 1, 1)),
-            
-            # Numeric range: 0001-0140.mp4
-            (r'^(\d{4})-(\d{4})', lambda m: datetime(2023, 1, 1)),
-            
-            # Movie titles - assume recent
-            (r'^[a-zA-Z]', lambda m: datetime(2024, 1, 1)),
-        ]
-        
-        for pattern, date_func in patterns:
-            match = re.search(pattern, filename, re.IGNORECASE)
-            if match:
-                try:
-                    return date_func(match)
-                except:
-                    continue
-        
-        return None
+        return video_matcher.match(os.path.basename(filepath))
 
     def get_video_info(self, filepath: str) -> Dict:
-        """Get video information using ffprobe"""
-        try:
-            cmd = [
-                'ffprobe', '-v', 'quiet', '-print_format', 'json',
-                '-show_format', '-show_streams', filepath
-            ]
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                format_info = data.get('format', {})
-                video_stream = None
-                audio_stream = None
-                
-                # Find video and audio streams
-                for stream in data.get('streams', []):
-                    if stream.get('codec_type') == 'video' and not video_stream:
-                        video_stream = stream
-                    elif stream.get('codec_type') == 'audio' and not audio_stream:
-                        audio_stream = stream
-                
-                info = {
-                    'duration': float(format_info.get('duration', 0)),
-                    'size': int(format_info.get('size', 0)),
-                    'bitrate': int(format_info.get('bit_rate', 0)),
-                    'format': format_info.get('format_name', 'unknown')
-                }
-                
-                if video_stream:
-                    info.update({
-                        'width': int(video_stream.get('width', 0)),
-                        'height': int(video_stream.get('height', 0)),
-                        'video_codec': video_stream.get('codec_name', 'unknown'),
-                        'fps': eval(video_stream.get('r_frame_rate', '0/1')) if '/' in str(video_stream.get('r_frame_rate', '')) else 0
-                    })
-                
-                if audio_stream:
-                    info.update({
-                        'audio_codec': audio_stream.get('codec_name', 'unknown'),
-                        'audio_bitrate': int(audio_stream.get('bit_rate', 0))
-                    })
-                
-                return info
-        except Exception as e:
-            print(f"Warning: Could not get video info for {filepath}: {e}")
-        
-        return {'duration': 0, 'size': 0, 'width': 0, 'height': 0}
+        """Get video information (duration, size, codecs, ...) as a plain dict"""
+        info = self.media_info(filepath)
+        if info is None:
+            return {'duration': 0, 'size': 0, 'width': 0, 'height': 0}
+        return info.summary()
+
+    def video_args(self) -> List[str]:
+        return [
+            '-c:v', self.ffmpeg_settings['codec'],
+            '-preset', self.ffmpeg_settings['preset'],
+            '-crf', self.ffmpeg_settings['crf'],
+        ]
+
+    def audio_args(self) -> List[str]:
+        return [
+            '-c:a', self.ffmpeg_settings['audio_codec'],
+            '-b:a', self.ffmpeg_settings['audio_bitrate'],
+        ]
+
+    def video_command(self, input_path: str, output_path: str) -> List[str]:
+        """ffmpeg command converting one video to optimized MP4"""
+        return [
+            'ffmpeg', '-i', input_path,
+            *self.video_args(),
+            *self.audio_args(),
+            '-movflags', '+faststart',  # Optimize for web playback
+            '-y',  # Overwrite output file
+            output_path
+        ]
 
     def convert_video(self, input_path: str, output_path: str) -> bool:
         """Convert video to optimized MP4 format"""
         try:
-            cmd = [
-                'ffmpeg', '-i', input_path,
-                '-c:v', self.ffmpeg_settings['codec'],
-                '-preset', self.ffmpeg_settings['preset'],
-                '-crf', self.ffmpeg_settings['crf'],
-                '-c:a', self.ffmpeg_settings['audio_codec'],
-                '-b:a', self.ffmpeg_settings['audio_bitrate'],
-                '-movflags', '+faststart',  # Optimize for web playback
-                '-y',  # Overwrite output file
-                output_path
-            ]
-            
             print(f"Converting: {os.path.basename(input_path)}")
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = run_ffmpeg_sync(self.video_command(input_path, output_path))
             
             if result.returncode == 0:
                 return True
@@ -188,14 +137,182 @@ class BatchVideoConverter:
             print(f"Error converting {input_path}: {e}")
             return False
 
+    def remux_command(self, input_path: str, output_path: str) -> List[str]:
+        """ffmpeg command copying the first video and audio streams into a faststart MP4"""
+        return [
+            'ffmpeg', '-i', input_path,
+            '-map', '0:v:0', '-map', '0:a:0?',
+            '-c', 'copy',
+            '-movflags', '+faststart',
+            '-y',
+            output_path
+        ]
+
+    def is_web_compatible(self, video_info: Dict) -> bool:
+        """Already H.264 (4:2:0) with AAC or no audio, within the remux bitrate budget"""
+        return (self.remux_max_bitrate is not None
+                and video_info.get('video_codec') == 'h264'
+                and video_info.get('pix_fmt') in WEB_PIXEL_FORMATS
+                and video_info.get('audio_codec', 'aac') == 'aac'
+                and 0 < video_info.get('bitrate', 0) <= self.remux_max_bitrate)
+
+    def plan_conversion(self, video_info: Dict, chunked_min_duration: Optional[float] = None) -> str:
+        """'remux', 'segmented' or 'encode'"""
+        if self.is_web_compatible(video_info):
+            return 'remux'
+        if chunked_min_duration is not None and video_info.get('duration', 0) >= chunked_min_duration:
+            return 'segmented'
+        return 'encode'
+
+    def convert_video_segmented(self, input_path: str, output_path: str,
+                                jobs: Optional[int] = None) -> Optional[str]:
+        """convert_video for long sources: keyframe-aligned segments encoded in parallel.
+
+        Returns None on success or the error; the output is only kept once its
+        duration and stream layout have been checked against the source.
+        """
+        try:
+            segments = asyncio.run(encode_segmented(input_path, output_path,
+                                                    self.video_args(), self.audio_args(), jobs,
+                                                    self.media.get(input_path)))
+        except (SegmentEncodeError, OSError, ValueError) as e:
+            return str(e)
+        print(f"Encoded {os.path.basename(input_path)} as {segments} parallel segments")
+        return None
+
     def generate_new_filename(self, file_date: datetime, sequence: int, original_path: str) -> str:
         """Generate new filename based on date and sequence"""
         date_str = file_date.strftime('%Y%m%d')
         return f"{date_str}_{sequence:03d}.mp4"
 
+    def verify_conversion(self, original_path: str, output_path: str) -> Optional[str]:
+        """None when output_path is a complete conversion of original_path, else why not"""
+        output = probe_media(output_path)
+        if output is None:
+            return "output could not be probed"
+        source = self.media_info(original_path)
+        if source is None:
+            return None if output.duration > 0 else "output has no duration"
+        return verify_output(source, output)
+
+    def _plan_jobs(self, directory: str, output_dir: str, dry_run: bool,
+                   report: Optional[JsonlReportWriter], results: Dict,
+                   chunked_min_duration: Optional[float]) -> List[ConversionJob]:
+        """Date, sort and name every video; returns the conversions to run.
+
+        Files whose target name is taken or that already have their final
+        name are settled here (skipped or unchanged). In a dry run the plan
+        is only printed or reported, and no jobs are returned.
+        """
+        # Collect video files (leftover temporary outputs are never sources)
+        files_to_process = list(walk_files(directory, extensions=self.supported_formats,
+                                           exclude=DEFAULT_EXCLUDES + (TEMP_PREFIX + '*',)))
+        
+        print(f"Found {len(files_to_process)} video files to process...")
+        
+        # Probe all files concurrently up front; dates and dry-run info then come from the results
+        self.prefetch_probes([entry.path for entry in files_to_process])
+        
+        # Extract dates and sort
+        files_with_dates = []
+        for entry in files_to_process:
+            filepath = entry.path
+            file_date = self.get_video_date(filepath, entry.stat())
+            files_with_dates.append((file_date, filepath))
+            print(f"{os.path.basename(filepath)} -> {file_date.strftime('%Y-%m-%d %H:%M:%S')}")
+        
+        # Sort by date
+        files_with_dates.sort(key=lambda x: x[0])
+        
+        jobs = []
+        
+        # Track sequences per date
+        date_sequences = {}
+        
+        for file_date, original_path in files_with_dates:
+            # Get sequence number for this date
+            date_str = file_date.strftime('%Y%m%d')
+            if date_str not in date_sequences:
+                date_sequences[date_str] = 1
+            else:
+                date_sequences[date_str] += 1
+            
+            sequence = date_sequences[date_str]
+            
+            # Generate new filename
+            new_filename = self.generate_new_filename(file_date, sequence, original_path)
+            new_filepath = os.path.join(output_dir, new_filename)
+            
+            # Check if target already exists
+            if os.path.exists(new_filepath) and new_filepath != original_path:
+                if dry_run:
+                    print(f"[DRY RUN] WARNING: Target exists: {new_filename}")
+                else:
+                    print(f"Warning: Target exists, skipping: {new_filename}")
+                    results['skipped'] += 1
+                    if report is not None:
+                        report.write({'original': original_path, 'new': new_filepath,
+                                      'status': 'skipped', 'reason': 'target exists'})
+                    continue
+            
+            if dry_run:
+                print(f"[DRY RUN] {os.path.basename(original_path)} -> {new_filename}")
+                video_info = self.get_video_info(original_path)
+                print(f"          Video: {video_info.get('width')}x{video_info.get('height')}, {video_info.get('duration'):.1f}s")
+                action = self.plan_conversion(video_info, chunked_min_duration)
+                if action == 'remux':
+                    print("          Already web-compatible, would remux without re-encoding")
+                    results['remuxed'] += 1
+                elif action == 'segmented':
+                    print("          Would encode in parallel segments")
+                detail = {
+                    'original': original_path,
+                    'new': new_filepath,
+                    'date': file_date.isoformat(),
+                    'action': action,
+                    'info': video_info
+                }
+                if report is not None:
+                    report.write({**detail, 'status': 'planned'})
+                else:
+                    results['details'].append(detail)
+                results['processed'] += 1
+            elif original_path != new_filepath:
+                jobs.append(ConversionJob(original_path, new_filepath, file_date.isoformat()))
+            else:
+                print(f"No conversion needed: {new_filename}")
+                results['processed'] += 1
+                if report is not None:
+                    report.write({'original': original_path, 'new': new_filepath,
+                                  'date': file_date.isoformat(), 'status': 'unchanged'})
+        
+        return jobs
+
     def process_directory(self, directory: str, output_dir: str = None, 
-                         dry_run: bool = False, backup: bool = True) -> Dict:
-        """Process all videos in a directory"""
+                         dry_run: bool = False, backup: bool = True,
+                         report: JsonlReportWriter = None,
+                         slots: int = DEFAULT_VIDEO_SLOTS,
+                         chunked_min_duration: Optional[float] = None,
+                         hls_root: Optional[str] = None) -> Dict:
+        """Process all videos in a directory.
+
+        With a report sink, one record per video is streamed to it and
+        results['details'] stays empty. Up to `slots` ffmpeg encodes run at
+        once; each original is backed up before its encode starts and removed
+        only after it succeeds. Sources that are already web-compatible are
+        remuxed instead (see is_web_compatible). With chunked_min_duration,
+        sources at least that many seconds long are encoded segment-parallel,
+        one at a time.
+
+        The plan is journaled in a ConversionQueue before anything runs and
+        outputs are written under temporary names, checked against their
+        source and only then renamed into place. If a run is interrupted,
+        the next one resumes the queue with the same names instead of
+        rescanning; files added meanwhile are picked up by the run after.
+
+        With hls_root, every video converted in this run is then packaged as
+        an HLS rendition ladder under hls_root (see hls_package.py).
+        """
         
         if not os.path.exists(directory):
             raise ValueError(f"Directory {directory} does not exist")
@@ -207,108 +324,143 @@ class BatchVideoConverter:
         os.makedirs(output_dir, exist_ok=True)
         
         # Create backup directory if needed
-        backup_dir = None
+        backup_store = None
         if backup and not dry_run:
-            backup_dir = os.path.join(output_dir, 'original_backup')
-            os.makedirs(backup_dir, exist_ok=True)
-        
-        # Collect video files
-        files_to_process = []
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
-            if os.path.isfile(filepath):
-                ext = Path(filepath).suffix.lower()
-                if ext in self.supported_formats:
-                    files_to_process.append(filepath)
-        
-        print(f"Found {len(files_to_process)} video files to process...")
-        
-        # Extract dates and sort
-        files_with_dates = []
-        for filepath in files_to_process:
-            file_date = self.get_video_date(filepath)
-            files_with_dates.append((file_date, filepath))
-            print(f"{os.path.basename(filepath)} -> {file_date.strftime('%Y-%m-%d %H:%M:%S')}")
-        
-        # Sort by date
-        files_with_dates.sort(key=lambda x: x[0])
+            # Originals are removed once converted, so their backups may share the inode
+            backup_store = BackupStore(os.path.join(output_dir, 'original_backup'), allow_hardlink=True)
         
         # Process files
         results = {
             'processed': 0,
             'errors': 0,
             'skipped': 0,
+            'remuxed': 0,
             'details': []
         }
         
-        # Track sequences per date
-        date_sequences = {}
+        # Finish an interrupted run from its queue instead of rescanning, so names stay put
+        queue = None if dry_run else ConversionQueue.load(output_dir)
+        if dry_run and os.path.exists(os.path.join(output_dir, QUEUE_NAME)):
+            print("[DRY RUN] An interrupted conversion is queued; a real run resumes it first")
+        if queue is not None:
+            jobs = queue.recover()
+            print(f"Resuming interrupted conversion: {len(queue.jobs) - len(jobs)} of "
+                  f"{len(queue.jobs)} files already done")
+            self.prefetch_probes([job.original for job in jobs])
+        else:
+            jobs = self._plan_jobs(directory, output_dir, dry_run, report, results, chunked_min_duration)
+            if not dry_run:
+                queue = ConversionQueue(output_dir)
+                queue.plan(jobs)
         
-        for file_date, original_path in files_with_dates:
-            try:
-                # Get sequence number for this date
-                date_str = file_date.strftime('%Y%m%d')
-                if date_str not in date_sequences:
-                    date_sequences[date_str] = 1
-                else:
-                    date_sequences[date_str] += 1
-                
-                sequence = date_sequences[date_str]
-                
-                # Generate new filename
-                new_filename = self.generate_new_filename(file_date, sequence, original_path)
-                new_filepath = os.path.join(output_dir, new_filename)
-                
-                # Check if target already exists
-                if os.path.exists(new_filepath) and new_filepath != original_path:
-                    if dry_run:
-                        print(f"[DRY RUN] WARNING: Target exists: {new_filename}")
-                    else:
-                        print(f"Warning: Target exists, skipping: {new_filename}")
-                        results['skipped'] += 1
-                        continue
-                
-                if dry_run:
-                    print(f"[DRY RUN] {os.path.basename(original_path)} -> {new_filename}")
-                    video_info = self.get_video_info(original_path)
-                    print(f"          Video: {video_info.get('width')}x{video_info.get('height')}, {video_info.get('duration'):.1f}s")
-                    results['details'].append({
-                        'original': original_path,
-                        'new': new_filepath,
-                        'date': file_date.isoformat(),
-                        'info': video_info
-                    })
-                    results['processed'] += 1
-                else:
+        # Wall-clock seconds spent and media seconds handled, per kind of job
+        timings = {'encode': [0.0, 0.0], 'remux': [0.0, 0.0]}
+        converted = []
+        
+        def finish(job, action, duration, elapsed, error):
+            original_path = job.original
+            if error is None:
+                error = self.verify_conversion(original_path, job.temp_path)
+            if error is None:
+                try:
+                    os.replace(job.temp_path, job.target)
+                except OSError as e:
+                    error = f"could not move output into place: {e}"
+            if error is None:
+                queue.set_state(job, VERIFIED)
+                # Remove original after successful conversion
+                queue.remove_original(job)
+                verb = 'Remuxed' if action == 'remux' else 'Converted'
+                print(f"{verb}: {os.path.basename(original_path)} -> {os.path.basename(job.target)}")
+                results['processed'] += 1
+                converted.append(job.target)
+                timing = timings['remux' if action == 'remux' else 'encode']
+                timing[0] += elapsed
+                timing[1] += duration
+                if action == 'remux':
+                    results['remuxed'] += 1
+                status = 'remuxed' if action == 'remux' else 'converted'
+            else:
+                if os.path.exists(job.temp_path):
+                    os.remove(job.temp_path)
+                if not interrupted:         # Killed encodes stay queued, to be redone on resume
+                    queue.set_state(job, FAILED, error)
+                print(f"Error converting {os.path.basename(original_path)}: {error}")
+                results['errors'] += 1
+                status = 'error'
+            if report is not None:
+                record = {'original': original_path, 'new': job.target,
+                          'date': job.date, 'status': status,
+                          'action': action, 'seconds': round(elapsed, 3)}
+                if error is not None:
+                    record['error'] = error
+                report.write(record)
+        
+        def conversion_done(job, action, duration):
+            def on_done(result, error):
+                finish(job, action, duration, result.elapsed if result else 0.0, error)
+            return on_done
+        
+        # Encodes run concurrently; conversion_done verifies and does the per-file accounting
+        scheduler = None if dry_run else FFmpegScheduler(slots)
+        interrupted = False
+        
+        try:
+            for job in jobs:
+                original_path = job.original
+                try:
                     # Backup original if requested
-                    if backup_dir and original_path != new_filepath:
-                        backup_path = os.path.join(backup_dir, os.path.basename(original_path))
-                        # Handle duplicate backup names
-                        counter = 1
-                        while os.path.exists(backup_path):
-                            name, ext = os.path.splitext(os.path.basename(original_path))
-                            backup_path = os.path.join(backup_dir, f"{name}_{counter}{ext}")
-                            counter += 1
-                        shutil.copy2(original_path, backup_path)
+                    if backup_store:
+                        backup_store.store(original_path)
                     
-                    # Convert and rename
-                    if original_path != new_filepath:
-                        success = self.convert_video(original_path, new_filepath)
-                        if success:
-                            # Remove original after successful conversion
-                            os.remove(original_path)
-                            print(f"Converted: {os.path.basename(original_path)} -> {new_filename}")
-                            results['processed'] += 1
-                        else:
-                            print(f"Error converting: {os.path.basename(original_path)}")
-                            results['errors'] += 1
+                    # Convert (or just remux) under a temporary name
+                    video_info = self.get_video_info(original_path)
+                    action = self.plan_conversion(video_info, chunked_min_duration)
+                    on_done = conversion_done(job, action, video_info.get('duration', 0))
+                    queue.set_state(job, ENCODING)
+                    if action == 'remux':
+                        print(f"Remuxing (already web-compatible): {os.path.basename(original_path)}")
+                        scheduler.submit(self.remux_command(original_path, job.temp_path), on_done)
+                    elif action == 'segmented':
+                        print(f"Converting in parallel segments: {os.path.basename(original_path)}")
+                        started = time.monotonic()
+                        error = self.convert_video_segmented(original_path, job.temp_path)
+                        on_done(FFmpegResult(0, '', None, time.monotonic() - started), error)
                     else:
-                        print(f"No conversion needed: {new_filename}")
-                        results['processed'] += 1
-                
-            except Exception as e:
-                print(f"Error processing {original_path}: {e}")
-                results['errors'] += 1
+                        print(f"Converting: {os.path.basename(original_path)}")
+                        scheduler.submit(self.video_command(original_path, job.temp_path), on_done)
+                    
+                except Exception as e:
+                    print(f"Error processing {original_path}: {e}")
+                    results['errors'] += 1
+                    if report is not None:
+                        report.write({'original': original_path, 'status': 'error', 'error': str(e)})
+        except BaseException:
+            # Interrupted: kill running encodes so their partial outputs are discarded
+            interrupted = True
+            if scheduler is not None:
+                scheduler.cancel()
+            raise
+        finally:
+            if scheduler is not None:
+                scheduler.close()
+            if queue is not None and not queue.close():
+                print(f"Conversion queue kept at {queue.path}; re-run to resume")
+        
+        if hls_root is not None and converted:
+            print(f"\nPackaging {len(converted)} videos for adaptive streaming...")
+            hls_results = package_videos(converted, hls_root, slots, self.ffmpeg_settings['preset'])
+            results['hls_packaged'] = hls_results['packaged']
+            results['errors'] += hls_results['errors']
+        
+        # What the remuxed files would have cost at this run's encode speed
+        (encode_seconds, encoded_media), (remux_seconds, remuxed_media) = timings['encode'], timings['remux']
+        results['remux_seconds'] = round(remux_seconds, 1)
+        results['encode_seconds_saved'] = None
+        if encoded_media > 0 and remuxed_media > 0:
+            results['encode_seconds_saved'] = round(
+                max(0.0, remuxed_media * encode_seconds / encoded_media - remux_seconds), 1
+            )
         
         return results
 
@@ -321,6 +473,21 @@ def main():
     parser.add_argument('--dry-run', action='store_true', help='Preview changes without applying them')
     parser.add_argument('--no-backup', action='store_true', help='Skip creating backup of original files')
     parser.add_argument('--crf', type=int, default=28, help='CRF value for video quality (18-28, lower = better quality)')
+    parser.add_argument('--no-cache', action='store_true', help='Ignore the persistent metadata cache and re-probe every file')
+    parser.add_argument('--report', help='Stream a per-video JSONL report to this file')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_VIDEO_SLOTS,
+                        help=f'Videos encoded at once (default: {DEFAULT_VIDEO_SLOTS}; '
+                             f'each ffmpeg already uses several cores)')
+    parser.add_argument('--chunked', nargs='?', type=float, const=DEFAULT_MIN_DURATION, metavar='SECONDS',
+                        help=f'Encode videos at least SECONDS long (default: {DEFAULT_MIN_DURATION}) as '
+                             f'keyframe-aligned segments in parallel, one video at a time')
+    parser.add_argument('--remux-max-bitrate', type=int, default=DEFAULT_REMUX_MAX_BITRATE // 1000, metavar='KBPS',
+                        help=f'Remux H.264/AAC sources up to this bitrate instead of re-encoding them '
+                             f'(default: {DEFAULT_REMUX_MAX_BITRATE // 1000})')
+    parser.add_argument('--no-remux', action='store_true', help='Re-encode every video, even web-compatible ones')
+    parser.add_argument('--hls', nargs='?', const='', metavar='DIR',
+                        help='Also package each converted video as an adaptive HLS ladder under DIR '
+                             '(default: <output>/hls); see hls_package.py for existing videos')
     
     args = parser.parse_args()
     
@@ -333,18 +500,33 @@ def main():
         print("Please install FFmpeg: https://ffmpeg.org/download.html")
         return 1
     
-    converter = BatchVideoConverter()
+    metadata_cache = None if args.no_cache else MetadataCache()
+    converter = BatchVideoConverter(metadata_cache)
     
     # Update CRF setting if provided
     if args.crf:
         converter.ffmpeg_settings['crf'] = str(args.crf)
+    converter.remux_max_bitrate = None if args.no_remux else args.remux_max_bitrate * 1000
+    
+    hls_root = None
+    if args.hls is not None:
+        hls_root = args.hls or os.path.join(args.output or args.directory, 'hls')
+    
+    report_sink = None
+    if args.report:
+        report_sink = JsonlReportWriter(args.report, tool='batch_video_converter',
+                                        directory=args.directory, dry_run=args.dry_run)
     
     try:
         results = converter.process_directory(
             directory=args.directory,
             output_dir=args.output,
             dry_run=args.dry_run,
-            backup=not args.no_backup
+            backup=not args.no_backup,
+            report=report_sink,
+            slots=args.jobs,
+            chunked_min_duration=args.chunked,
+            hls_root=hls_root
         )
         
         print(f"\n{'=' * 50}")
@@ -353,14 +535,31 @@ def main():
         print(f"Processed: {results['processed']}")
         print(f"Errors: {results['errors']}")
         print(f"Skipped: {results['skipped']}")
+        print(f"Remuxed without re-encoding: {results['remuxed']}")
+        if 'hls_packaged' in results:
+            print(f"Packaged for HLS: {results['hls_packaged']}")
+        if results.get('encode_seconds_saved') is not None:
+            print(f"Encode time saved: ~{results['encode_seconds_saved']:.0f}s "
+                  f"(remuxing took {results['remux_seconds']:.0f}s)")
         
         if args.dry_run:
             print(f"\nTo apply these changes, run without --dry-run")
             print(f"Note: Requires FFmpeg for video conversion")
         
+        if report_sink is not None:
+            report_sink.close({key: results.get(key) for key in ('processed', 'errors', 'skipped', 'remuxed',
+                                                                 'remux_seconds', 'encode_seconds_saved',
+                                                                 'hls_packaged')})
+            print(f"Report saved to: {args.report}")
+        
     except Exception as e:
         print(f"Error: {e}")
         return 1
+    finally:
+        if report_sink is not None:
+            report_sink.close(complete=False)   # No-op after a successful close(summary)
+        if metadata_cache:
+            metadata_cache.close()
     
     return 0
 
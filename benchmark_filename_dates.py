@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Filename Date Matcher Benchmark
+Compares the shared precompiled matcher against the old per-module implementations
+"""
+
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from filename_dates import renamer_matcher, converter_matcher, video_matcher
+
+
+# Per-module implementations as they were before filename_dates.py existed,
+# kept here so the benchmark has something to compare against.
+
+def legacy_renamer_date(filename: str) -> Optional[datetime]:
+    """simple_batch_renamer.SimpleBatchRenamer._get_filename_date"""
+    patterns = [
+        (r'(\d{8})_(\d{3})', lambda m: datetime.strptime(m.group(1), '%Y%m%d')),
+        (r'PXL_(\d{8})_(\d{6})', lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}", '%Y%m%d%H%M%S')),
+        (r'IMG_(\d{8})_(\d{6})', lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}", '%Y%m%d%H%M%S')),
+        (r'Screenshot (\d{4})-(\d{2})-(\d{2}) at (\d{2})\.(\d{2})\.(\d{2})',
+         lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}{m.group(3)}{m.group(4)}{m.group(5)}{m.group(6)}", '%Y%m%d%H%M%S')),
+        (r'(\d{8})_(\d{6})', lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}", '%Y%m%d%H%M%S')),
+        (r'(\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})',
+         lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}{m.group(3)}{m.group(4)}{m.group(5)}{m.group(6)}", '%Y%m%d%H%M%S')),
+        (r'(\d{8})', lambda m: datetime.strptime(m.group(1), '%Y%m%d')),
+        (r'(\d{4})-(\d{2})-(\d{2})', lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}{m.group(3)}", '%Y%m%d')),
+        (r'^DSC\d+', lambda m: datetime(2024, 1, 1)),
+        (r'^HPIM\d+', lambda m: datetime(2020, 1, 1)),
+        (r'^IMG_\d+', lambda m: datetime(2023, 6, 1)),
+        (r'^\d+$', lambda m: datetime(2022, 1, 1)),
+    ]
+    for pattern, date_func in patterns:
+        match = re.search(pattern, filename)
+        if match:
+            try:
+                return date_func(match)
+            except:
+                continue
+    return None
+
+
+def legacy_converter_date(filename: str) -> Optional[datetime]:
+    """batch_convert_rename.BatchConverter._get_filename_date"""
+    patterns = [
+        (r'PXL_(\d{8})_(\d{6})', '%Y%m%d%H%M%S'),
+        (r'IMG_(\d{8})_(\d{6})', '%Y%m%d%H%M%S'),
+        (r'(\d{8})_(\d{6})', '%Y%m%d%H%M%S'),
+        (r'(\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})', '%Y-%m-%d_%H-%M-%S'),
+        (r'(\d{8})', '%Y%m%d'),
+        (r'(\d{4})-(\d{2})-(\d{2})', '%Y-%m-%d'),
+    ]
+    for pattern, fmt in patterns:
+        match = re.search(pattern, filename)
+        if match:
+            try:
+                date_str = ''.join(match.groups())
+                return datetime.strptime(date_str, fmt.replace('-', '').replace('_', '').replace(':', ''))
+            except:
+                continue
+    return None
+
+
+def legacy_video_date(filename: str) -> Optional[datetime]:
+    """batch_video_converter.BatchVideoConverter._get_filename_date"""
+    patterns = [
+        (r'(\d{8})_(\d{3})', lambda m: datetime.strptime(m.group(1), '%Y%m%d')),
+        (r'^VID\d+', lambda m: datetime(2020, 1, 1)),
+        (r'^MOV\d+', lambda m: datetime(2021, 1, 1)),
+        (r'^(\d{4})-(\d{4})', lambda m: datetime(2023, 1, 1)),
+        (r'^[a-zA-Z]', lambda m: datetime(2024, 1, 1)),
+    ]
+    for pattern, date_func in patterns:
+        match = re.search(pattern, filename, re.IGNORECASE)
+        if match:
+            try:
+                return date_func(match)
+            except:
+                continue
+    return None
+
+
+def synthetic_filenames(count: int, seed: int = 1) -> List[str]:
+    """Generate filenames covering every convention the tools recognise"""
+    rng = random.Random(seed)
+
+    def ymd():
+        return rng.randint(2000, 2025), rng.randint(1, 12), rng.randint(1, 28)
+
+    def hms():
+        return rng.randint(0, 23), rng.randint(0, 59), rng.randint(0, 59)
+
+    def make() -> str:
+        kind = rng.randrange(14)
+        y, mo, d = ymd()
+        h, mi, s = hms()
+        if kind == 0:
+            return f"{y}{mo:02d}{d:02d}_{rng.randint(1, 999):03d}.jpg"
+        if kind == 1:
+            return f"PXL_{y}{mo:02d}{d:02d}_{h:02d}{mi:02d}{s:02d}{rng.randint(0, 999):03d}.MP.jpg"
+        if kind == 2:
+            return f"IMG_{y}{mo:02d}{d:02d}_{h:02d}{mi:02d}{s:02d}.jpg"
+        if kind == 3:
+            return f"Screenshot {y}-{mo:02d}-{d:02d} at {h:02d}.{mi:02d}.{s:02d}.png"
+        if kind == 4:
+            return f"{y}-{mo:02d}-{d:02d}_{h:02d}-{mi:02d}-{s:02d}.jpg"
+        if kind == 5:
+            return f"{y}-{mo:02d}-{d:02d}.jpg"
+        if kind == 6:
+            return f"DSC{rng.randint(0, 99999):05d}.JPG"
+        if kind == 7:
+            return f"HPIM{rng.randint(0, 9999):04d}.JPG"
+        if kind == 8:
+            return f"IMG_{rng.randint(0, 9999):04d}.jpg"
+        if kind == 9:
+            return f"MOV{rng.randint(0, 99999):05d}.AVI"
+        if kind == 10:
+            return f"VID{rng.randint(0, 99999):05d}.mp4"
+        if kind == 11:
+            return f"{rng.randint(0, 9999):04d}-{rng.randint(0, 9999):04d}.mp4"
+        if kind == 12:
+            # Impossible dates exercise the fall-through path
+            return f"{y}{rng.randint(13, 99)}{d:02d}_{h:02d}{mi:02d}{s:02d}.jpg"
+        return f"{rng.choice(['halls of futility', 'monsterblood', 'vacation'])}.mp4"
+
+    return [make() for _ in range(count)]
+
+
+def time_function(func: Callable[[str], Optional[datetime]], filenames: List[str]) -> float:
+    start = time.perf_counter()
+    for filename in filenames:
+        func(filename)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark filename date matching')
+    parser.add_argument('-n', '--count', type=int, default=1_000_000,
+                       help='Number of synthetic filenames (default: 1,000,000)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for filename generation')
+    args = parser.parse_args()
+
+    print(f"Generating {args.count:,} synthetic filenames...")
+    filenames = synthetic_filenames(args.count, args.seed)
+
+    cases = [
+        ('simple_batch_renamer', legacy_renamer_date, renamer_matcher.match),
+        ('batch_convert_rename', legacy_converter_date, converter_matcher.match),
+        ('batch_video_converter', legacy_video_date, video_matcher.match),
+    ]
+
+    print(f"\n{'Module':<24}{'legacy files/s':>16}{'shared files/s':>16}{'speedup':>10}")
+    print('-' * 66)
+    for name, legacy, shared in cases:
+        # Results must be identical before the timings mean anything
+        sample = filenames[:20000]
+        mismatches = [f for f in sample if legacy(f) != shared(f)]
+        if mismatches:
+            print(f"{name}: {len(mismatches)} mismatches, e.g. {mismatches[0]!r}")
+            return 1
+
+        legacy_time = time_function(legacy, filenames)
+        shared_time = time_function(shared, filenames)
+        print(f"{name:<24}{args.count / legacy_time:>16,.0f}{args.count / shared_time:>16,.0f}"
+              f"{legacy_time / shared_time:>9.1f}x")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,440 @@
+#!/usr/bin/env python3
+"""
+Media Library Benchmark
+Builds a synthetic library of real EXIF-tagged JPEGs, PNG screenshots and ID3-tagged
+MP3s, times every stage of the renaming and database tools, and writes JSON results
+that can be compared between versions
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from backup_store import BackupStore
+from batch_convert_rename import BatchConverter
+from dedupe import find_duplicates
+from generate_drawings_db import generate_drawings_database
+from generate_photos_db import generate_photos_database
+from generate_songs_db import generate_songs_database
+from generate_videos_db import generate_videos_database
+from media_walker import walk_files
+from metadata_cache import MetadataCache
+from parallel_extract import extract_metadata
+from rename_planner import RenamePlanner, apply_journal
+from simple_batch_renamer import SimpleBatchRenamer
+
+RESULTS_VERSION = 1
+
+# Baseline JPEG tables: every DC category (0-11) gets a 4-bit code and the only
+# AC symbol is end-of-block, so each 8x8 block is one flat shade
+_DC_BITS = bytes([0, 0, 0, 12] + [0] * 12)
+_AC_BITS = bytes([1] + [0] * 15)
+
+# One MPEG-1 Layer III frame: 128 kbps, 44.1 kHz, mono, silent (417 bytes)
+_MP3_FRAME = b'\xff\xfb\x90\xc4' + bytes(413)
+_MP3_FRAME_SECONDS = 1152 / 44100
+
+# 1x1 lossless WebP; the drawings database only looks at names and sizes
+_WEBP_PIXEL = (b'RIFF\x1e\x00\x00\x00WEBPVP8L\x11\x00\x00\x00/\x00\x00\x00\x00\x07P'
+               b'\xbc"\x17\xa5\xff\x81\x88\xe8\x7f\x00\x00')
+
+_CAMERAS = [('Google', 'Pixel 8'), ('SONY', 'DSC-RX100'), ('HP', 'Photosmart R707'), ('Apple', 'iPhone 13')]
+
+
+def _segment(marker: int, payload: bytes) -> bytes:
+    return b'\xff' + bytes([marker]) + struct.pack('>H', len(payload) + 2) + payload
+
+
+def _exif_segment(taken: datetime, make: str, model: str) -> bytes:
+    """APP1 segment with Make, Model, DateTime and an Exif IFD holding DateTimeOriginal"""
+    stamp = taken.strftime('%Y:%m:%d %H:%M:%S').encode() + b'\0'
+    make_b = make.encode() + b'\0'
+    model_b = model.encode() + b'\0'
+
+    make_at = 8 + 2 + 4 * 12 + 4
+    model_at = make_at + len(make_b)
+    stamp_at = model_at + len(model_b)
+    exif_ifd_at = stamp_at + len(stamp)
+
+    ifd0 = struct.pack('<H', 4)
+    ifd0 += struct.pack('<HHII', 0x010F, 2, len(make_b), make_at)
+    ifd0 += struct.pack('<HHII', 0x0110, 2, len(model_b), model_at)
+    ifd0 += struct.pack('<HHII', 0x0132, 2, len(stamp), stamp_at)
+    ifd0 += struct.pack('<HHII', 0x8769, 4, 1, exif_ifd_at)
+    ifd0 += struct.pack('<I', 0)
+    exif_ifd = struct.pack('<H', 1)
+    exif_ifd += struct.pack('<HHII', 0x9003, 2, len(stamp), exif_ifd_at + 2 + 12 + 4)
+    exif_ifd += struct.pack('<I', 0)
+
+    tiff = b'II*\0' + struct.pack('<I', 8) + ifd0 + make_b + model_b + stamp + exif_ifd + stamp
+    return _segment(0xE1, b'Exif\0\0' + tiff)
+
+
+def make_jpeg(width: int, height: int, seed: int, exif: bytes = b'') -> bytes:
+    """Encode a small grayscale baseline JPEG with a per-seed gradient"""
+    bits = []
+    previous = 0
+    for by in range((height + 7) // 8):
+        for bx in range((width + 7) // 8):
+            level = (bx * 7 + by * 13 + seed * 29) % 256
+            dc = 8 * (level - 128)
+            diff, previous = dc - previous, dc
+            category = abs(diff).bit_length()
+            bits.append(format(category, '04b'))
+            if category:
+                bits.append(format(diff if diff > 0 else diff + (1 << category) - 1, f'0{category}b'))
+            bits.append('0')  # End of block
+
+    stream = ''.join(bits)
+    stream += '1' * (-len(stream) % 8)
+    scan = int(stream, 2).to_bytes(len(stream) // 8, 'big').replace(b'\xff', b'\xff\x00')
+
+    return b''.join([
+        b'\xff\xd8',
+        exif,
+        _segment(0xDB, b'\x00' + bytes([1] * 64)),
+        _segment(0xC0, struct.pack('>BHHB', 8, height, width, 1) + bytes([1, 0x11, 0])),
+        _segment(0xC4, b'\x00' + _DC_BITS + bytes(range(12))),
+        _segment(0xC4, b'\x10' + _AC_BITS + b'\x00'),
+        _segment(0xDA, bytes([1, 1, 0x00, 0, 63, 0])),
+        scan,
+        b'\xff\xd9',
+    ])
+
+
+def make_png(width: int, height: int, seed: int) -> bytes:
+    """Encode a small grayscale PNG"""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    rows = b''.join(b'\x00' + bytes((x + y * 3 + seed) % 256 for x in range(width)) for y in range(height))
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows))
+            + chunk(b'IEND', b''))
+
+
+def _syncsafe(size: int) -> bytes:
+    return bytes([(size >> 21) & 0x7F, (size >> 14) & 0x7F, (size >> 7) & 0x7F, size & 0x7F])
+
+
+def make_mp3(title: str, artist: str, recorded: datetime, seconds: float) -> bytes:
+    """ID3v2.4 tag (title, artist, album, recording date) followed by silent MPEG frames"""
+    frames = b''
+    for frame_id, text in (('TIT2', title), ('TPE1', artist), ('TALB', 'Synthetic Sessions'),
+                           ('TDRC', recorded.strftime('%Y-%m-%dT%H:%M:%S'))):
+        payload = b'\x03' + text.encode('utf-8')
+        frames += frame_id.encode() + _syncsafe(len(payload)) + b'\x00\x00' + payload
+    tag = b'ID3\x04\x00\x00' + _syncsafe(len(frames)) + frames
+    return tag + _MP3_FRAME * max(1, int(seconds / _MP3_FRAME_SECONDS))
+
+
+def _write(path: str, data: bytes):
+    with open(path, 'wb') as f:
+        f.write(data)
+
+
+def build_library(root: str, photos: int, audio: int, drawings: int, videos: int = 0,
+                  duplicates: float = 0.05, image_size=(256, 192), seed: int = 1) -> Dict[str, int]:
+    """Create root/inbox (unsorted camera files) and root/library (already renamed media).
+
+    Inbox photos use every naming convention the tools recognise, and DSC files
+    carry their date only in EXIF. A fraction of inbox files are exact copies.
+    """
+    rng = random.Random(seed)
+    inbox = os.path.join(root, 'inbox')
+    library = {kind: os.path.join(root, 'library', kind) for kind in ('photos', 'drawings', 'audio', 'videos')}
+    for path in [inbox, *library.values()]:
+        os.makedirs(path, exist_ok=True)
+
+    start = datetime(2015, 1, 1)
+    span = int((datetime(2025, 12, 31) - start).total_seconds())
+
+    def random_date():
+        return start + timedelta(seconds=rng.randrange(span))
+
+    width, height = image_size
+    inbox_files = []
+    library_sequence = {}
+    for i in range(photos):
+        taken = random_date()
+        make, model = _CAMERAS[i % len(_CAMERAS)]
+        style = i % 5
+        if style == 4:
+            name = f"Screenshot {taken:%Y-%m-%d} at {taken:%H.%M.%S}.png"
+            data = make_png(width // 2, height // 2, i)
+        else:
+            name = [f"PXL_{taken:%Y%m%d_%H%M%S}{i % 1000:03d}.jpg",
+                    f"IMG_{taken:%Y%m%d_%H%M%S}.jpg",
+                    f"DSC{i:05d}.JPG",
+                    f"{taken:%Y-%m-%d_%H-%M-%S}.jpg"][style]
+            data = make_jpeg(width, height, i, _exif_segment(taken, make, model))
+        inbox_files.append(os.path.join(inbox, name))
+        _write(inbox_files[-1], data)
+
+        date_str = taken.strftime('%Y%m%d')
+        library_sequence[date_str] = library_sequence.get(date_str, 0) + 1
+        if style != 4:
+            _write(os.path.join(library['photos'], f"{date_str}_{library_sequence[date_str]:03d}.jpg"), data)
+
+    for i in range(audio):
+        recorded = random_date()
+        data = make_mp3(f"Take {i + 1}", 'EXTANTRA', recorded, rng.uniform(2, 8))
+        name = f"{recorded:%Y%m%d_%H%M%S}.mp3" if i % 2 else f"Track {i + 1:03d}.mp3"
+        inbox_files.append(os.path.join(inbox, name))
+        _write(inbox_files[-1], data)
+        _write(os.path.join(library['audio'], name), data)
+
+    for i in range(drawings):
+        _write(os.path.join(library['drawings'], f"{random_date():%Y%m%d}_{i + 1:03d}.webp"), _WEBP_PIXEL)
+
+    copies = int(len(inbox_files) * duplicates)
+    for i, path in enumerate(rng.sample(inbox_files, copies)):
+        stem, ext = os.path.splitext(os.path.basename(path))
+        shutil.copyfile(path, os.path.join(inbox, f"{stem} (copy {i}){ext}"))
+
+    created_videos = 0
+    if videos and shutil.which('ffmpeg'):
+        for i in range(videos):
+            output = os.path.join(library['videos'], f"{random_date():%Y%m%d}_{i + 1:03d}.mp4")
+            subprocess.run(['ffmpeg', '-v', 'error', '-y', '-f', 'lavfi', '-i', 'testsrc=d=1:s=320x240:r=24',
+                            '-pix_fmt', 'yuv420p', output], check=True)
+            created_videos += 1
+
+    return {'inbox': len(inbox_files) + copies, 'duplicates': copies,
+            'photos': sum(1 for _ in os.scandir(library['photos'])),
+            'audio': audio, 'drawings': drawings, 'videos': created_videos}
+
+
+class StageTimer:
+    """Runs each stage repeat times (fresh setup each run, untimed) and keeps the best time"""
+
+    def __init__(self, repeat: int, quiet: bool = True):
+        self.repeat = repeat
+        self.quiet = quiet
+        self.stages: Dict[str, Dict] = {}
+
+    def run(self, name: str, files: int, stage: Callable, setup: Optional[Callable] = None):
+        runs = []
+        for _ in range(self.repeat):
+            state = setup() if setup else None
+            with open(os.devnull, 'w') as sink, contextlib.ExitStack() as stack:
+                if self.quiet:
+                    stack.enter_context(contextlib.redirect_stdout(sink))
+                started = time.perf_counter()
+                stage(state) if setup else stage()
+                runs.append(time.perf_counter() - started)
+        best = min(runs)
+        self.stages[name] = {
+            'files': files,
+            'seconds': round(best, 6),
+            'runs': [round(r, 6) for r in runs],
+            'files_per_sec': round(files / best, 1) if best > 0 else None,
+        }
+        print(f"  {name:<28} {best:9.4f}s  {self.stages[name]['files_per_sec'] or 0:>12,.0f} files/s")
+
+
+def run_benchmarks(root: str, counts: Dict[str, int], repeat: int, jobs: Optional[int]) -> Dict[str, Dict]:
+    inbox = os.path.join(root, 'inbox')
+    library = os.path.join(root, 'library')
+    scratch = os.path.join(root, 'scratch')
+    timer = StageTimer(repeat)
+    renamer = SimpleBatchRenamer()
+    run_index = [0]
+
+    def fresh(name):
+        """New empty scratch directory per run"""
+        run_index[0] += 1
+        path = os.path.join(scratch, f"{name}-{run_index[0]}")
+        os.makedirs(path)
+        return path
+
+    def fresh_inbox(name):
+        """Copy of the inbox per run, for stages that rename files"""
+        path = fresh(name)
+        shutil.copytree(inbox, path, dirs_exist_ok=True)
+        return path
+
+    entries = list(walk_files(inbox))
+    total = len(entries)
+
+    timer.run('scan', total, lambda: list(walk_files(inbox)))
+    timer.run('dedupe', total, lambda: find_duplicates(((e.path, e.stat().st_size) for e in entries), jobs))
+
+    # Date extraction
+    timer.run('renamer.dates', total, lambda: extract_metadata(entries, renamer.probe_file, jobs))
+    converter_items = [(entry, BatchConverter().detect_file_type(entry.name)) for entry in entries]
+
+    def converter_dates(cache_path):
+        with MetadataCache(cache_path) as cache:
+            extract_metadata(converter_items, BatchConverter(cache).probe_file, jobs)
+
+    timer.run('converter.dates.nocache', total,
+              lambda: extract_metadata(converter_items, BatchConverter().probe_file, jobs))
+    timer.run('converter.dates.cold', total, converter_dates,
+              setup=lambda: os.path.join(fresh('cache'), 'metadata.sqlite3'))
+    warm_cache = os.path.join(fresh('cache'), 'metadata.sqlite3')
+    converter_dates(warm_cache)
+    timer.run('converter.dates.warm', total, lambda: converter_dates(warm_cache))
+
+    # Backup into a fresh content-addressed store
+    def backup(backup_dir):
+        store = BackupStore(backup_dir)
+        for entry in entries:
+            store.store(entry.path)
+
+    timer.run('backup', total, backup, setup=lambda: fresh('backup'))
+
+    # Rename alone: the plan is computed once, only planning and applying it is timed
+    dated = sorted(extract_metadata(entries, renamer.probe_file, jobs))
+    sequences = {}
+    mapping = []
+    for file_date, path, category in dated:
+        date_str = file_date.strftime('%Y%m%d')
+        sequences[date_str] = sequences.get(date_str, 0) + 1
+        mapping.append((os.path.basename(path),
+                        renamer.generate_new_filename(file_date, sequences[date_str], 'date_sequence', path, category)))
+
+    def rename(directory):
+        planner = RenamePlanner(directory)
+        for old, new in mapping:
+            planner.add(os.path.join(directory, old), os.path.join(directory, new))
+        steps, _ = planner.resolve()
+        planner.write_journal(steps)
+        apply_journal(directory, steps)
+
+    timer.run('rename', total, rename, setup=lambda: fresh_inbox('rename'))
+
+    # Whole tools on a copy of the inbox
+    timer.run('renamer.end_to_end', total,
+              lambda directory: renamer.process_directory(directory, jobs=jobs),
+              setup=lambda: fresh_inbox('renamer'))
+    timer.run('converter.end_to_end', total,
+              lambda directory: BatchConverter().process_directory(directory, jobs=jobs),
+              setup=lambda: fresh_inbox('converter'))
+
+    # Database generators
+    timer.run('db.photos', counts['photos'],
+              lambda: generate_photos_database(os.path.join(library, 'photos')))
+    if counts['drawings']:
+        timer.run('db.drawings', counts['drawings'],
+                  lambda: generate_drawings_database(os.path.join(library, 'drawings'),
+                                                     os.path.join(scratch, 'drawings-database.json')))
+    timer.run('db.songs', counts['audio'],
+              lambda: generate_songs_database(audio_dir=os.path.join(library, 'audio'),
+                                              output_file=os.path.join(scratch, 'songs-database.json')))
+    if counts['videos'] and shutil.which('ffprobe'):
+        timer.run('db.videos', counts['videos'],
+                  lambda: generate_videos_database(os.path.join(library, 'videos'),
+                                                   db_path=os.path.join(scratch, 'videos-database.json')))
+
+    return timer.stages
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_results(current: Dict, previous: Dict, threshold: float) -> List[str]:
+    """Print per-stage ratios against a previous run; returns the stages slower than threshold"""
+    regressions = []
+    print(f"\nCompared with {previous.get('git_commit') or 'previous run'} ({previous.get('created', '?')}):")
+    for name, stage in current['stages'].items():
+        before = previous.get('stages', {}).get(name)
+        if not before or not before.get('seconds'):
+            print(f"  {name:<28} (new stage)")
+            continue
+        ratio = stage['seconds'] / before['seconds']
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(name)
+        print(f"  {name:<28} {before['seconds']:9.4f}s -> {stage['seconds']:9.4f}s  x{ratio:5.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the media tools on a synthetic library')
+    parser.add_argument('--photos', type=int, default=2000, help='Inbox/library photos and screenshots (default: 2000)')
+    parser.add_argument('--audio', type=int, default=300, help='ID3-tagged MP3s (default: 300)')
+    parser.add_argument('--drawings', type=int, default=500, help='Library drawings (default: 500)')
+    parser.add_argument('--videos', type=int, default=0, help='Test clips for the videos database (needs FFmpeg)')
+    parser.add_argument('--duplicates', type=float, default=0.05, help='Fraction of inbox files copied (default: 0.05)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per stage, best time is kept (default: 3)')
+    parser.add_argument('-j', '--jobs', type=int, help='Worker threads for the tools (default: automatic)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the synthetic library')
+    parser.add_argument('--workdir', help='Where to build the library (default: a temporary directory)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated library')
+    parser.add_argument('-o', '--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Previous JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Slowdown that counts as a regression with --compare (default: 0.15)')
+    args = parser.parse_args()
+
+    root = args.workdir or tempfile.mkdtemp(prefix='media-bench-')
+    os.makedirs(root, exist_ok=True)
+    # Keep the benchmark away from the user's persistent metadata cache
+    os.environ.setdefault('EXTANTRA_METADATA_CACHE', os.path.join(root, 'default-cache.sqlite3'))
+
+    try:
+        print(f"Building synthetic library in {root}...")
+        started = time.perf_counter()
+        counts = build_library(root, args.photos, args.audio, args.drawings, args.videos,
+                               args.duplicates, seed=args.seed)
+        print(f"  {counts} in {time.perf_counter() - started:.1f}s\n")
+
+        print("Stages (best of {}):".format(args.repeat))
+        stages = run_benchmarks(root, counts, args.repeat, args.jobs)
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    results = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now().isoformat(),
+        'git_commit': _git_commit(),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': {'photos': args.photos, 'audio': args.audio, 'drawings': args.drawings,
+                   'videos': counts['videos'], 'duplicates': args.duplicates, 'repeat': args.repeat,
+                   'jobs': args.jobs, 'seed': args.seed},
+        'counts': counts,
+        'stages': stages,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to: {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('config') != results['config']:
+            print("Warning: Previous results used a different configuration")
+        if compare_results(results, previous, args.threshold):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Incremental Site Catalog Builder
+Writes every *-database.json in one run, re-reading only the media files added or
+changed since the last build and carrying every other entry over unchanged
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from generate_derivatives import load_derivatives
+from generate_drawings_db import assemble_drawings_database, drawing_entry, list_drawings
+from generate_photos_db import assemble_photos_database, list_photos, photo_entry
+from generate_songs_db import assemble_songs_database, list_songs, song_entry
+from gallery_shards import manifest_name, write_shards
+from generate_videos_db import assemble_videos_database, list_videos, video_entries
+from metadata_cache import MetadataCache
+
+# Size and mtime of every file each catalog was last built from (dotfiles are not served)
+STATE_NAME = '.catalog-state.json'
+
+# The generators live in the site root, next to the media directories
+DEFAULT_SITE_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Build-time keys that change on every run and say nothing about the content
+TIMESTAMP_KEYS = ('generated', 'generated_date')
+
+
+class Catalog(NamedTuple):
+    name: str
+    directory: str          # Media directory, relative to the site root
+    database: str           # Database file, relative to the site root
+    list_key: str           # Where the entries live in the database
+    list_files: Callable[[str], Dict[str, os.stat_result]]
+    # (media_dir, filename, stat, metadata cache) -> entry without position-dependent fields
+    build_entry: Callable[[str, str, os.stat_result, Optional[MetadataCache]], Dict]
+    # (entries in filename order, media_dir) -> complete database
+    assemble: Callable[[List[Dict], str], Dict]
+    ensure_ascii: bool = False
+    # Fields kept from the previous entry when a changed file is re-read
+    keep: Tuple[str, ...] = ()
+    # Optional (media_dir, [(filename, stat)], cache) -> entries in that order (None where a
+    # file could not be read), reading the files together (used instead of build_entry so
+    # video probes run concurrently)
+    build_entries: Optional[Callable[[str, List[Tuple[str, os.stat_result]], Optional[MetadataCache]],
+                                     List[Dict]]] = None
+    # Also write paged, content-hashed shards and a manifest for the gallery page
+    shards: bool = False
+
+
+CATALOGS = (
+    Catalog('photos', 'photos', 'photos-database.json', 'photos', list_photos,
+            lambda media_dir, filename, st, cache: photo_entry(media_dir, filename, st),
+            lambda entries, media_dir: assemble_photos_database(entries, load_derivatives(media_dir)),
+            ensure_ascii=True, shards=True),
+    Catalog('drawings', 'drawings', 'drawings-database.json', 'drawings', list_drawings,
+            lambda media_dir, filename, st, cache: drawing_entry(media_dir, filename, st),
+            lambda entries, media_dir: assemble_drawings_database(entries, load_derivatives(media_dir)),
+            shards=True),
+    Catalog('songs', 'audio', 'songs-database.json', 'songs', list_songs,
+            lambda media_dir, filename, st, cache: song_entry(media_dir, filename, st),
+            lambda entries, media_dir: assemble_songs_database(entries),
+            keep=('added_date', 'tags', 'plays')),
+    Catalog('videos', 'videos', 'videos-database.json', 'videos', list_videos,
+            None,
+            assemble_videos_database, ensure_ascii=True, keep=('tags',),
+            build_entries=video_entries),
+)
+
+
+def signature(st: os.stat_result) -> List[int]:
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _load_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _without_timestamps(database: Dict) -> Dict:
+    """The database minus its build timestamps, for deciding whether anything changed"""
+    stripped = {key: value for key, value in database.items() if key not in TIMESTAMP_KEYS}
+    if isinstance(stripped.get('metadata'), dict):
+        stripped['metadata'] = {key: value for key, value in stripped['metadata'].items()
+                                if key not in TIMESTAMP_KEYS}
+    return stripped
+
+
+def write_json_atomic(path: str, data: Dict, ensure_ascii: bool = False):
+    """Write through a temporary file, so the site never serves a half-written database"""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=ensure_ascii)
+    os.replace(tmp, path)
+
+
+def build_catalog(catalog: Catalog, site_root: str, previous_state: Dict[str, List[int]],
+                  cache: Optional[MetadataCache] = None, full: bool = False) -> Optional[Dict]:
+    """Bring one database up to date; returns counts and the catalog's new state.
+
+    A file is re-read only if it is new, its size or mtime differs from the
+    last build (or full is set), or the previous database has no entry for
+    it. Everything else is taken from the previous database as it was; a
+    re-read entry still keeps the catalog's `keep` fields (such as a song's
+    added_date). Position-dependent fields (ids, numbered titles) and links
+    to derivatives and HLS packages are recomputed for every entry, which
+    costs no file reads. The database is only rewritten if it changed.
+
+    A file that cannot be read keeps its previous entry (a new one is left
+    out) and is left out of the new state, so the next build tries it again
+    instead of carrying a blank entry over for good.
+    """
+    media_dir = os.path.join(site_root, catalog.directory)
+    db_path = os.path.join(site_root, catalog.database)
+    if not os.path.isdir(media_dir):
+        print(f"{catalog.name}: {media_dir} not found, skipping")
+        return None
+
+    files = catalog.list_files(media_dir)
+    previous_db = _load_json(db_path)
+    if full:
+        previous_state = {}
+    previous_entries = {}
+    if previous_db:
+        previous_entries = {entry['filename']: entry for entry in previous_db.get(catalog.list_key, [])}
+
+    counts = {'added': 0, 'changed': 0, 'carried': 0, 'failed': 0,
+              'removed': len(set(previous_entries) - set(files))}
+    entries = {}
+    stale = []
+    for filename in sorted(files):
+        st = files[filename]
+        previous = previous_entries.get(filename)
+        if previous is not None and previous_state.get(filename) == signature(st):
+            entries[filename] = previous
+            counts['carried'] += 1
+        else:
+            counts['changed' if previous is not None else 'added'] += 1
+            stale.append((filename, st))
+
+    if catalog.build_entries is not None:
+        try:
+            rebuilt = catalog.build_entries(media_dir, stale, cache)
+        except Exception as e:
+            print(f"{catalog.name}: Error reading {len(stale)} files: {e}")
+            rebuilt = [None] * len(stale)
+    else:
+        rebuilt = []
+        for filename, st in stale:
+            try:
+                rebuilt.append(catalog.build_entry(media_dir, filename, st, cache))
+            except Exception as e:
+                print(f"{catalog.name}: Error reading {filename}: {e}")
+                rebuilt.append(None)
+
+    unread = set()
+    for (filename, _), entry in zip(stale, rebuilt):
+        previous = previous_entries.get(filename)
+        if entry is None:
+            print(f"{catalog.name}: Could not read {filename}, "
+                  f"{'keeping its previous entry' if previous is not None else 'leaving it out'} until it can be")
+            unread.add(filename)
+            counts['failed'] += 1
+            counts['changed' if previous is not None else 'added'] -= 1
+            if previous is not None:
+                entries[filename] = previous
+            continue
+        if previous is not None:
+            entry.update((key, previous[key]) for key in catalog.keep if key in previous)
+        entries[filename] = entry
+    entries = [entries[filename] for filename in sorted(files) if filename in entries]
+
+    database = catalog.assemble(entries, media_dir)
+    counts['written'] = previous_db is None or _without_timestamps(database) != _without_timestamps(previous_db)
+    if counts['written']:
+        write_json_atomic(db_path, database, catalog.ensure_ascii)
+    manifest_path = os.path.join(site_root, manifest_name(catalog.name))
+    if catalog.shards and (counts['written'] or not os.path.exists(manifest_path)):
+        write_shards(catalog.name, database[catalog.list_key], site_root, catalog.ensure_ascii)
+    counts['total'] = len(entries)
+    counts['state'] = {filename: signature(st) for filename, st in files.items() if filename not in unread}
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Incrementally rebuild the site databases')
+    parser.add_argument('--site-root', default=DEFAULT_SITE_ROOT,
+                        help='Directory holding the media directories and databases '
+                             '(default: the directory this script is in)')
+    parser.add_argument('--only', nargs='+', choices=[catalog.name for catalog in CATALOGS],
+                        help='Only rebuild these catalogs')
+    parser.add_argument('--full', action='store_true', help='Re-read every file instead of only changed ones')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore the persistent metadata cache when probing videos')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.site_root):
+        print(f"Error: Site root {args.site_root} does not exist")
+        return 1
+
+    state_path = os.path.join(args.site_root, STATE_NAME)
+    state = _load_json(state_path) or {}
+    cache = None if args.no_cache else MetadataCache()
+    try:
+        for catalog in CATALOGS:
+            if args.only and catalog.name not in args.only:
+                continue
+            started = time.perf_counter()
+            counts = build_catalog(catalog, args.site_root, state.get(catalog.name, {}), cache, args.full)
+            if counts is None:
+                continue
+            state[catalog.name] = counts.pop('state')
+            print(f"{catalog.name}: {counts['total']} entries - {counts['added']} added, "
+                  f"{counts['changed']} changed, {counts['removed']} removed, "
+                  f"{counts['carried']} carried over, {counts['failed']} unreadable "
+                  f"({'written' if counts['written'] else 'unchanged'}, "
+                  f"{time.perf_counter() - started:.2f}s)")
+    finally:
+        if cache is not None:
+            cache.close()
+
+    write_json_atomic(state_path, state)
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
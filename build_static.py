@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Static Output Precompressor
+Minifies the site's JSON and writes maximum-level .gz (and, with the brotli package,
+.br) siblings for every text asset, so nginx can serve precompressed bytes
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Dict
+
+from media_walker import DEFAULT_EXCLUDES, walk_files
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Text assets worth compressing; images, audio and video are already compressed
+TEXT_EXTENSIONS = {'.html', '.css', '.js', '.json', '.svg'}
+
+# SHA-256 of every asset as last compressed (dotfiles are not served)
+STATE_NAME = '.static-build.json'
+
+# Compressed copies smaller than this are not worth the extra file (nginx's gzip_min_length)
+MIN_SIZE = 1024
+
+EXCLUDES = DEFAULT_EXCLUDES + ('.*', 'node_modules')
+
+
+def minify_json(data: bytes) -> bytes:
+    """Compact JSON with the same content; unchanged if it does not parse"""
+    try:
+        parsed = json.loads(data)
+    except ValueError:
+        return data
+    return json.dumps(parsed, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _write_atomic(path: str, content: bytes):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def compress_file(path: str, data: bytes, use_brotli: bool = BROTLI_AVAILABLE) -> int:
+    """Write path.gz (and path.br) for data; returns the bytes saved by the smallest copy.
+
+    gzip output carries no timestamp, so the same input always gives the
+    same bytes.
+    """
+    smallest = len(data)
+    for suffix, compress in (('.gz', lambda: gzip.compress(data, compresslevel=9, mtime=0)),
+                             ('.br', lambda: brotli.compress(data, quality=11) if use_brotli else None)):
+        compressed = compress()
+        if compressed is None or len(compressed) >= len(data):
+            _remove(path + suffix)
+            continue
+        _write_atomic(path + suffix, compressed)
+        smallest = min(smallest, len(compressed))
+    return len(data) - smallest
+
+
+def build_static(site_root: str, previous_state: Dict[str, str], minify: bool = True,
+                 force: bool = False, use_brotli: bool = BROTLI_AVAILABLE) -> Dict:
+    """Minify and precompress every text asset under site_root; returns counts and the new state.
+
+    JSON is minified in place first. A file whose (minified) content has
+    the SHA-256 recorded in previous_state and whose compressed copies exist
+    is skipped, so only new or changed files pay for maximum-level
+    compression. Compressed copies of files that no longer exist are
+    removed, as are copies of files now under MIN_SIZE.
+    """
+    counts = {'compressed': 0, 'unchanged': 0, 'minified': 0, 'removed': 0,
+              'bytes': 0, 'saved': 0}
+    state = {}
+    for entry in walk_files(site_root, recursive=True, exclude=EXCLUDES,
+                            extensions=TEXT_EXTENSIONS | {'.gz', '.br'}):
+        relpath = os.path.relpath(entry.path, site_root)
+        base, ext = os.path.splitext(entry.path)
+        if ext in ('.gz', '.br'):
+            if os.path.splitext(base)[1].lower() in TEXT_EXTENSIONS and not os.path.exists(base):
+                os.remove(entry.path)
+                counts['removed'] += 1
+            continue
+
+        with open(entry.path, 'rb') as f:
+            data = f.read()
+        if minify and ext.lower() == '.json':
+            minified = minify_json(data)
+            if minified != data:
+                _write_atomic(entry.path, minified)
+                data = minified
+                counts['minified'] += 1
+
+        if len(data) < MIN_SIZE:
+            _remove(entry.path + '.gz')
+            _remove(entry.path + '.br')
+            continue
+        digest = hashlib.sha256(data).hexdigest()
+        state[relpath] = digest
+        siblings = ['.gz'] + (['.br'] if use_brotli else [])
+        if (not force and previous_state.get(relpath) == digest
+                and all(os.path.exists(entry.path + suffix) for suffix in siblings)):
+            counts['unchanged'] += 1
+            continue
+        counts['saved'] += compress_file(entry.path, data, use_brotli)
+        counts['bytes'] += len(data)
+        counts['compressed'] += 1
+    counts['state'] = state
+    return counts
+
+
+def _load_state(path: str) -> Dict[str, str]:
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Minify JSON and precompress the text assets of a site')
+    parser.add_argument('site_root', help='Directory to build in place (the deployed copy, not the repository)')
+    parser.add_argument('--no-minify', action='store_true', help='Leave JSON files as they are')
+    parser.add_argument('--force', action='store_true', help='Recompress every file, changed or not')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.site_root):
+        print(f"Error: Site root {args.site_root} does not exist")
+        return 1
+    if not BROTLI_AVAILABLE:
+        print("Warning: brotli not available (pip install brotli). Writing .gz files only.")
+
+    state_path = os.path.join(args.site_root, STATE_NAME)
+    started = time.perf_counter()
+    counts = build_static(args.site_root, _load_state(state_path), not args.no_minify, args.force)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(counts.pop('state'), f, indent=2)
+
+    print(f"Compressed: {counts['compressed']}  Unchanged: {counts['unchanged']}  "
+          f"JSON minified: {counts['minified']}  Stale copies removed: {counts['removed']}")
+    if counts['bytes']:
+        print(f"Smallest copies save {counts['saved'] / counts['bytes']:.0%} of "
+              f"{counts['bytes'] / 1024:.1f} KB ({time.perf_counter() - started:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,36 +1,32 @@
 #!/bin/bash
 
-# Clear cache and force update script for EXTANTRA blog
-echo "🚀 Clearing caches and forcing updates..."
+# Refresh asset fingerprints for EXTANTRA blog
+# CSS, databases and image derivatives are served under content-hashed names with
+# year-long immutable caching, so changed files get new URLs and nothing needs clearing.
+# This only re-runs the fingerprinting and precompression steps on the live site.
+echo "🚀 Refreshing asset fingerprints..."
 
-# Clear nginx cache if it exists
-if command -v nginx &> /dev/null; then
-    echo "📁 Clearing nginx cache..."
-    sudo find /var/cache/nginx -type f -delete 2>/dev/null || echo "No nginx cache found or no permission"
-fi
+SITE_DIR="${SITE_DIR:-/var/www/extantra.net}"
+SCRIPT_DIR=$(cd "$(dirname "$0")" && pwd)
 
-# Force git pull (if this is a git repo)
-if [ -d ".git" ]; then
-    echo "📡 Pulling latest changes from git..."
-    git pull
+if [ ! -d "$SITE_DIR" ]; then
+    echo "❌ Site directory $SITE_DIR not found (set SITE_DIR)"
+    exit 1
 fi
 
-# Update file timestamps to force cache invalidation
-echo "⏰ Updating file timestamps..."
-touch *.html *.css *.json *.js 2>/dev/null || true
+# Point the pages at the current content-hashed copies, then recompress what changed
+echo "🔖 Fingerprinting assets in $SITE_DIR..."
+python3 "$SCRIPT_DIR/fingerprint_assets.py" "$SITE_DIR"
+echo "🗜️  Precompressing static files..."
+python3 "$SCRIPT_DIR/build_static.py" "$SITE_DIR"
 
-# If using systemctl, restart nginx
+# If using systemctl, reload nginx
 if command -v systemctl &> /dev/null; then
-    echo "🔄 Restarting nginx..."
+    echo "🔄 Reloading nginx..."
     sudo systemctl reload nginx 2>/dev/null || echo "Could not reload nginx (no permission or not installed)"
 fi
 
-echo "✅ Cache clearing complete!"
-echo ""
-echo "💡 Additional steps you can take:"
-echo "   1. Clear browser cache (Ctrl+Shift+Delete)"
-echo "   2. Open site in incognito/private mode"
-echo "   3. Add ?v=$(date +%s) to URLs for testing"
+echo "✅ Done!"
 echo ""
-echo "🔍 Current file timestamps:"
-ls -la *.html *.css *.json 2>/dev/null || echo "Some files not found"
+echo "💡 HTML pages are never cached (no-cache), so visitors pick up new"
+echo "   fingerprinted URLs on their next page load."
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Resumable Conversion Queue
+Journals every planned video conversion and each file's progress through it, so
+an interrupted batch resumes with the same names and never trusts a partial output
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+QUEUE_NAME = '.conversion-queue.jsonl'
+
+# Outputs are written under this prefix and renamed into place once verified
+TEMP_PREFIX = '.converting-'
+
+# A file moves through these in order, or ends in FAILED with its original untouched
+PENDING = 'pending'
+ENCODING = 'encoding'
+VERIFIED = 'verified'
+ORIGINAL_REMOVED = 'original-removed'
+FAILED = 'failed'
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b'\n'
+
+
+class ConversionJob(NamedTuple):
+    original: str
+    target: str
+    date: str               # ISO date the target's name and sequence number came from
+
+    @property
+    def temp_path(self) -> str:
+        """Where the output is written until it has been verified"""
+        return os.path.join(os.path.dirname(self.target), TEMP_PREFIX + os.path.basename(self.target))
+
+
+class ConversionQueue:
+    """The planned jobs for one output directory plus each job's latest state.
+
+    The plan (original -> target name, sequence numbers included) is written
+    once, atomically, before any encode starts; state changes are appended and
+    fsync'ed as they happen. A re-run loads the queue instead of rescanning,
+    so names never shift, and recover() sorts out whatever the interruption
+    left half done. The queue file is removed once every job has finished,
+    either with its original removed or failed outright (the original then
+    stays where it was, for a later run to pick up again).
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, QUEUE_NAME)
+        self.jobs: List[ConversionJob] = []
+        self.states: Dict[str, str] = {}
+        self._journal = None
+
+    @classmethod
+    def load(cls, output_dir: str) -> Optional['ConversionQueue']:
+        """The queue left by an interrupted run, or None"""
+        queue = cls(output_dir)
+        if not os.path.exists(queue.path):
+            return None
+        with open(queue.path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # A line torn by a crash (later records start on a new line)
+                if record['type'] == 'job':
+                    job = ConversionJob(record['original'], record['target'], record['date'])
+                    queue.jobs.append(job)
+                    queue.states[job.original] = PENDING
+                elif record['type'] == 'state':
+                    queue.states[record['original']] = record['state']
+        return queue
+
+    def plan(self, jobs: Iterable[ConversionJob]):
+        """Durably record the jobs, all pending, before anything is converted"""
+        self.jobs = list(jobs)
+        self.states = {job.original: PENDING for job in self.jobs}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'type': 'plan', 'created': datetime.now().isoformat(),
+                                'output_dir': os.path.abspath(self.output_dir)}) + '\n')
+            for job in self.jobs:
+                f.write(json.dumps({'type': 'job', **job._asdict()}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def set_state(self, job: ConversionJob, state: str, error: str = None):
+        """Record a state change; it is on disk before this returns"""
+        self.states[job.original] = state
+        if self._journal is None:
+            self._journal = open(self.path, 'a', encoding='utf-8')
+            if not _ends_with_newline(self.path):
+                self._journal.write('\n')  # Start after a line torn by a crash, not inside it
+        record = {'type': 'state', 'original': job.original, 'state': state}
+        if error is not None:
+            record['error'] = error
+        self._journal.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def recover(self) -> List[ConversionJob]:
+        """Settle jobs an interruption left mid-way; returns the jobs still to convert.
+
+        A temporary output is never trusted: it is deleted and its job starts
+        over. A job whose output was renamed into place (verified, or the
+        crash came between the rename and its record) only needs its
+        original removed.
+        """
+        remaining = []
+        for job in self.jobs:
+            state = self.states[job.original]
+            if state == ORIGINAL_REMOVED:
+                continue
+            if os.path.exists(job.temp_path):
+                os.remove(job.temp_path)
+            elif state in (ENCODING, VERIFIED) and os.path.exists(job.target):
+                if state == ENCODING:
+                    self.set_state(job, VERIFIED)
+                self.remove_original(job)
+                continue
+            self.states[job.original] = PENDING
+            remaining.append(job)
+        return remaining
+
+    def remove_original(self, job: ConversionJob) -> bool:
+        """Delete a verified job's original; False (job stays verified) if that fails"""
+        try:
+            if os.path.exists(job.original):
+                os.remove(job.original)
+        except OSError as e:
+            print(f"Warning: Could not remove {job.original}: {e}")
+            return False
+        self.set_state(job, ORIGINAL_REMOVED)
+        return True
+
+    def close(self) -> bool:
+        """Close the journal and delete the queue if every job has finished; True if deleted"""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        if all(state in (ORIGINAL_REMOVED, FAILED) for state in self.states.values()):
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            return True
+        return False
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Tiered Duplicate Detection
+Finds byte-identical files by size, then a partial hash of the first and last
+blocks, then a full mmap-based hash only for files that are still tied
+"""
+
+import hashlib
+import mmap
+import os
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from parallel_extract import extract_metadata
+
+# Bytes read from each end of a file for the partial hash
+EDGE_BLOCK = 64 * 1024
+
+
+def partial_hash(filepath: str, size: int) -> str:
+    """Hash of the first and last EDGE_BLOCK bytes (the whole file if smaller)"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, 'rb') as f:
+        digest.update(f.read(EDGE_BLOCK))
+        if size > 2 * EDGE_BLOCK:
+            f.seek(-EDGE_BLOCK, os.SEEK_END)
+            digest.update(f.read(EDGE_BLOCK))
+        elif size > EDGE_BLOCK:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def full_hash(filepath: str) -> str:
+    """SHA-256 of the whole file via mmap (hashlib releases the GIL on large buffers)"""
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return hashlib.sha256().hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return hashlib.sha256(mm).hexdigest()
+
+
+def _hash_groups(groups: List[List[str]], hasher, jobs: Optional[int]) -> List[List[str]]:
+    """Split every group by hasher(path), dropping groups that become singletons"""
+    paths = [path for group in groups for path in group]
+
+    def probe(path):
+        try:
+            return hasher(path)
+        except OSError as e:
+            print(f"Warning: Could not read {path}: {e}")
+            return None
+
+    digests = dict(zip(paths, extract_metadata(paths, probe, jobs)))
+    refined = []
+    for group in groups:
+        buckets = defaultdict(list)
+        for path in group:
+            if digests[path] is not None:
+                buckets[digests[path]].append(path)
+        refined.extend(bucket for bucket in buckets.values() if len(bucket) > 1)
+    return refined
+
+
+def find_duplicates(files: Iterable[Tuple[str, int]], jobs: Optional[int] = None) -> List[List[str]]:
+    """Group byte-identical files.
+
+    files yields (path, size) pairs, normally straight from a directory scan so
+    no extra stat is needed. Each returned group is sorted, so group[0] is a
+    stable choice of the copy to keep. Only files that share a size are ever
+    opened, and only those that also share a partial hash are read in full.
+    """
+    by_size: Dict[int, List[str]] = defaultdict(list)
+    for path, size in files:
+        by_size[size].append(path)
+    candidates = [group for group in by_size.values() if len(group) > 1]
+
+    sizes = {path: size for size, group in by_size.items() for path in group}
+    candidates = _hash_groups(candidates, lambda path: partial_hash(path, sizes[path]), jobs)
+
+    # Files no bigger than the partial window were already hashed in full
+    small = [group for group in candidates if sizes[group[0]] <= 2 * EDGE_BLOCK]
+    large = [group for group in candidates if sizes[group[0]] > 2 * EDGE_BLOCK]
+    confirmed = small + _hash_groups(large, full_hash, jobs)
+
+    return sorted(sorted(group) for group in confirmed)
+
+
+def duplicate_paths(groups: List[List[str]]) -> Dict[str, str]:
+    """Map every redundant copy to the copy that is kept"""
+    return {path: group[0] for group in groups for path in group[1:]}
+
+
+def report_duplicates(groups: List[List[str]]):
+    """Print each redundant copy next to the copy that is kept"""
+    redundant = sum(len(group) - 1 for group in groups)
+    print(f"Found {redundant} duplicate files in {len(groups)} groups")
+    for group in groups:
+        for path in group[1:]:
+            print(f"  Duplicate: {os.path.basename(path)} == {os.path.basename(group[0])}")
@@ -44,7 +44,7 @@ find $CURRENT_DIR -maxdepth 1 -type f \( \
     -exec cp {} $SITE_DIR/ \;
 
 # Copy directories (media folders)
-for dir in images audio drawings photos videos 3d models; do
+for dir in images audio drawings photos videos 3d models shards; do
     if [ -d "$CURRENT_DIR/$dir" ]; then
         echo "📁 Copying $dir directory..."
         cp -r "$CURRENT_DIR/$dir" "$SITE_DIR/"
@@ -67,6 +67,14 @@ find $SITE_DIR -name "setup-*" -delete 2>/dev/null || true
 find $SITE_DIR -name "update-*" -delete 2>/dev/null || true
 rm -f $SITE_DIR/README.md $SITE_DIR/BATCH_PROCESSING_GUIDE.md $SITE_DIR/DEPLOYMENT.md 2>/dev/null || true
 
+# Point the pages at content-hashed copies of the CSS and databases
+echo "🔖 Fingerprinting assets..."
+python3 $CURRENT_DIR/fingerprint_assets.py $SITE_DIR
+
+# Minify JSON and precompress text assets
+echo "🗜️  Precompressing static files..."
+python3 $CURRENT_DIR/build_static.py $SITE_DIR
+
 # Set proper permissions
 chown -R www-data:www-data $SITE_DIR
 find $SITE_DIR -type d -exec chmod 755 {} \;
@@ -48,6 +48,14 @@ rsync -av --exclude='.git' \
           --exclude='nginx-*' \
           $CURRENT_DIR/ $SITE_DIR/
 
+# Point the pages at content-hashed copies of the CSS and databases
+echo "🔖 Fingerprinting assets..."
+python3 $CURRENT_DIR/fingerprint_assets.py $SITE_DIR
+
+# Minify JSON and precompress text assets
+echo "🗜️  Precompressing static files..."
+python3 $CURRENT_DIR/build_static.py $SITE_DIR
+
 # Set proper permissions
 chown -R www-data:www-data $SITE_DIR
 find $SITE_DIR -type d -exec chmod 755 {} \;
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Header-Only EXIF Reader
+Pulls capture dates, camera make/model and orientation straight out of JPEG APP1,
+TIFF, WebP EXIF and PNG eXIf headers without decoding or fully opening the image
+"""
+
+import os
+import struct
+from datetime import datetime
+from typing import BinaryIO, Callable, Dict, Optional
+
+# One read covers the EXIF block of virtually every camera JPEG
+HEAD_BYTES = 64 * 1024
+
+# Tags reported by read_exif; the Exif sub-IFD is followed for the capture dates
+TAGS = {
+    0x010F: 'Make',
+    0x0110: 'Model',
+    0x0112: 'Orientation',
+    0x0132: 'DateTime',
+    0x9003: 'DateTimeOriginal',
+    0x9004: 'DateTimeDigitized',
+}
+EXIF_IFD_POINTER = 0x8769
+
+# Preference order when picking the date a photo was taken
+DATE_TAGS = ('DateTimeOriginal', 'DateTimeDigitized', 'DateTime')
+
+
+# Longest ASCII value read (dates are 20 bytes; guards against corrupt counts)
+MAX_ASCII_BYTES = 256
+
+
+def _parse_tiff(read: Callable[[int, int], bytes]) -> Dict:
+    """Read the wanted tags from a TIFF structure (IFD0 plus the Exif IFD).
+
+    read(offset, size) returns up to size bytes at offset, so a TIFF file is
+    read one IFD and one out-of-line value at a time rather than whole.
+    """
+    header = read(0, 8)
+    if header[:2] == b'II':
+        order = '<'
+    elif header[:2] == b'MM':
+        order = '>'
+    else:
+        raise ValueError('not a TIFF header')
+    if struct.unpack(order + 'H', header[2:4])[0] != 42:
+        raise ValueError('bad TIFF magic')
+
+    tags = {}
+    offsets = [struct.unpack(order + 'I', header[4:8])[0]]
+    visited = set()
+    while offsets:
+        offset = offsets.pop()
+        if offset in visited:
+            continue
+        visited.add(offset)
+        raw_count = read(offset, 2)
+        if len(raw_count) < 2:
+            continue
+        count = struct.unpack(order + 'H', raw_count)[0]
+        entries = read(offset + 2, count * 12)
+        for entry in range(0, len(entries) - 11, 12):
+            tag, kind, n = struct.unpack_from(order + 'HHI', entries, entry)
+            value = entries[entry + 8:entry + 12]
+            if tag == EXIF_IFD_POINTER and kind in (4, 13):
+                offsets.append(struct.unpack(order + 'I', value)[0])
+            elif tag in TAGS:
+                if kind == 2:       # ASCII, inline when it fits in four bytes
+                    n = min(n, MAX_ASCII_BYTES)
+                    raw = value[:n] if n <= 4 else read(struct.unpack(order + 'I', value)[0], n)
+                    tags[TAGS[tag]] = raw.split(b'\0', 1)[0].decode('latin-1').strip()
+                elif kind == 3:     # SHORT
+                    tags[TAGS[tag]] = struct.unpack(order + 'H', value[:2])[0]
+                elif kind == 4:     # LONG
+                    tags[TAGS[tag]] = struct.unpack(order + 'I', value)[0]
+    return tags
+
+
+def _bytes_reader(data: bytes) -> Callable[[int, int], bytes]:
+    return lambda offset, size: data[offset:offset + size]
+
+
+def _file_reader(f: BinaryIO, head: bytes) -> Callable[[int, int], bytes]:
+    """Serve reads from the first block when they fit, otherwise seek and read just those bytes"""
+    def read(offset: int, size: int) -> bytes:
+        if offset + size <= len(head):
+            return head[offset:offset + size]
+        f.seek(offset)
+        return f.read(size)
+    return read
+
+
+def _strip_exif_prefix(payload: bytes) -> bytes:
+    """Some writers keep the JPEG 'Exif\\0\\0' prefix in WebP/PNG chunks"""
+    return payload[6:] if payload.startswith(b'Exif\0\0') else payload
+
+
+def _jpeg_exif(f: BinaryIO, head: bytes) -> Optional[bytes]:
+    """Walk the marker segments ahead of the image data looking for APP1 'Exif'"""
+    offset = 2
+    while True:
+        if offset + 4 <= len(head):
+            header = head[offset:offset + 4]
+        else:                       # Unusually large segments ahead of APP1
+            f.seek(offset)
+            header = f.read(4)
+            if len(header) < 4:
+                return None
+        if header[0] != 0xFF:
+            raise ValueError('lost JPEG marker sync')
+        marker = header[1]
+        if marker == 0xFF:          # Fill byte
+            offset += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            offset += 2             # Markers without a length
+            continue
+        if marker in (0xDA, 0xD9) or 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            return None             # Image data starts; metadata always comes before it
+        length = struct.unpack('>H', header[2:4])[0]
+        if marker == 0xE1:
+            segment = head[offset + 4:offset + 2 + length]
+            if len(segment) < length - 2:       # Segment runs past the first read
+                f.seek(offset + 4)
+                segment = f.read(length - 2)
+            if segment.startswith(b'Exif\0\0'):
+                return segment[6:]
+        offset += 2 + length
+
+
+def _riff_exif(f: BinaryIO, head: bytes) -> Optional[bytes]:
+    """WebP keeps EXIF in a chunk after the bitstream; walk chunk headers, skipping the data"""
+    if head[12:16] != b'VP8X' or not head[20] & 0x08:
+        return None                 # Simple files carry no metadata; VP8X flags say whether EXIF exists
+    offset = 12
+    file_size = os.fstat(f.fileno()).st_size
+    while offset + 8 <= file_size:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            break
+        kind, size = header[:4], struct.unpack('<I', header[4:])[0]
+        if kind == b'EXIF':
+            return _strip_exif_prefix(f.read(size))
+        offset += 8 + size + (size & 1)
+    return None
+
+
+def _png_exif(f: BinaryIO) -> Optional[bytes]:
+    offset = 8
+    while True:
+        f.seek(offset)
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        size, kind = struct.unpack('>I', header[:4])[0], header[4:]
+        if kind == b'eXIf':
+            return _strip_exif_prefix(f.read(size))
+        if kind == b'IEND':
+            return None
+        offset += 12 + size
+
+
+def read_exif(filepath: str) -> Optional[Dict]:
+    """Tags found in the file's EXIF block ({} when it has none).
+
+    Returns None when the format is not one this reader understands or the
+    metadata is malformed, so the caller can fall back to a full decoder.
+    Keys are the names in TAGS; dates are left as the raw EXIF strings.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            head = f.read(HEAD_BYTES)
+            if head[:2] == b'\xff\xd8':
+                payload = _jpeg_exif(f, head)
+            elif head[:4] in (b'II*\0', b'MM\0*'):
+                return _parse_tiff(_file_reader(f, head))   # IFDs may point anywhere in a TIFF
+            elif head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+                payload = _riff_exif(f, head)
+            elif head[:8] == b'\x89PNG\r\n\x1a\n':
+                payload = _png_exif(f)
+            else:
+                return None
+        return _parse_tiff(_bytes_reader(payload)) if payload else {}
+    except (OSError, ValueError, IndexError, struct.error):
+        return None
+
+
+def parse_exif_datetime(value: str) -> Optional[datetime]:
+    """'2024:01:25 14:30:52' -> datetime; None for blank or zeroed camera clocks"""
+    try:
+        return datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    except (ValueError, TypeError):
+        return None
+
+
+def exif_date(tags: Dict) -> Optional[datetime]:
+    """When the photo was taken: DateTimeOriginal, then DateTimeDigitized, then DateTime"""
+    for name in DATE_TAGS:
+        if name in tags:
+            value = parse_exif_datetime(tags[name])
+            if value is not None:
+                return value
+    return None
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Asyncio FFmpeg Job Scheduler
+Runs several ffmpeg/ffprobe processes at once from a single event-loop thread,
+keeping only the last lines of each encoder's stderr for diagnostics
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+from subprocess import DEVNULL, PIPE
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple
+
+# Lines of stderr kept per process; ffmpeg prints its error last
+STDERR_LINES = 40
+
+# Longest single line kept (ffmpeg progress can run for a long time without a newline)
+MAX_LINE_BYTES = 4096
+
+READ_CHUNK = 64 * 1024
+
+# x264 already spreads one encode across every core, so a few concurrent videos suffice
+DEFAULT_VIDEO_SLOTS = 2
+
+
+class FFmpegResult(NamedTuple):
+    returncode: int
+    stderr: str             # Last STDERR_LINES lines only
+    stdout: Optional[bytes] # Only when captured (ffprobe JSON)
+    elapsed: float
+
+
+# Called in the submitting thread with (result, None), or (result or None, error) on failure
+JobCallback = Callable[[Optional[FFmpegResult], Optional[str]], None]
+
+
+class StderrRing:
+    """Bounded tail of a process's stderr, split on both \\n and ffmpeg's progress \\r"""
+
+    def __init__(self, lines: int = STDERR_LINES):
+        self.lines = deque(maxlen=lines)
+        self.partial = b''
+
+    def feed(self, chunk: bytes):
+        parts = chunk.replace(b'\r', b'\n').split(b'\n')
+        parts[0] = self.partial + parts[0]
+        self.partial = parts.pop()[-MAX_LINE_BYTES:]
+        self.lines.extend(part[-MAX_LINE_BYTES:] for part in parts if part.strip())
+
+    def text(self) -> str:
+        lines = list(self.lines) + ([self.partial] if self.partial.strip() else [])
+        return b'\n'.join(lines).decode('utf-8', 'replace')
+
+
+async def run_ffmpeg(cmd: Sequence[str], capture_stdout: bool = False,
+                     stderr_lines: int = STDERR_LINES,
+                     started: Callable[[asyncio.subprocess.Process], None] = None,
+                     timeout: Optional[float] = None) -> FFmpegResult:
+    """Run one command, streaming stderr into a ring buffer; killed if cancelled.
+
+    started, if given, receives the process as soon as it has been spawned.
+    A process still running after timeout seconds is killed and TimeoutError
+    raised.
+    """
+    start = time.monotonic()
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdin=DEVNULL, stdout=PIPE if capture_stdout else DEVNULL, stderr=PIPE
+    )
+    if started is not None:
+        started(process)
+    ring = StderrRing(stderr_lines)
+
+    async def drain_stderr():
+        while True:
+            chunk = await process.stderr.read(READ_CHUNK)
+            if not chunk:
+                break
+            ring.feed(chunk)
+
+    async def communicate():
+        if capture_stdout:
+            stdout, _ = await asyncio.gather(process.stdout.read(), drain_stderr())
+        else:
+            stdout = None
+            await drain_stderr()
+        return stdout, await process.wait()
+
+    try:
+        stdout, returncode = await asyncio.wait_for(communicate(), timeout)
+    except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise TimeoutError(f"timed out after {timeout:g}s") from None
+        raise
+    return FFmpegResult(returncode, ring.text(), stdout, time.monotonic() - start)
+
+
+def run_ffmpeg_sync(cmd: Sequence[str], capture_stdout: bool = False) -> FFmpegResult:
+    """Blocking run_ffmpeg, for one-off commands outside a scheduler"""
+    return asyncio.run(run_ffmpeg(cmd, capture_stdout))
+
+
+def describe_failure(result: FFmpegResult) -> str:
+    """Message for a non-zero exit, ending with the process's last stderr lines"""
+    message = f"exited with status {result.returncode}"
+    return f"{message}:\n{result.stderr}" if result.stderr else message
+
+
+class FFmpegScheduler:
+    """Runs ffmpeg/ffprobe commands concurrently in up to `slots` processes.
+
+    The processes are driven by an asyncio event loop on a background thread.
+    submit() blocks while every slot is busy, finishing earlier jobs
+    meanwhile, so callers can do per-file work (such as backups) right before
+    submitting. Completion callbacks always run in the submitting thread, so
+    callers can update shared results without locking.
+    """
+
+    def __init__(self, slots: Optional[int] = None, stderr_lines: int = STDERR_LINES):
+        self.slots = max(1, slots or os.cpu_count() or 1)
+        self.stderr_lines = stderr_lines
+        self.busy_seconds = 0.0
+        self._cancelled = False
+        self._running = set()
+        self._pending: List[Tuple[object, JobCallback]] = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='ffmpeg-scheduler', daemon=True)
+        self._thread.start()
+
+    def submit(self, cmd: Sequence[str], on_done: JobCallback, capture_stdout: bool = False,
+               timeout: Optional[float] = None):
+        """Start cmd once a slot is free; on_done gets an error for non-zero exits and timeouts too"""
+        while len(self._pending) >= self.slots:
+            self._reap(block=True)
+        future = asyncio.run_coroutine_threadsafe(self._run(cmd, capture_stdout, timeout), self._loop)
+        self._pending.append((future, on_done))
+
+    async def _run(self, cmd: Sequence[str], capture_stdout: bool, timeout: Optional[float]) -> FFmpegResult:
+        processes = []
+        try:
+            return await run_ffmpeg(cmd, capture_stdout, self.stderr_lines,
+                                    lambda process: processes.append(self._track(process)), timeout)
+        finally:
+            self._running.difference_update(processes)
+
+    def _track(self, process: asyncio.subprocess.Process) -> asyncio.subprocess.Process:
+        """Runs on the loop thread; a process spawned after cancel() is killed at once"""
+        self._running.add(process)
+        if self._cancelled:
+            process.kill()
+        return process
+
+    def _kill_running(self):
+        self._cancelled = True
+        for process in self._running:
+            if process.returncode is None:
+                process.kill()
+
+    def _reap(self, block: bool):
+        """Run callbacks for finished jobs (waiting for at least one if block)"""
+        if block:
+            wait([future for future, _ in self._pending], return_when=FIRST_COMPLETED)
+        # Drop finished jobs first, so a callback that raises is never run twice
+        finished, still_pending = [], []
+        for job in self._pending:
+            (finished if job[0].done() else still_pending).append(job)
+        self._pending = still_pending
+        for future, on_done in finished:
+            try:
+                result = future.result()
+            except TimeoutError as e:   # Killed; the other jobs carry on
+                on_done(None, str(e))
+                continue
+            except Exception as e:      # Could not start (e.g. ffmpeg not installed) or cancelled
+                on_done(None, f"could not run: {e!r}")
+                continue
+            self.busy_seconds += result.elapsed
+            on_done(result, describe_failure(result) if result.returncode != 0 else None)
+
+    def wait(self):
+        """Finish every submitted job"""
+        while self._pending:
+            self._reap(block=True)
+
+    def cancel(self):
+        """Kill running processes; their callbacks still run, with an error"""
+        self._loop.call_soon_threadsafe(self._kill_running)
+        self.wait()
+
+    def close(self):
+        self.wait()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is not None:
+            self.cancel()
+        self.close()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Content-Hashed Asset Fingerprinting
+Copies the stylesheet, scripts, databases and gallery manifests of a deployed site to
+content-hashed names and points the HTML pages at them, so they can be cached for a year without going stale
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shutil
+from typing import Dict
+
+# Hex digits of the content's SHA-256 kept in a fingerprinted name
+HASH_LENGTH = 10
+
+# Asset name -> its current fingerprinted copy, as of the last run (dotfiles are not served)
+STATE_NAME = '.asset-fingerprints.json'
+
+# Files in the site root that pages load by name
+ASSET_PATTERNS = ('*.css', '*.js', '*-database.json', '*-manifest.json')
+
+_FINGERPRINTED = re.compile(rf'\.[0-9a-f]{{{HASH_LENGTH}}}(\.[^.]+)$')
+
+
+def file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'sha256').hexdigest()
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def fingerprint_name(path: str, digest: str) -> str:
+    """styles.css -> styles.<first HASH_LENGTH hex digits of digest>.css"""
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+
+
+def original_name(name: str) -> str:
+    """styles.0123456789.css -> styles.css; other names are returned unchanged"""
+    return _FINGERPRINTED.sub(r'\1', name)
+
+
+def _reference_pattern(name: str) -> re.Pattern:
+    """A quoted reference to name or any fingerprint of it, with an optional ./ and ?query"""
+    stem, ext = os.path.splitext(name)
+    return re.compile(rf"(?<=['\"`])(\./)?{re.escape(stem)}(?:\.[0-9a-f]{{{HASH_LENGTH}}})?{re.escape(ext)}"
+                      rf"(?:\?[^'\"`]*)?(?=['\"`])")
+
+
+def _write_atomic(path: str, content: str):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def fingerprint_assets(site_root: str, previous_state: Dict[str, str]) -> Dict:
+    """Fingerprint the site root's assets and rewrite the pages; returns counts and the new state.
+
+    Each asset is copied (not renamed, so anything still asking for the
+    plain name keeps working) to a name carrying its content hash. Quoted
+    references in the HTML pages, with or without an old ?v= query or an
+    earlier fingerprint, are pointed at the current copy, so running this
+    again after an asset changes needs no fresh copy of the pages. Copies
+    from the run before are kept for visitors still holding those pages;
+    older copies are removed.
+    """
+    counts = {'assets': 0, 'copied': 0, 'pages': 0, 'removed': 0}
+    names = sorted(name for name in os.listdir(site_root)
+                   if any(fnmatch.fnmatch(name, pattern) for pattern in ASSET_PATTERNS)
+                   and original_name(name) == name and os.path.isfile(os.path.join(site_root, name)))
+
+    state = {}
+    for name in names:
+        fingerprinted = fingerprint_name(name, file_digest(os.path.join(site_root, name)))
+        target = os.path.join(site_root, fingerprinted)
+        if not os.path.exists(target):
+            shutil.copyfile(os.path.join(site_root, name), target + '.tmp')
+            os.replace(target + '.tmp', target)
+            counts['copied'] += 1
+        state[name] = fingerprinted
+    counts['assets'] = len(state)
+
+    patterns = [(_reference_pattern(name), fingerprinted) for name, fingerprinted in state.items()]
+    for page in sorted(os.listdir(site_root)):
+        if not page.endswith('.html'):
+            continue
+        path = os.path.join(site_root, page)
+        with open(path, encoding='utf-8') as f:
+            html = f.read()
+        rewritten = html
+        for pattern, fingerprinted in patterns:
+            rewritten = pattern.sub(lambda match: (match.group(1) or '') + fingerprinted, rewritten)
+        if rewritten != html:
+            _write_atomic(path, rewritten)
+            counts['pages'] += 1
+
+    keep = set(state.values()) | set(previous_state.values())
+    for name in os.listdir(site_root):
+        if original_name(name) != name and original_name(name) in names and name not in keep:
+            os.remove(os.path.join(site_root, name))
+            counts['removed'] += 1
+
+    counts['state'] = state
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Give a site's CSS, JS and JSON assets content-hashed names")
+    parser.add_argument('site_root', help='Directory to rewrite in place (the deployed copy, not the repository)')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.site_root):
+        print(f"Error: Site root {args.site_root} does not exist")
+        return 1
+
+    state_path = os.path.join(args.site_root, STATE_NAME)
+    try:
+        with open(state_path, encoding='utf-8') as f:
+            previous_state = json.load(f)
+    except (OSError, ValueError):
+        previous_state = {}
+
+    counts = fingerprint_assets(args.site_root, previous_state)
+    with open(state_path, 'w', encoding='utf-8') as f:
+        json.dump(counts.pop('state'), f, indent=2)
+    print(f"Assets: {counts['assets']} ({counts['copied']} new copies)  Pages rewritten: {counts['pages']}  "
+          f"Old copies removed: {counts['removed']}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Gallery Page Shards
+Splits a gallery database into fixed-size, content-hashed page files plus a small
+manifest (counts, year/category facets, page URLs), so a gallery's first screen
+needs only the manifest and its first page
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List
+
+# Entries per page file
+PAGE_SIZE = 24
+
+# Page files live in <site root>/shards/<name>/, next to <name>-manifest.json
+SHARDS_DIR = 'shards'
+
+# Hex digits of the page content's SHA-256 kept in its file name
+HASH_LENGTH = 12
+
+
+def manifest_name(name: str) -> str:
+    return f"{name}-manifest.json"
+
+
+def _dump(data, ensure_ascii: bool) -> bytes:
+    return json.dumps(data, ensure_ascii=ensure_ascii, separators=(',', ':')).encode('utf-8')
+
+
+def _write_atomic(path: str, content: bytes):
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+
+def _facet(entries: List[Dict], key: str) -> Dict[str, int]:
+    """Entry count per value of key, in order of each value's newest entry"""
+    return dict(Counter(entry[key] for entry in reversed(entries) if key in entry))
+
+
+def _page_urls(manifest_path: str) -> List[str]:
+    try:
+        with open(manifest_path, encoding='utf-8') as f:
+            return [page['url'] for page in json.load(f)['pages']]
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def write_shards(name: str, entries: List[Dict], site_root: str, ensure_ascii: bool = False,
+                 page_size: int = PAGE_SIZE) -> Dict:
+    """Write the page files and manifest for entries in date (filename) order; returns the manifest.
+
+    Pages are cut from the oldest entry onwards, so adding new entries only
+    changes the newest page and every older page keeps its name and stays
+    cached. The manifest lists pages newest first and each page holds its
+    entries newest first, which is the order the galleries show them in; the
+    newest page may hold fewer than page_size entries. Page files named by
+    neither the new manifest nor the one it replaces are deleted (a visitor
+    may still hold the previous manifest).
+    """
+    shard_dir = os.path.join(site_root, SHARDS_DIR, name)
+    manifest_path = os.path.join(site_root, manifest_name(name))
+    os.makedirs(shard_dir, exist_ok=True)
+
+    pages = []
+    for start in range(0, len(entries), page_size):
+        chunk = entries[start:start + page_size]
+        content = _dump({name: chunk[::-1]}, ensure_ascii)
+        filename = f"{hashlib.sha256(content).hexdigest()[:HASH_LENGTH]}.json"
+        path = os.path.join(shard_dir, filename)
+        if not os.path.exists(path):
+            _write_atomic(path, content)
+        pages.append({'url': f"{SHARDS_DIR}/{name}/{filename}", 'count': len(chunk),
+                      'from': chunk[0].get('date'), 'to': chunk[-1].get('date')})
+    pages.reverse()
+
+    keep = {os.path.basename(url) for url in _page_urls(manifest_path)}
+    keep.update(os.path.basename(page['url']) for page in pages)
+    for filename in os.listdir(shard_dir):
+        if filename not in keep:
+            os.remove(os.path.join(shard_dir, filename))
+
+    manifest = {
+        'total': len(entries),
+        'page_size': page_size,
+        'date_range': f"{entries[0]['date']} to {entries[-1]['date']}" if entries else None,
+        'facets': {'year': _facet(entries, 'year'), 'category': _facet(entries, 'category')},
+        'pages': pages,
+        'generated': datetime.now().isoformat(),
+    }
+    _write_atomic(manifest_path, _dump(manifest, ensure_ascii))
+    return manifest
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Responsive Image Derivatives
+Decodes each photo or drawing at reduced scale for its smaller widths (at full
+scale only for the full-size copy) and writes a width ladder in WebP and JPEG
+for srcset, recording the results in the galleries' databases
+"""
+
+import argparse
+import json
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+
+from fingerprint_assets import file_digest, fingerprint_name
+from image_pool import DEFAULT_MAX_MEGAPIXELS, PILLOW_AVAILABLE, ImageConversionPool
+from media_walker import walk_files
+
+if PILLOW_AVAILABLE:
+    from PIL import Image, ImageOps
+
+DERIVATIVES_DIR = 'derivatives'
+MANIFEST_NAME = 'manifest.json'
+DEFAULT_WIDTHS = (320, 640, 1280)
+DEFAULT_FORMATS = ('webp', 'jpg')
+DEFAULT_QUALITY = 82
+
+# EXIF orientations that swap width and height
+_TRANSPOSED = {5, 6, 7, 8}
+
+_SAVE_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+
+def derivative_name(filename: str, width: Optional[int], fmt: str) -> str:
+    """20240125_001.jpg -> derivatives/20240125_001-640.webp (width None is full size).
+
+    The file is written under this name plus a hash of its content
+    (derivatives/20240125_001-640.<hash>.webp), so it can be cached forever.
+    """
+    stem = os.path.splitext(filename)[0]
+    return f"{DERIVATIVES_DIR}/{stem}-{width or 'full'}.{fmt}"
+
+
+def source_format(filename: str) -> str:
+    ext = os.path.splitext(filename)[1].lower().lstrip('.')
+    return 'jpg' if ext == 'jpeg' else ext
+
+
+def display_size(filepath: str) -> Tuple[int, int]:
+    """Upright (width, height) from the header, honouring EXIF orientation"""
+    with Image.open(filepath) as img:
+        width, height = img.size
+        if img.getexif().get(0x0112) in _TRANSPOSED:
+            width, height = height, width
+    return width, height
+
+
+def _decode(source: str, max_width: Optional[int] = None) -> 'Image.Image':
+    """Upright RGB(A) pixels of source; a JPEG is decoded at reduced scale when max_width allows.
+
+    draft() lets libjpeg scale by 1/2, 1/4 or 1/8 during the DCT instead of
+    decoding every pixel, keeping the result at least max_width wide.
+    """
+    with Image.open(source) as img:
+        if max_width is not None and img.format == 'JPEG':
+            transposed = img.getexif().get(0x0112) in _TRANSPOSED
+            upright_width = img.height if transposed else img.width
+            scale = max_width / upright_width
+            img.draft('RGB', (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'A' in img.getbands() or 'transparency' in img.info else 'RGB')
+        img.load()
+    return img
+
+
+def _save(frame: 'Image.Image', paths: Dict[str, str], quality: int) -> Dict[str, str]:
+    """Save frame in every {format: path}; returns the paths with content hashes added"""
+    written = {}
+    for fmt, path in paths.items():
+        output = frame
+        save_kwargs = {'quality': quality}
+        if fmt == 'jpg':
+            if output.mode == 'RGBA':
+                output = Image.new('RGB', frame.size, (255, 255, 255))
+                output.paste(frame, mask=frame.split()[-1])
+            save_kwargs.update(optimize=True, progressive=True)
+        else:
+            save_kwargs['method'] = 4   # method 6 is several times slower for a few percent
+        tmp = path + '.tmp'
+        output.save(tmp, _SAVE_FORMATS[fmt], **save_kwargs)
+        written[fmt] = fingerprint_name(path, file_digest(tmp))
+        os.replace(tmp, written[fmt])
+    return written
+
+
+def render_derivatives(source: str, outputs: List[Tuple[Optional[int], Dict[str, str]]],
+                       quality: int) -> List[Tuple[Tuple[int, int], Dict[str, str]]]:
+    """Save every (width, {format: path}) output of source (width None is full size).
+
+    Runs in a worker process. The reduced widths are all resized from one
+    decode at reduced scale (see _decode), largest first; only a full-size
+    output pays for a separate decode of every pixel. Each file gets its
+    path with a content hash added. Returns the size and {format:
+    fingerprinted path} written for each output, in the order given.
+    """
+    written = {}
+    reduced = [(width, paths) for width, paths in outputs if width is not None]
+    if reduced:
+        img = _decode(source, max(width for width, _ in reduced))
+        for width, paths in sorted(reduced, key=lambda output: -output[0]):
+            if width >= img.width:
+                resized = img
+            else:
+                resized = img.resize((width, max(1, round(img.height * width / img.width))),
+                                     Image.LANCZOS, reducing_gap=3.0)
+            written[width] = (resized.size, _save(resized, paths, quality))
+        img.close()
+    for width, paths in outputs:
+        if width is None:
+            img = _decode(source)
+            written[None] = (img.size, _save(img, paths, quality))
+            img.close()
+    return [written[width] for width, _ in outputs]
+
+
+class DerivativeGenerator:
+    """Keeps <media_dir>/derivatives/ in step with the images in media_dir.
+
+    A manifest records each source's size and mtime with the ladder that was
+    written for it, so unchanged sources are skipped without touching their
+    derivatives, and derivatives of deleted sources are removed. Widths at or
+    above a source's own width are dropped (nothing is upscaled), and the
+    full-size entry in the source's own format points at the original.
+    """
+
+    def __init__(self, media_dir: str, widths=DEFAULT_WIDTHS, formats=DEFAULT_FORMATS,
+                 quality: int = DEFAULT_QUALITY):
+        self.media_dir = media_dir
+        self.output_dir = os.path.join(media_dir, DERIVATIVES_DIR)
+        self.manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        self.settings = {'widths': sorted(widths), 'formats': list(formats), 'quality': quality}
+        # Imported here so the database generators can read manifests without loading the converter
+        from batch_convert_rename import BatchConverter
+        self.converter = BatchConverter()
+
+    def load_manifest(self) -> Dict:
+        return load_manifest(self.media_dir)
+
+    def plan(self, filename: str, width: int) -> List[Tuple[Optional[int], Dict[str, str]]]:
+        """Outputs to render for one source: [(width or None, {format: relative path})]"""
+        own_format = source_format(filename)
+        ladder = [w for w in self.settings['widths'] if w < width] + [None]
+        outputs = []
+        for w in ladder:
+            paths = {fmt: derivative_name(filename, w, fmt) for fmt in self.settings['formats']
+                     if not (w is None and fmt == own_format)}
+            if paths:
+                outputs.append((w, paths))
+        return outputs
+
+    def run(self, jobs: Optional[int] = None, max_megapixels: float = DEFAULT_MAX_MEGAPIXELS,
+            force: bool = False) -> Dict:
+        os.makedirs(self.output_dir, exist_ok=True)
+        manifest = self.load_manifest()
+        previous = manifest.get('files', {}) if manifest.get('settings') == self.settings and not force else {}
+        files = {}
+        results = {'generated': 0, 'up_to_date': 0, 'errors': 0, 'removed': 0}
+        present = {f"{DERIVATIVES_DIR}/{name}" for name in os.listdir(self.output_dir)}
+
+        sources = sorted((entry for entry in walk_files(self.media_dir)
+                          if self.converter.detect_file_type(entry.name) == 'image'),
+                         key=lambda entry: entry.name)
+        print(f"Found {len(sources)} images in {self.media_dir}")
+
+        def done(filename, st, outputs, full_size):
+            def on_done(rendered, error):
+                if error is None and isinstance(rendered, list):
+                    # The planned names with the content hashes the files were written under
+                    written = [(width, {fmt: f"{DERIVATIVES_DIR}/{os.path.basename(path)}" for fmt, path in paths.items()})
+                               for (width, _), (_, paths) in zip(outputs, rendered)]
+                    files[filename] = {
+                        'size': st.st_size,
+                        'mtime_ns': st.st_mtime_ns,
+                        'derivatives': ladder_entries(filename, written, [size for size, _ in rendered],
+                                                      full_size, self.settings['formats']),
+                    }
+                    results['generated'] += 1
+                    print(f"Generated: {filename} ({len(outputs)} sizes)")
+                else:
+                    results['errors'] += 1
+                    print(f"Error generating derivatives for {filename}: {error}")
+            return on_done
+
+        with ImageConversionPool(jobs, max_megapixels) as pool:
+            for entry in sources:
+                st = entry.stat()
+                known = previous.get(entry.name)
+                if (known and known['size'] == st.st_size and known['mtime_ns'] == st.st_mtime_ns
+                        and all(path in present for step in known['derivatives'] for fmt, path in step.items()
+                                if fmt in _SAVE_FORMATS and path != entry.name)):
+                    files[entry.name] = known
+                    results['up_to_date'] += 1
+                    continue
+                try:
+                    full_size = display_size(entry.path)
+                except Exception as e:
+                    print(f"Error reading {entry.name}: {e}")
+                    results['errors'] += 1
+                    continue
+                outputs = self.plan(entry.name, full_size[0])
+                output_paths = [(w, {fmt: os.path.join(self.media_dir, path) for fmt, path in paths.items()})
+                                for w, paths in outputs]
+                megapixels = full_size[0] * full_size[1] / 1_000_000
+                pool.submit_task(render_derivatives, (entry.path, output_paths, self.settings['quality']),
+                                 megapixels, done(entry.name, st, outputs, full_size))
+
+        # Remove derivatives that no longer belong to any source or ladder
+        keep = {os.path.basename(path) for info in files.values()
+                for step in info['derivatives'] for fmt, path in step.items() if fmt in _SAVE_FORMATS}
+        for entry in os.scandir(self.output_dir):
+            if entry.name != MANIFEST_NAME and entry.name not in keep and entry.is_file():
+                os.remove(entry.path)
+                results['removed'] += 1
+
+        write_manifest(self.media_dir, {'settings': self.settings, 'files': files})
+        return results
+
+
+def ladder_entries(filename: str, outputs, sizes, full_size, formats) -> List[Dict]:
+    """Database records for one source: width, height and a path per format, smallest first"""
+    entries = []
+    for (width, paths), (out_width, out_height) in zip(outputs, sizes):
+        entry = {'width': out_width, 'height': out_height}
+        for fmt in formats:
+            entry[fmt] = paths.get(fmt, filename)   # Full size in the source format is the original
+        entries.append(entry)
+    return entries
+
+
+def load_manifest(media_dir: str) -> Dict:
+    try:
+        with open(os.path.join(media_dir, DERIVATIVES_DIR, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(media_dir: str, manifest: Dict):
+    path = os.path.join(media_dir, DERIVATIVES_DIR, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def load_derivatives(media_dir: str) -> Dict[str, List[Dict]]:
+    """filename -> derivative ladder, for the database generators"""
+    return {filename: info['derivatives'] for filename, info in load_manifest(media_dir).get('files', {}).items()}
+
+
+def update_database(db_path: str, list_key: str, derivatives: Dict[str, List[Dict]]) -> int:
+    """Set (or clear) the derivatives of every entry in a gallery database; returns entries updated"""
+    with open(db_path, encoding='utf-8') as f:
+        database = json.load(f)
+    updated = 0
+    for item in database.get(list_key, []):
+        ladder = derivatives.get(item.get('filename'))
+        if ladder:
+            item['derivatives'] = ladder
+            updated += 1
+        else:
+            item.pop('derivatives', None)
+    with open(db_path, 'w', encoding='utf-8') as f:
+        json.dump(database, f, indent=2, ensure_ascii=False)
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate responsive image derivatives for the galleries')
+    parser.add_argument('directories', nargs='*', default=['photos', 'drawings'],
+                        help='Media directories (default: photos drawings); each updates <name>-database.json')
+    parser.add_argument('-w', '--widths', type=int, nargs='+', default=list(DEFAULT_WIDTHS),
+                        help='Widths below full size to generate (default: 320 640 1280)')
+    parser.add_argument('-f', '--formats', nargs='+', choices=list(_SAVE_FORMATS), default=list(DEFAULT_FORMATS),
+                        help='Output formats (default: webp jpg)')
+    parser.add_argument('-q', '--quality', type=int, default=DEFAULT_QUALITY,
+                        help=f'Encoder quality (default: {DEFAULT_QUALITY})')
+    parser.add_argument('-j', '--jobs', type=int, help='Worker processes (default: one per core, 1 = serial)')
+    parser.add_argument('--max-megapixels', type=float, default=DEFAULT_MAX_MEGAPIXELS,
+                        help=f'Source megapixels allowed in flight (default: {DEFAULT_MAX_MEGAPIXELS})')
+    parser.add_argument('--force', action='store_true', help='Regenerate every derivative')
+    args = parser.parse_args()
+
+    if not PILLOW_AVAILABLE:
+        print("Error: Pillow is required to generate derivatives")
+        return 1
+
+    status = 0
+    for media_dir in args.directories:
+        if not os.path.isdir(media_dir):
+            print(f"Error: {media_dir} does not exist")
+            status = 1
+            continue
+
+        generator = DerivativeGenerator(media_dir, args.widths, args.formats, args.quality)
+        results = generator.run(args.jobs, args.max_megapixels, args.force)
+        print(f"{media_dir}: {results['generated']} generated, {results['up_to_date']} up to date, "
+              f"{results['removed']} stale files removed, {results['errors']} errors")
+        if results['errors']:
+            status = 1
+
+        name = os.path.basename(os.path.normpath(media_dir))
+        db_path = os.path.join(os.path.dirname(os.path.abspath(media_dir)), f"{name}-database.json")
+        if os.path.exists(db_path):
+            updated = update_database(db_path, name, load_derivatives(media_dir))
+            print(f"Updated {updated} entries in {db_path}")
+
+    return status
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -8,73 +8,73 @@ import json
 from datetime import datetime
 from pathlib import Path
 
-def generate_drawings_database():
-    """Generate a database of drawings with metadata"""
+from gallery_shards import write_shards
+from generate_derivatives import load_derivatives
+from media_walker import walk_files
+
+def list_drawings(drawings_dir):
+    """filename -> stat for every WebP drawing in drawings_dir"""
+    return {entry.name: entry.stat() for entry in walk_files(drawings_dir) if entry.name.endswith('.webp')}
+
+def drawing_entry(drawings_dir, filename, st=None):
+    """Database entry for one drawing, without its position-dependent id"""
+    # Extract date from filename
+    date_str = filename.split('_')[0]  # e.g., "20240625" from "20240625_001.webp"
+    try:
+        date_obj = datetime.strptime(date_str, '%Y%m%d')
+        date_formatted = date_obj.strftime('%Y-%m-%d')
+        year = date_obj.strftime('%Y')
+    except:
+        date_formatted = "2024-01-01"
+        year = "2024"
     
-    drawings_dir = "/Users/jj/extantra-blog/drawings"
-    output_file = "/Users/jj/extantra-blog/drawings-database.json"
+    # Determine category based on date
+    if year in ['2021', '2022']:
+        category = "Archive"
+    elif year == '2023':
+        category = "Vintage"
+    elif year == '2024':
+        category = "Recent"
+    else:
+        category = "Latest"
     
-    # Get all WebP files
-    drawings = []
-    webp_files = [f for f in os.listdir(drawings_dir) if f.endswith('.webp')]
-    webp_files.sort()  # Already sorted by date due to naming
+    # Create title
+    sequence = filename.split('_')[1].split('.')[0]  # e.g., "001" from "20240625_001.webp"
+    title = f"Drawing {date_formatted} #{sequence}"
     
-    print(f"Found {len(webp_files)} drawings to process...")
+    # Get file size
+    try:
+        file_size = (st or os.stat(os.path.join(drawings_dir, filename))).st_size
+        size_mb = round(file_size / (1024 * 1024), 2)
+        file_size_str = f"{size_mb}MB"
+    except:
+        file_size_str = "Unknown"
     
-    for i, filename in enumerate(webp_files, 1):
-        filepath = os.path.join(drawings_dir, filename)
-        
-        # Extract date from filename
-        date_str = filename.split('_')[0]  # e.g., "20240625" from "20240625_001.webp"
-        try:
-            date_obj = datetime.strptime(date_str, '%Y%m%d')
-            date_formatted = date_obj.strftime('%Y-%m-%d')
-            year = date_obj.strftime('%Y')
-        except:
-            date_formatted = "2024-01-01"
-            year = "2024"
-        
-        # Determine category based on date
-        if year in ['2021', '2022']:
-            category = "Archive"
-        elif year == '2023':
-            category = "Vintage"
-        elif year == '2024':
-            category = "Recent"
-        else:
-            category = "Latest"
-        
-        # Create title
-        sequence = filename.split('_')[1].split('.')[0]  # e.g., "001" from "20240625_001.webp"
-        title = f"Drawing {date_formatted} #{sequence}"
-        
-        # Get file size
-        try:
-            file_size = os.path.getsize(filepath)
-            size_mb = round(file_size / (1024 * 1024), 2)
-            file_size_str = f"{size_mb}MB"
-        except:
-            file_size_str = "Unknown"
-        
-        drawing_data = {
-            "id": i,
-            "filename": filename,
-            "title": title,
-            "date": date_formatted,
-            "year": year,
-            "category": category,
-            "description": f"Digital artwork from {date_formatted}",
-            "medium": "Digital",
-            "format": "WebP",
-            "size": file_size_str,
-            "tags": ["digital art", "illustration", "drawing"]
-        }
-        
+    return {
+        "filename": filename,
+        "title": title,
+        "date": date_formatted,
+        "year": year,
+        "category": category,
+        "description": f"Digital artwork from {date_formatted}",
+        "medium": "Digital",
+        "format": "WebP",
+        "size": file_size_str,
+        "tags": ["digital art", "illustration", "drawing"]
+    }
+
+def assemble_drawings_database(entries, derivatives):
+    """Number the entries (in filename order) and attach current derivative ladders"""
+    drawings = []
+    for i, entry in enumerate(entries, 1):
+        drawing_data = {"id": i, **{key: value for key, value in entry.items()
+                                    if key not in ("id", "derivatives")}}
+        if drawing_data["filename"] in derivatives:
+            drawing_data["derivatives"] = derivatives[drawing_data["filename"]]
         drawings.append(drawing_data)
-        print(f"Processed: {filename} -> {title}")
     
     # Create database structure
-    database = {
+    return {
         "metadata": {
             "total_drawings": len(drawings),
             "generated_date": datetime.now().isoformat(),
@@ -83,15 +83,35 @@ def generate_drawings_database():
         },
         "drawings": drawings
     }
+
+def generate_drawings_database(drawings_dir="/Users/jj/extantra-blog/drawings",
+                               output_file="/Users/jj/extantra-blog/drawings-database.json"):
+    """Generate a database of drawings with metadata, plus its page shards next to output_file"""
+    
+    
+    # Get all WebP files
+    drawing_files = list_drawings(drawings_dir)
+    webp_files = sorted(drawing_files)  # Already sorted by date due to naming
+    
+    print(f"Found {len(webp_files)} drawings to process...")
+    
+    entries = []
+    for filename in webp_files:
+        entries.append(drawing_entry(drawings_dir, filename, drawing_files[filename]))
+        print(f"Processed: {filename} -> {entries[-1]['title']}")
+    
+    database = assemble_drawings_database(entries, load_derivatives(drawings_dir))
     
     # Save to JSON file
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(database, f, indent=2, ensure_ascii=False)
+    manifest = write_shards("drawings", database["drawings"], os.path.dirname(output_file))
     
     print(f"\n✅ Database generated successfully!")
     print(f"📁 File: {output_file}")
-    print(f"📊 Total drawings: {len(drawings)}")
+    print(f"📊 Total drawings: {len(database['drawings'])}")
     print(f"📅 Date range: {database['metadata']['date_range']}")
+    print(f"📄 Pages: {len(manifest['pages'])} of up to {manifest['page_size']} drawings")
     
     return database
 
@@ -2,71 +2,92 @@
 
 import os
 import json
+import argparse
 from datetime import datetime, timezone
 
-def generate_songs_database():
-    audio_dir = "audio"
-    output_file = "songs-database.json"
-    
-    if not os.path.exists(audio_dir):
-        print(f"Error: {audio_dir} directory not found")
-        return
-    
-    songs = []
-    song_id = 1
-    
-    # Get all audio files (excluding subdirectories like preferablysilentgoblin)
-    audio_files = []
-    for item in os.listdir(audio_dir):
-        item_path = os.path.join(audio_dir, item)
-        if os.path.isfile(item_path) and item.lower().endswith(('.mp3', '.wav', '.m4a', '.flac', '.ogg')):
-            audio_files.append(item)
+from audio_reader import format_duration, read_audio_info
+from media_walker import walk_files
+
+AUDIO_EXTENSIONS = {'.mp3', '.wav', '.m4a', '.flac', '.ogg'}
+
+def list_songs(audio_dir, recursive=False):
+    """Relative path -> stat for every audio file (subdirectories like
+    preferablysilentgoblin only with recursive=True)"""
+    songs = {}
+    for entry in walk_files(audio_dir, recursive=recursive, extensions=AUDIO_EXTENSIONS):
+        if entry.name.startswith('.'):  # Skip hidden files
+            continue
+        songs[os.path.relpath(entry.path, audio_dir).replace(os.sep, '/')] = entry.stat()
+    return songs
+
+def song_entry(audio_dir, filename, st=None):
+    """Database entry for one song, without its position-dependent id"""
+    # Use filename as title (including extension as requested)
+    display_title = filename
+    file_size = (st or os.stat(os.path.join(audio_dir, filename))).st_size
     
-    # Sort files alphabetically
-    audio_files.sort()
+    # Duration, bitrate and tags straight from the file headers
+    info = read_audio_info(os.path.join(audio_dir, filename))
+    if info is None:
+        print(f"Warning: Could not read audio metadata from {filename}")
+        info = {}
+    duration = round(info.get('duration', 0), 3)
     
-    for filename in audio_files:
-        if filename.startswith('.'):  # Skip hidden files
-            continue
-            
-        file_path = os.path.join(audio_dir, filename)
-        
-        # Use filename as title (including extension as requested)
-        display_title = filename
-        
-        # Create song entry
-        song_entry = {
-            "id": song_id,
-            "filename": filename,
-            "title": display_title,
-            "artist": "EXTANTRA",
-            "album": "",
-            "duration": 0,  # We'll set this to 0 since we can't get metadata easily
-            "duration_formatted": "0:00",
-            "file_size": os.path.getsize(file_path),
-            "added_date": datetime.now(timezone.utc).isoformat(),
-            "tags": [],
-            "plays": 0
-        }
-        
-        songs.append(song_entry)
-        song_id += 1
+    # Create song entry
+    entry = {
+        "filename": filename,
+        "title": display_title,
+        "artist": "EXTANTRA",  # Every track on the site is credited to EXTANTRA, whatever its tags say
+        "album": info.get('album', ""),
+        "duration": duration,
+        "duration_formatted": format_duration(duration),
+        "bitrate": info.get('bitrate', 0),
+        "sample_rate": info.get('sample_rate', 0),
+        "channels": info.get('channels', 0),
+        "file_size": file_size,
+        "added_date": datetime.now(timezone.utc).isoformat(),
+        "tags": [],
+        "plays": 0
+    }
+    for key in ('date', 'genre', 'track'):
+        if key in info:
+            entry[key] = info[key]
+    return entry
+
+def assemble_songs_database(entries):
+    """Number the entries (in filename order) and add the totals"""
+    songs = [{"id": song_id, **{key: value for key, value in entry.items() if key != "id"}}
+             for song_id, entry in enumerate(entries, 1)]
     
     # Create database structure
-    database = {
+    return {
         "generated": datetime.now(timezone.utc).isoformat(),
         "total_songs": len(songs),
-        "total_duration": 0,
+        "total_duration": round(sum(song['duration'] for song in songs), 3),
         "total_size": sum(song['file_size'] for song in songs),
         "songs": songs
     }
+
+def generate_songs_database(recursive=False, audio_dir="audio", output_file="songs-database.json"):
+    
+    if not os.path.exists(audio_dir):
+        print(f"Error: {audio_dir} directory not found")
+        return
+    
+    # Get all audio files, keeping the stat from the directory scan so nothing is stat'ed twice
+    audio_files = list_songs(audio_dir, recursive)
+    
+    # Sort files alphabetically
+    entries = [song_entry(audio_dir, filename, audio_files[filename]) for filename in sorted(audio_files)]
+    database = assemble_songs_database(entries)
     
     # Write to file
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(database, f, indent=2, ensure_ascii=False)
     
     print(f"✅ Generated {output_file}")
-    print(f"   📊 {len(songs)} songs processed")
+    print(f"   📊 {database['total_songs']} songs processed")
+    print(f"   ⏱️  Total duration: {format_duration(database['total_duration'])}")
     print(f"   💾 Total size: {format_file_size(database['total_size'])}")
 
 def format_file_size(size_bytes):
@@ -81,4 +102,8 @@ def format_file_size(size_bytes):
     return f"{size_bytes:.1f} TB"
 
 if __name__ == "__main__":
-    generate_songs_database()
+    parser = argparse.ArgumentParser(description='Generate songs database from the audio directory')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='Include audio in subdirectories (e.g. preferablysilentgoblin)')
+    args = parser.parse_args()
+    generate_songs_database(recursive=args.recursive)
@@ -5,24 +5,15 @@ Generate videos database with metadata
 
 import os
 import json
-import subprocess
+import argparse
+import time
 from datetime import datetime
 from pathlib import Path
 
-def get_video_metadata(file_path):
-    """Get detailed video metadata using ffprobe"""
-    try:
-        cmd = [
-            'ffprobe', '-v', 'quiet', '-print_format', 'json',
-            '-show_format', '-show_streams', file_path
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        if result.returncode == 0:
-            return json.loads(result.stdout)
-    except Exception as e:
-        print(f"Error getting metadata for {file_path}: {e}")
-    return None
+from media_walker import walk_files
+from hls_package import MASTER_NAME, package_dir_for
+from media_info import PROBE_TIMEOUT, probe_many, probe_media
+from metadata_cache import MetadataCache, MISS
 
 def extract_title_from_filename(filename, video_info, date_obj, index):
     """Generate simple numbered title with metadata"""
@@ -33,8 +24,8 @@ def extract_title_from_filename(filename, video_info, date_obj, index):
     
     return f"Video {index + 1:02d} - {duration_str} - {resolution} - {year}"
 
-def get_video_info(file_path, metadata):
-    """Extract video information from metadata"""
+def get_video_info(file_path, media):
+    """Extract video information from a MediaInfo (None if the probe failed)"""
     info = {
         'duration': 0,
         'width': 0,
@@ -50,40 +41,20 @@ def get_video_info(file_path, metadata):
         # File size
         info['file_size'] = os.path.getsize(file_path)
         
-        if not metadata:
+        if not media:
             return info
         
-        # Format information
-        format_info = metadata.get('format', {})
-        info['duration'] = float(format_info.get('duration', 0))
-        info['bitrate'] = int(format_info.get('bit_rate', 0))
-        
-        # Stream information
-        video_stream = None
-        audio_stream = None
+        info['duration'] = media.duration
+        info['bitrate'] = media.bitrate
         
-        for stream in metadata.get('streams', []):
-            if stream.get('codec_type') == 'video' and not video_stream:
-                video_stream = stream
-            elif stream.get('codec_type') == 'audio' and not audio_stream:
-                audio_stream = stream
+        if media.video:
+            info['width'] = media.width
+            info['height'] = media.height
+            info['video_codec'] = media.video.codec_name
+            info['fps'] = round(float(media.fps), 2)
         
-        if video_stream:
-            info['width'] = int(video_stream.get('width', 0))
-            info['height'] = int(video_stream.get('height', 0))
-            info['video_codec'] = video_stream.get('codec_name', 'unknown')
-            
-            # Calculate FPS
-            fps_str = video_stream.get('r_frame_rate', '0/1')
-            if '/' in fps_str:
-                try:
-                    num, den = fps_str.split('/')
-                    info['fps'] = round(float(num) / float(den), 2)
-                except:
-                    info['fps'] = 0
-        
-        if audio_stream:
-            info['audio_codec'] = audio_stream.get('codec_name', 'unknown')
+        if media.audio:
+            info['audio_codec'] = media.audio.codec_name
     
     except Exception as e:
         print(f"Error processing video info for {file_path}: {e}")
@@ -111,52 +82,69 @@ def format_file_size(bytes_size):
         bytes_size /= 1024
     return f"{bytes_size:.1f} TB"
 
-def main():
-    videos_dir = Path('/Users/jj/extantra-blog/videos')
+def list_videos(videos_dir):
+    """filename -> stat for every MP4 in videos_dir (after conversion)"""
+    return {entry.name: entry.stat() for entry in walk_files(str(videos_dir), extensions={'.mp4'})}
+
+def video_entry(videos_dir, filename, st=None, cache=None, media=MISS):
+    """Database entry for one video (probed now unless its MediaInfo or None is passed);
+    the title is set by assemble_videos_database"""
+    video_file = Path(videos_dir) / filename
     
-    # Find all MP4 files (after conversion)
-    video_files = list(videos_dir.glob('*.mp4'))
-    video_files.sort()  # Already sorted by date due to naming convention
+    # Get metadata
+    if media is MISS:
+        media = probe_media(str(video_file), cache)
+    video_info = get_video_info(str(video_file), media)
     
-    print(f"Found {len(video_files)} video files")
+    # Extract date from filename (YYYYMMDD_XXX.mp4)
+    filename_parts = video_file.stem.split('_')
+    if len(filename_parts) >= 2 and filename_parts[0].isdigit() and len(filename_parts[0]) == 8:
+        date_str = filename_parts[0]
+        date_obj = datetime.strptime(date_str, '%Y%m%d')
+    else:
+        date_obj = datetime.fromtimestamp((st or video_file.stat()).st_mtime)
     
-    videos_data = []
+    return {
+        'filename': video_file.name,
+        'date': date_obj.strftime('%Y-%m-%d'),
+        'duration': video_info['duration'],
+        'duration_formatted': format_duration(video_info['duration']),
+        'width': video_info['width'],
+        'height': video_info['height'],
+        'resolution': f"{video_info['width']}x{video_info['height']}",
+        'fps': video_info['fps'],
+        'bitrate': video_info['bitrate'],
+        'video_codec': video_info['video_codec'],
+        'audio_codec': video_info['audio_codec'],
+        'file_size': video_info['file_size'],
+        'file_size_formatted': format_file_size(video_info['file_size']),
+        'category': 'video',  # Could be expanded later
+        'tags': []  # Could be expanded later
+    }
+
+def assemble_videos_database(entries, videos_dir, hls_root=None):
+    """Title the entries by position (in filename order), link HLS packages and add the totals.
+
+    Videos packaged by hls_package.py (under videos_dir/hls unless hls_root
+    is given) get the path of their master playlist, relative to
+    videos_dir like 'filename', for adaptive streaming.
+    """
+    videos_dir = Path(videos_dir)
+    hls_root = Path(hls_root) if hls_root else videos_dir / 'hls'
     
-    for index, video_file in enumerate(video_files):
-        print(f"Processing: {video_file.name}")
-        
-        # Get metadata
-        metadata = get_video_metadata(str(video_file))
-        video_info = get_video_info(str(video_file), metadata)
-        
-        # Extract date from filename (YYYYMMDD_XXX.mp4)
-        filename_parts = video_file.stem.split('_')
-        if len(filename_parts) >= 2 and filename_parts[0].isdigit() and len(filename_parts[0]) == 8:
-            date_str = filename_parts[0]
-            date_obj = datetime.strptime(date_str, '%Y%m%d')
-        else:
-            date_obj = datetime.fromtimestamp(video_file.stat().st_mtime)
-        
-        # Create video entry
+    videos_data = []
+    for index, entry in enumerate(entries):
+        date_obj = datetime.strptime(entry['date'], '%Y-%m-%d')
         video_entry = {
-            'filename': video_file.name,
-            'title': extract_title_from_filename(video_file.name, video_info, date_obj, index),
-            'date': date_obj.strftime('%Y-%m-%d'),
-            'duration': video_info['duration'],
-            'duration_formatted': format_duration(video_info['duration']),
-            'width': video_info['width'],
-            'height': video_info['height'],
-            'resolution': f"{video_info['width']}x{video_info['height']}",
-            'fps': video_info['fps'],
-            'bitrate': video_info['bitrate'],
-            'video_codec': video_info['video_codec'],
-            'audio_codec': video_info['audio_codec'],
-            'file_size': video_info['file_size'],
-            'file_size_formatted': format_file_size(video_info['file_size']),
-            'category': 'video',  # Could be expanded later
-            'tags': []  # Could be expanded later
+            'filename': entry['filename'],
+            'title': extract_title_from_filename(entry['filename'], entry, date_obj, index),
+            **{key: value for key, value in entry.items() if key not in ('filename', 'title', 'hls')}
         }
         
+        master = Path(package_dir_for(entry['filename'], str(hls_root))) / MASTER_NAME
+        if master.exists():
+            video_entry['hls'] = os.path.relpath(master, videos_dir).replace(os.sep, '/')
+        
         videos_data.append(video_entry)
     
     # Create database
@@ -171,9 +159,53 @@ def main():
     # Add formatted totals
     database['total_duration_formatted'] = format_duration(database['total_duration'])
     database['total_size_formatted'] = format_file_size(database['total_size'])
+    return database
+
+def video_entries(videos_dir, files, cache=None, jobs=None, timeout=PROBE_TIMEOUT):
+    """Entries for (filename, stat) pairs, in the order given, probing them concurrently.
+
+    Unlike generate_videos_database, a video whose probe failed gets None
+    rather than an entry without stream details, so an incremental build
+    can keep its previous entry and try it again next time.
+    """
+    probes = probe_many([str(Path(videos_dir) / filename) for filename, _ in files], cache, jobs, timeout)
+    entries = []
+    for filename, st in files:
+        media = probes[str(Path(videos_dir) / filename)]
+        entries.append(video_entry(videos_dir, filename, st, media=media) if media is not None else None)
+    return entries
+
+def generate_videos_database(videos_dir, cache=None, db_path=None, hls_root=None,
+                             jobs=None, timeout=PROBE_TIMEOUT):
+    """Probe every MP4 in videos_dir and write the database (next to the directory by default).
+
+    Up to `jobs` ffprobe processes (default: one per core) run at once; a
+    probe still running after `timeout` seconds is killed and that video
+    gets an entry without stream details. Entries keep filename order.
+    """
+    videos_dir = Path(videos_dir)
+    
+    video_files = list_videos(videos_dir)
+    print(f"Found {len(video_files)} video files")
+    filenames = sorted(video_files)  # Already sorted by date due to naming convention
+    
+    started = time.perf_counter()
+    probes = probe_many([str(videos_dir / filename) for filename in filenames], cache, jobs, timeout)
+    probe_seconds = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    entries = []
+    for filename in filenames:
+        print(f"Processing: {filename}")
+        entries.append(video_entry(videos_dir, filename, video_files[filename],
+                                   media=probes[str(videos_dir / filename)]))
+    
+    database = assemble_videos_database(entries, videos_dir, hls_root)
+    assembly_seconds = time.perf_counter() - started
     
     # Save database
-    db_path = videos_dir.parent / 'videos-database.json'
+    if db_path is None:
+        db_path = videos_dir.parent / 'videos-database.json'
     with open(db_path, 'w') as f:
         json.dump(database, f, indent=2)
     
@@ -182,6 +214,25 @@ def main():
     print(f"📹 Total videos: {database['total_videos']}")
     print(f"⏱️  Total duration: {database['total_duration_formatted']}")
     print(f"💾 Total size: {database['total_size_formatted']}")
+    print(f"⚡ Probing: {probe_seconds:.2f}s ({jobs or os.cpu_count()} at a time), "
+          f"assembly: {assembly_seconds:.2f}s")
+    return database
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate videos database with metadata')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Ignore the persistent metadata cache and re-probe every video')
+    parser.add_argument('-j', '--jobs', type=int, help='ffprobe processes at once (default: one per core)')
+    parser.add_argument('--timeout', type=float, default=PROBE_TIMEOUT,
+                        help=f'Seconds before a hung ffprobe is killed (default: {PROBE_TIMEOUT})')
+    args = parser.parse_args()
+    
+    cache = None if args.no_cache else MetadataCache()
+    try:
+        generate_videos_database('/Users/jj/extantra-blog/videos', cache, jobs=args.jobs, timeout=args.timeout)
+    finally:
+        if cache is not None:
+            cache.close()
 
 if __name__ == '__main__':
     main()
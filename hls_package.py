@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+HLS Rendition Ladder Packager
+Encodes each MP4 into several resolutions at once (one decode, one ffmpeg run) as
+short-segment HLS variants with a master playlist, for adaptive streaming on video.html
+"""
+
+import argparse
+import os
+import shutil
+from typing import Dict, List, NamedTuple, Optional
+
+from ffmpeg_scheduler import DEFAULT_VIDEO_SLOTS, FFmpegScheduler
+from media_info import MediaInfo, probe_media
+from media_walker import walk_files
+
+MASTER_NAME = 'master.m3u8'
+VARIANT_NAME = 'index.m3u8'
+
+# Packages are built under this prefix and renamed into place when complete
+WORK_PREFIX = '.packaging-'
+
+# Short segments give fast startup and quick bitrate switches; every segment starts on a keyframe
+SEGMENT_SECONDS = 4
+
+
+class Rendition(NamedTuple):
+    name: str
+    height: int
+    video_bitrate: int      # kbps
+    audio_bitrate: int      # kbps
+
+
+# Highest first; a source gets every rung at or below its own height
+LADDER = (
+    Rendition('1080p', 1080, 5000, 128),
+    Rendition('720p', 720, 2800, 128),
+    Rendition('480p', 480, 1400, 96),
+    Rendition('360p', 360, 800, 64),
+)
+
+
+def ladder_for(source: MediaInfo) -> List[Rendition]:
+    """The rungs worth encoding for this source (never upscaled); empty without video"""
+    if source.video is None or source.height <= 0:
+        return []
+    rungs = [rendition for rendition in LADDER if rendition.height <= source.height]
+    if not rungs:
+        # Smaller than the lowest rung: one variant at the source's own (even) height
+        height = source.height - source.height % 2
+        rungs = [LADDER[-1]._replace(name=f"{height}p", height=height)]
+    return rungs
+
+
+def package_dir_for(video_path: str, hls_root: str) -> str:
+    """videos/20240125_001.mp4 -> <hls_root>/20240125_001"""
+    return os.path.join(hls_root, os.path.splitext(os.path.basename(video_path))[0])
+
+
+def needs_packaging(video_path: str, package_dir: str) -> bool:
+    """True unless a complete package newer than the video exists"""
+    master = os.path.join(package_dir, MASTER_NAME)
+    try:
+        return os.path.getmtime(master) < os.path.getmtime(video_path)
+    except OSError:
+        return True
+
+
+def hls_command(input_path: str, work_dir: str, renditions: List[Rendition],
+                has_audio: bool, preset: str = 'medium') -> List[str]:
+    """One ffmpeg run: decode once, scale to every rung, write all variants and the master.
+
+    Keyframes are forced on segment boundaries (and scene-cut keyframes
+    disabled), so every variant's segments line up and players can switch
+    between them at any segment.
+    """
+    count = len(renditions)
+    filters = [f"[0:v]split={count}" + ''.join(f"[v{index}]" for index in range(count))]
+    filters += [f"[v{index}]scale=-2:{rendition.height}[v{index}out]"
+                for index, rendition in enumerate(renditions)]
+
+    cmd = ['ffmpeg', '-i', input_path, '-filter_complex', ';'.join(filters)]
+    stream_map = []
+    for index, rendition in enumerate(renditions):
+        cmd += [
+            '-map', f"[v{index}out]",
+            f"-b:v:{index}", f"{rendition.video_bitrate}k",
+            f"-maxrate:v:{index}", f"{rendition.video_bitrate * 107 // 100}k",
+            f"-bufsize:v:{index}", f"{rendition.video_bitrate * 3 // 2}k",
+        ]
+        if has_audio:
+            cmd += ['-map', '0:a:0', f"-b:a:{index}", f"{rendition.audio_bitrate}k"]
+            stream_map.append(f"v:{index},a:{index},name:{rendition.name}")
+        else:
+            stream_map.append(f"v:{index},name:{rendition.name}")
+
+    cmd += [
+        '-c:v', 'libx264', '-preset', preset, '-pix_fmt', 'yuv420p',
+        '-force_key_frames', f"expr:gte(t,n_forced*{SEGMENT_SECONDS})", '-sc_threshold', '0',
+    ]
+    if has_audio:
+        cmd += ['-c:a', 'aac', '-ac', '2']
+    cmd += [
+        '-f', 'hls', '-hls_time', str(SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+        '-hls_flags', 'independent_segments',
+        '-hls_segment_filename', os.path.join(work_dir, '%v', 'segment_%05d.ts'),
+        '-master_pl_name', MASTER_NAME,
+        '-var_stream_map', ' '.join(stream_map),
+        '-y', os.path.join(work_dir, '%v', VARIANT_NAME),
+    ]
+    return cmd
+
+
+def install_package(work_dir: str, package_dir: str, renditions: List[Rendition]) -> Optional[str]:
+    """Check a finished package and swap it into place; None on success, else why not"""
+    if not os.path.exists(os.path.join(work_dir, MASTER_NAME)):
+        return "no master playlist was written"
+    for rendition in renditions:
+        variant = os.path.join(work_dir, rendition.name, VARIANT_NAME)
+        try:
+            with open(variant, encoding='utf-8') as f:
+                complete = '#EXT-X-ENDLIST' in f.read()
+        except OSError:
+            complete = False
+        if not complete:
+            return f"variant {rendition.name} is incomplete"
+
+    # Replace any older package with two renames, so the page never sees a half-written one
+    old_dir = None
+    if os.path.exists(package_dir):
+        old_dir = work_dir + '.old'
+        os.rename(package_dir, old_dir)
+    os.rename(work_dir, package_dir)
+    if old_dir:
+        shutil.rmtree(old_dir, ignore_errors=True)
+    return None
+
+
+def package_videos(video_paths: List[str], hls_root: str, slots: int = DEFAULT_VIDEO_SLOTS,
+                   preset: str = 'medium', force: bool = False,
+                   media: Dict[str, MediaInfo] = None) -> Dict:
+    """Package each video into <hls_root>/<stem>/, up to `slots` ffmpeg runs at once.
+
+    Videos whose package is newer than the video are skipped unless force.
+    media may supply already-probed MediaInfo records by path.
+    """
+    os.makedirs(hls_root, exist_ok=True)
+    results = {'packaged': 0, 'skipped': 0, 'errors': 0}
+    media = media or {}
+
+    def packaged(video_path, work_dir, package_dir, renditions):
+        def on_done(result, error):
+            if error is None:
+                error = install_package(work_dir, package_dir, renditions)
+            if error is None:
+                names = ', '.join(rendition.name for rendition in renditions)
+                print(f"Packaged: {os.path.basename(video_path)} -> {os.path.relpath(package_dir, hls_root)}/ ({names})")
+                results['packaged'] += 1
+            else:
+                print(f"Error packaging {os.path.basename(video_path)}: {error}")
+                results['errors'] += 1
+            shutil.rmtree(work_dir, ignore_errors=True)
+        return on_done
+
+    with FFmpegScheduler(slots) as scheduler:
+        for video_path in video_paths:
+            package_dir = package_dir_for(video_path, hls_root)
+            if not force and not needs_packaging(video_path, package_dir):
+                results['skipped'] += 1
+                continue
+            source = media.get(video_path) or probe_media(video_path)
+            renditions = ladder_for(source) if source else []
+            if not renditions:
+                print(f"Error packaging {os.path.basename(video_path)}: no video stream found")
+                results['errors'] += 1
+                continue
+
+            work_dir = os.path.join(hls_root, WORK_PREFIX + os.path.basename(package_dir))
+            shutil.rmtree(work_dir, ignore_errors=True)     # Left over from an interrupted run
+            for rendition in renditions:
+                os.makedirs(os.path.join(work_dir, rendition.name))
+            print(f"Packaging: {os.path.basename(video_path)}")
+            scheduler.submit(hls_command(video_path, work_dir, renditions, source.audio is not None, preset),
+                             packaged(video_path, work_dir, package_dir, renditions))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Package MP4 videos as adaptive HLS rendition ladders')
+    parser.add_argument('directory', help='Directory containing the MP4 videos')
+    parser.add_argument('-o', '--output', help='Directory for the packages (default: <directory>/hls)')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_VIDEO_SLOTS,
+                        help=f'Videos packaged at once (default: {DEFAULT_VIDEO_SLOTS})')
+    parser.add_argument('--preset', default='medium', help='x264 preset (default: medium)')
+    parser.add_argument('--force', action='store_true', help='Repackage videos even if their package is current')
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        print(f"Error: Directory {args.directory} does not exist")
+        return 1
+
+    hls_root = args.output or os.path.join(args.directory, 'hls')
+    videos = sorted(entry.path for entry in walk_files(args.directory, extensions={'.mp4'}))
+    print(f"Found {len(videos)} videos")
+    results = package_videos(videos, hls_root, args.jobs, args.preset, args.force)
+    print(f"\nPackaged: {results['packaged']}  Up to date: {results['skipped']}  Errors: {results['errors']}")
+    return 1 if results['errors'] else 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Process-Pool Image Conversion
+Spreads Pillow decode/encode work across CPU cores while capping the decoded
+megapixels in flight, so a batch of large panoramas cannot exhaust memory
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
+
+try:
+    from PIL import Image
+    PILLOW_AVAILABLE = True
+except ImportError:
+    PILLOW_AVAILABLE = False
+
+# Roughly 600 MB of decoded RGB pixels across all workers
+DEFAULT_MAX_MEGAPIXELS = 200
+
+# Called in the submitting process with None on success or the error message
+DoneCallback = Callable[[Optional[str]], None]
+
+# Called in the submitting process with (result, None), or (None, error) if the worker died
+TaskCallback = Callable[[object, Optional[str]], None]
+
+
+def convert_image_file(input_path: str, output_path: str, quality: int = 95) -> Optional[str]:
+    """Decode one image and re-encode it by output extension; returns None or the error.
+
+    Runs in a worker process, so it reports errors instead of printing them.
+    """
+    try:
+        with Image.open(input_path) as img:
+            # Convert RGBA to RGB for JPEG
+            if output_path.lower().endswith('.jpg') and img.mode in ('RGBA', 'LA'):
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                img = background
+
+            # Save with quality settings
+            save_kwargs = {}
+            if output_path.lower().endswith(('.jpg', '.jpeg')):
+                save_kwargs['quality'] = quality
+                save_kwargs['optimize'] = True
+            elif output_path.lower().endswith('.png'):
+                save_kwargs['optimize'] = True
+            elif output_path.lower().endswith('.webp'):
+                save_kwargs['quality'] = quality
+                save_kwargs['method'] = 6
+
+            img.save(output_path, **save_kwargs)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def image_megapixels(filepath: str) -> float:
+    """Decoded size from the image header alone (0 when it cannot be read)"""
+    try:
+        with Image.open(filepath) as img:
+            width, height = img.size
+        return width * height / 1_000_000
+    except Exception:
+        return 0.0
+
+
+class ImageConversionPool:
+    """Runs image tasks (convert_image_file by default) on a process pool under a megapixel budget.
+
+    submit() blocks until the image fits in the budget, finishing earlier
+    conversions meanwhile; an image larger than the whole budget still runs,
+    but alone. Completion callbacks always run in the submitting thread, so
+    callers can update shared results without locking. With jobs=1
+    conversions run inline, one at a time.
+    """
+
+    def __init__(self, jobs: Optional[int] = None, max_megapixels: float = DEFAULT_MAX_MEGAPIXELS):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_megapixels = max_megapixels
+        self.in_flight = 0.0
+        self.peak_megapixels = 0.0
+        self._pending: List[Tuple[object, float, TaskCallback]] = []
+        self._executor = ProcessPoolExecutor(self.jobs) if self.jobs > 1 else None
+
+    def submit(self, input_path: str, output_path: str, quality: int, on_done: DoneCallback):
+        """Convert one image; on_done gets None or the error message"""
+        self.submit_task(convert_image_file, (input_path, output_path, quality), image_megapixels(input_path),
+                         lambda result, error: on_done(error or result))
+
+    def submit_task(self, func: Callable, args: tuple, megapixels: float, on_done: TaskCallback):
+        """Run func(*args) in a worker once megapixels fit in the budget; func must be top-level"""
+        if self._executor is None:
+            self.peak_megapixels = max(self.peak_megapixels, megapixels)
+            try:
+                result = func(*args)
+            except Exception as e:
+                on_done(None, str(e))
+            else:
+                on_done(result, None)
+            return
+
+        # Wait for room in the budget, and keep at most two queued tasks per worker
+        while self._pending and (self.in_flight + megapixels > self.max_megapixels
+                                 or len(self._pending) >= 2 * self.jobs):
+            self._reap(block=True)
+
+        future = self._executor.submit(func, *args)
+        self._pending.append((future, megapixels, on_done))
+        self.in_flight += megapixels
+        self.peak_megapixels = max(self.peak_megapixels, self.in_flight)
+        self._reap(block=False)
+
+    def _reap(self, block: bool):
+        """Run callbacks for finished conversions (waiting for at least one if block)"""
+        if block:
+            wait([future for future, _, _ in self._pending], return_when=FIRST_COMPLETED)
+        still_pending = []
+        for future, megapixels, on_done in self._pending:
+            if not future.done():
+                still_pending.append((future, megapixels, on_done))
+                continue
+            self.in_flight -= megapixels
+            try:
+                result = future.result()
+            except Exception as e:      # Worker died (e.g. killed for memory) or raised
+                on_done(None, f"worker failed: {e!r}")
+            else:
+                on_done(result, None)
+        self._pending = still_pending
+
+    def wait(self):
+        """Finish every submitted conversion"""
+        while self._pending:
+            self._reap(block=True)
+
+    def close(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Single-Probe Media Info
+One ffprobe call per file, parsed once into typed records shared by the video
+converter, the segment encoder and the videos database
+"""
+
+import json
+import re
+import subprocess
+from datetime import datetime, timezone
+from fractions import Fraction
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from ffmpeg_scheduler import FFmpegScheduler
+from metadata_cache import MetadataCache, MISS
+
+PROBE_TIMEOUT = 30
+
+# Format tags that carry a recording date, in the order the converter has always tried them
+DATE_TAGS = ('creation_time', 'date', 'DATE', 'com.apple.quicktime.creationdate')
+
+_FRACTION = re.compile(r'(?<=:\d\d)\.\d+')
+_COMPACT_OFFSET = re.compile(r'([+-]\d\d)(\d\d)$')
+
+
+def probe_command(filepath: str) -> List[str]:
+    """ffprobe format and streams as JSON (the value cached under the 'ffprobe' kind)"""
+    return [
+        'ffprobe', '-v', 'quiet', '-print_format', 'json',
+        '-show_format', '-show_streams', filepath
+    ]
+
+
+def parse_frame_rate(value: Optional[str]) -> Fraction:
+    """'30000/1001' -> Fraction(30000, 1001); 0 for missing or '0/0'"""
+    try:
+        return Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return Fraction(0)
+
+
+def parse_media_date(value: str) -> Optional[datetime]:
+    """ISO-style container dates ('2024-01-25T14:30:52.000000Z', '2024-01-25T15:30:52+0100',
+    '2024-01-25 14:30:52', '2024-01-25'), returned naive in UTC; dates without an offset
+    are taken to be UTC already, as creation_time always is"""
+    value = _FRACTION.sub('', value.strip())   # fromisoformat before 3.11 wants 3 or 6 digits
+    if value.endswith('Z'):
+        value = value[:-1]
+    value = _COMPACT_OFFSET.sub(r'\1:\2', value)
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _int(value) -> int:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class StreamInfo(NamedTuple):
+    index: int
+    codec_type: str             # 'video', 'audio', 'subtitle', 'data'
+    codec_name: str
+    width: int = 0
+    height: int = 0
+    pix_fmt: str = ''
+    frame_rate: Fraction = Fraction(0)
+    bitrate: int = 0
+    sample_rate: int = 0
+    channels: int = 0
+
+    @classmethod
+    def from_ffprobe(cls, stream: Dict) -> 'StreamInfo':
+        return cls(
+            index=_int(stream.get('index')),
+            codec_type=stream.get('codec_type', 'unknown'),
+            codec_name=stream.get('codec_name', 'unknown'),
+            width=_int(stream.get('width')),
+            height=_int(stream.get('height')),
+            pix_fmt=stream.get('pix_fmt', ''),
+            frame_rate=parse_frame_rate(stream.get('r_frame_rate')),
+            bitrate=_int(stream.get('bit_rate')),
+            sample_rate=_int(stream.get('sample_rate')),
+            channels=_int(stream.get('channels')),
+        )
+
+
+class MediaInfo(NamedTuple):
+    """Everything the video tools read from ffprobe, for one file"""
+    path: str
+    format_name: str
+    duration: float
+    size: int
+    bitrate: int
+    created: Optional[datetime]
+    streams: Tuple[StreamInfo, ...]
+
+    @classmethod
+    def from_ffprobe(cls, path: str, data: Dict) -> 'MediaInfo':
+        format_info = data.get('format', {})
+        tags = format_info.get('tags', {})
+        created = None
+        for tag in DATE_TAGS:
+            if tag in tags:
+                created = parse_media_date(tags[tag])
+                if created:
+                    break
+        return cls(
+            path=path,
+            format_name=format_info.get('format_name', 'unknown'),
+            duration=_float(format_info.get('duration')),
+            size=_int(format_info.get('size')),
+            bitrate=_int(format_info.get('bit_rate')),
+            created=created,
+            streams=tuple(StreamInfo.from_ffprobe(stream) for stream in data.get('streams', [])),
+        )
+
+    def first(self, codec_type: str) -> Optional[StreamInfo]:
+        return next((stream for stream in self.streams if stream.codec_type == codec_type), None)
+
+    @property
+    def video(self) -> Optional[StreamInfo]:
+        return self.first('video')
+
+    @property
+    def audio(self) -> Optional[StreamInfo]:
+        return self.first('audio')
+
+    @property
+    def layout(self) -> List[str]:
+        """Stream types in order, e.g. ['video', 'audio']"""
+        return [stream.codec_type for stream in self.streams]
+
+    @property
+    def width(self) -> int:
+        return self.video.width if self.video else 0
+
+    @property
+    def height(self) -> int:
+        return self.video.height if self.video else 0
+
+    @property
+    def fps(self) -> Fraction:
+        return self.video.frame_rate if self.video else Fraction(0)
+
+    def summary(self) -> Dict:
+        """Plain-JSON view with the keys get_video_info has always returned"""
+        info = {
+            'duration': self.duration,
+            'size': self.size,
+            'bitrate': self.bitrate,
+            'format': self.format_name,
+        }
+        video, audio = self.video, self.audio
+        if video:
+            info.update({
+                'width': video.width,
+                'height': video.height,
+                'video_codec': video.codec_name,
+                'pix_fmt': video.pix_fmt,
+                'fps': round(float(video.frame_rate), 2),
+            })
+        if audio:
+            info.update({
+                'audio_codec': audio.codec_name,
+                'audio_bitrate': audio.bitrate,
+            })
+        return info
+
+
+def probe_media(filepath: str, cache: Optional[MetadataCache] = None) -> Optional[MediaInfo]:
+    """Probe one file (or reuse its cached ffprobe output); None if ffprobe fails"""
+    data = MISS
+    if cache is not None:
+        data = cache.get(filepath, 'ffprobe')
+    if data is MISS:
+        try:
+            result = subprocess.run(probe_command(filepath), capture_output=True, text=True,
+                                    timeout=PROBE_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"Error probing {filepath}: {e}")
+            return None
+        if result.returncode != 0:
+            return None
+        data = json.loads(result.stdout)
+        if cache is not None:
+            cache.put(filepath, 'ffprobe', data)
+    return MediaInfo.from_ffprobe(filepath, data) if data else None
+
+
+def probe_many(filepaths: Iterable[str], cache: Optional[MetadataCache] = None,
+               slots: Optional[int] = None, timeout: float = PROBE_TIMEOUT) -> Dict[str, Optional[MediaInfo]]:
+    """Probe files not already cached in up to `slots` concurrent ffprobe processes.
+
+    Every path gets an entry (None if its probe failed). A probe that hangs
+    is killed after `timeout` seconds; it only costs its own file and slot.
+    """
+    results: Dict[str, Optional[MediaInfo]] = {}
+
+    def probe_done(filepath):
+        def on_done(result, error):
+            if error is None:
+                try:
+                    data = json.loads(result.stdout)
+                except ValueError as e:
+                    error = f"unreadable output: {e}"
+            if error is not None:
+                print(f"Warning: Could not probe {filepath}: {error}")
+                results[filepath] = None
+                return
+            results[filepath] = MediaInfo.from_ffprobe(filepath, data)
+            if cache is not None:
+                cache.put(filepath, 'ffprobe', data)
+        return on_done
+
+    with FFmpegScheduler(slots) as scheduler:
+        for filepath in filepaths:
+            if cache is not None:
+                cached = cache.get(filepath, 'ffprobe')
+                if cached is not MISS:
+                    results[filepath] = MediaInfo.from_ffprobe(filepath, cached) if cached else None
+                    continue
+            scheduler.submit(probe_command(filepath), probe_done(filepath), capture_stdout=True, timeout=timeout)
+    return results
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Streaming Media Directory Walker
+os.scandir-based file listing shared by the renamers, converters and database generators
+"""
+
+import os
+from fnmatch import fnmatch
+from typing import Iterable, Iterator, Optional
+
+# Never descend into or yield these (matched against the entry name)
+DEFAULT_EXCLUDES = ('original_backup', '.DS_Store')
+
+
+def _matches(name: str, relpath: str, patterns: Iterable[str]) -> bool:
+    return any(fnmatch(name, pattern) or fnmatch(relpath, pattern) for pattern in patterns)
+
+
+def walk_files(directory: str, recursive: bool = False,
+               include: Optional[Iterable[str]] = None,
+               exclude: Iterable[str] = DEFAULT_EXCLUDES,
+               extensions: Optional[Iterable[str]] = None) -> Iterator[os.DirEntry]:
+    """Lazily yield a DirEntry for every regular file under directory.
+
+    Entries come straight from os.scandir, so is_file() usually needs no
+    syscall and entry.stat() is fetched at most once and then cached on the
+    entry; callers should use it instead of os.path.getmtime/getsize.
+
+    include/exclude are glob patterns matched against both the entry name and
+    its path relative to directory. Excluded directories are not descended
+    into. extensions is a set of lowercase suffixes including the dot.
+    Only one directory handle is open at a time, and nothing is buffered
+    beyond the list of directories still to visit.
+    """
+    include = list(include) if include else None
+    exclude = list(exclude) if exclude else []
+    extensions = {ext.lower() for ext in extensions} if extensions else None
+
+    pending = [(directory, '')]
+    while pending:
+        current, prefix = pending.pop()
+        subdirs = []
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    relpath = prefix + entry.name
+                    if exclude and _matches(entry.name, relpath, exclude):
+                        continue
+
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                subdirs.append((entry.path, relpath + '/'))
+                            continue
+                        if not entry.is_file():
+                            continue
+                    except OSError:
+                        continue
+
+                    if extensions is not None and os.path.splitext(entry.name)[1].lower() not in extensions:
+                        continue
+                    if include is not None and not _matches(entry.name, relpath, include):
+                        continue
+
+                    yield entry
+        except OSError as e:
+            print(f"Warning: Could not scan {current}: {e}")
+            continue
+
+        # Visit subdirectories in name order, depth first
+        pending.extend(sorted(subdirs, reverse=True))
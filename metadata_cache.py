@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Persistent Metadata Cache
+SQLite store for extracted dates, EXIF fields, audio tags and ffprobe output,
+keyed by (device, inode, size, mtime_ns) so unchanged files are never re-probed
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'extantra-blog', 'metadata.sqlite3'
+)
+DEFAULT_MAX_ENTRIES = 500_000
+
+# Returned by get() when nothing usable is cached; None is a valid cached value
+MISS = object()
+
+
+def encode_date(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def decode_date(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+class MetadataCache:
+    """Thread-safe cache of per-file probe results.
+
+    Entries are keyed on (st_dev, st_ino, kind) and only count as a hit while
+    the file's size and mtime_ns still match, so an edited or replaced file is
+    simply re-probed. The oldest-accessed entries are evicted once the table
+    grows past max_entries.
+    """
+
+    COMMIT_EVERY = 500
+
+    def __init__(self, path: str = None, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path or os.environ.get('EXTANTRA_METADATA_CACHE', DEFAULT_CACHE_PATH)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS entries (
+                dev INTEGER NOT NULL,
+                ino INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                value TEXT,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (dev, ino, kind)
+            )
+        ''')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)')
+        self._conn.commit()
+
+    def get(self, filepath: str, kind: str, st: os.stat_result = None) -> Any:
+        """Return the cached value for filepath, or MISS"""
+        try:
+            st = st or os.stat(filepath)
+        except OSError:
+            return MISS
+
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT size, mtime_ns, value FROM entries WHERE dev = ? AND ino = ? AND kind = ?',
+                (st.st_dev, st.st_ino, kind)
+            ).fetchone()
+            if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns:
+                self.misses += 1
+                return MISS
+            self.hits += 1
+            self._conn.execute(
+                'UPDATE entries SET accessed = ? WHERE dev = ? AND ino = ? AND kind = ?',
+                (time.time(), st.st_dev, st.st_ino, kind)
+            )
+            self._maybe_commit()
+        return json.loads(row[2])
+
+    def put(self, filepath: str, kind: str, value: Any, st: os.stat_result = None):
+        """Store a JSON-serialisable value for filepath"""
+        try:
+            st = st or os.stat(filepath)
+        except OSError:
+            return
+
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO entries (dev, ino, kind, size, mtime_ns, value, accessed) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (st.st_dev, st.st_ino, kind, st.st_size, st.st_mtime_ns, json.dumps(value), time.time())
+            )
+            self._maybe_commit()
+
+    def cached(self, filepath: str, kind: str, compute: Callable[[], Any],
+               st: os.stat_result = None) -> Any:
+        """Return the cached value for filepath, computing and storing it on a miss"""
+        try:
+            st = st or os.stat(filepath)
+        except OSError:
+            return compute()
+
+        value = self.get(filepath, kind, st)
+        if value is MISS:
+            value = compute()
+            self.put(filepath, kind, value, st)
+        return value
+
+    def _maybe_commit(self):
+        self._pending += 1
+        if self._pending >= self.COMMIT_EVERY:
+            self._evict()
+            self._conn.commit()
+            self._pending = 0
+
+    def _evict(self):
+        count = self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                'DELETE FROM entries WHERE rowid IN '
+                '(SELECT rowid FROM entries ORDER BY accessed LIMIT ?)',
+                (excess,)
+            )
+
+    def close(self):
+        """Flush pending writes and close the database"""
+        with self._lock:
+            self._evict()
+            self._conn.commit()
+            self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
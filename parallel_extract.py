@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Parallel Metadata Extraction
+Runs per-file date/category probes on a thread pool while keeping results in input order
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, TypeVar
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+
+def default_jobs() -> int:
+    """Default worker count for I/O-bound probes (stat calls, EXIF reads, ffprobe)"""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def extract_metadata(items: Iterable[T], probe: Callable[[T], R],
+                     jobs: Optional[int] = None) -> List[R]:
+    """Run probe over items and return results in the same order as items.
+
+    Results come back in input order regardless of which worker finishes
+    first, so a stable sort afterwards produces exactly the same ordering as
+    the old serial loop. jobs <= 1 runs serially on the calling thread.
+    """
+    items = list(items)
+    if jobs is None:
+        jobs = default_jobs()
+
+    if jobs <= 1 or len(items) <= 1:
+        return [probe(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(jobs, len(items))) as executor:
+        return list(executor.map(probe, items))
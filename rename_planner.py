@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Journaled Two-Phase Rename Planner
+Computes a complete rename mapping, orders it so no file is ever overwritten
+(breaking swaps and cycles with temporary names), journals it, then applies it
+"""
+
+import errno
+import json
+import os
+import shutil
+from collections import deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+JOURNAL_NAME = '.rename-journal.jsonl'
+TEMP_PREFIX = '.rename-tmp-'
+
+# Progress records are flushed after every rename and fsync'ed this often
+FSYNC_EVERY = 256
+
+# (src, dst, origin): origin is None for a step that only parks a file under a temporary name
+Step = Tuple[str, str, Optional[str]]
+
+
+class RenamePlanner:
+    """Collects src -> dst moves for one output directory and orders them safely.
+
+    Existing names in the output directory are indexed once up front, so
+    planning never stats individual targets. A destination that already
+    exists is only accepted when that file is itself moved away by the same
+    plan; otherwise the move is rejected as a collision, along with any move
+    that was counting on the rejected file to vacate its name. Names are
+    compared case-insensitively (see _fold), so IMG_0001.jpg collides with
+    an existing img_0001.jpg as it would on APFS or NTFS.
+    """
+
+    def __init__(self, output_dir: str):
+        self.output_dir = output_dir
+        self.journal_path = os.path.join(output_dir, JOURNAL_NAME)
+        self.moves: Dict[str, str] = {}
+        self._targets = set()
+        with os.scandir(output_dir) as it:
+            self._existing = {_fold(entry.path) for entry in it}
+
+    def add(self, src: str, dst: str) -> Optional[str]:
+        """Plan a move; returns None when accepted or the reason it was rejected"""
+        src, dst = os.path.normpath(src), os.path.normpath(dst)
+        if src == dst:
+            return None
+        if _fold(dst) in self._targets:
+            return 'target already planned'
+        self.moves[src] = dst
+        self._targets.add(_fold(dst))
+        return None
+
+    def resolve(self) -> Tuple[List[Step], List[Tuple[str, str]]]:
+        """Order the moves into (src, dst, origin) steps; also returns rejected moves.
+
+        A move runs only once its destination is free. When every remaining
+        move waits on another (A -> B, B -> A, or a longer cycle), one file is
+        parked under a temporary name to break the cycle. origin is the file's
+        original path on the step that gives it its final name, and None on
+        the step that parks it.
+        """
+        pending = dict(self.moves)
+        leaving = {_fold(src) for src in pending}
+        rejected = []
+
+        # Drop moves onto occupied names that nothing vacates; dropping one
+        # can strand another move that expected that source to leave
+        blocked = [src for src, dst in pending.items()
+                   if _fold(dst) in self._existing and _fold(dst) not in leaving]
+        while blocked:
+            src = blocked.pop()
+            dst = pending.pop(src, None)
+            if dst is None:
+                continue
+            leaving.discard(_fold(src))
+            rejected.append((src, dst))
+            blocked.extend(other for other, target in pending.items() if _fold(target) == _fold(src))
+
+        waiting_on: Dict[str, str] = {}     # folded source path -> move blocked until it leaves
+        for src, dst in pending.items():
+            if _fold(dst) in leaving:
+                waiting_on[_fold(dst)] = src
+
+        ready = deque(src for src, dst in pending.items() if _fold(dst) not in leaving)
+        steps = []
+        origins = {}
+        temp_index = 0
+        while pending:
+            if ready:
+                src = ready.popleft()
+                dst = pending.pop(src)
+                steps.append((src, dst, origins.pop(src, src)))
+            else:
+                # Everything left is in cycles: park one file to break one
+                src = next(iter(pending))
+                dst = pending.pop(src)
+                temp = os.path.join(os.path.dirname(dst), f"{TEMP_PREFIX}{temp_index}-{os.path.basename(src)}")
+                temp_index += 1
+                steps.append((src, temp, None))
+                pending[temp] = dst
+                origins[temp] = src
+                waiting_on[_fold(dst)] = temp   # dst is still occupied by the rest of the cycle
+
+            unblocked = waiting_on.pop(_fold(src), None)
+            if unblocked is not None:
+                ready.append(unblocked)
+
+        return steps, rejected
+
+    def write_journal(self, steps: List[Step]):
+        """Durably record the plan before anything is renamed"""
+        tmp = self.journal_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'type': 'plan', 'created': datetime.now().isoformat(),
+                                'output_dir': os.path.abspath(self.output_dir)}) + '\n')
+            for index, (src, dst, origin) in enumerate(steps):
+                f.write(json.dumps({'type': 'step', 'index': index, 'src': src,
+                                    'dst': dst, 'origin': origin}, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.journal_path)
+
+
+def _fold(path: str) -> str:
+    """Comparison key for a path: normalized and case-folded.
+
+    The default libraries live on case-insensitive APFS, where os.rename
+    onto a name differing only in case replaces that file. Folding is only
+    overly cautious on case-sensitive filesystems.
+    """
+    return os.path.normcase(os.path.normpath(path)).casefold()
+
+
+def step_originals(steps: List[Step]) -> List[str]:
+    """Each original file the steps move, once, in step order.
+
+    A file parked to break a cycle is listed on its parking step (the only
+    step whose source is still the original name), so it gets backed up
+    like every other file.
+    """
+    return [src for src, _, origin in steps if origin is None or src == origin]
+
+
+def _move(src: str, dst: str):
+    """Plain rename; falls back to a copying move across filesystems"""
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
+def load_journal(output_dir: str) -> Optional[Tuple[List[Step], int]]:
+    """Return (steps, number already completed) from an interrupted run, or None"""
+    journal_path = os.path.join(output_dir, JOURNAL_NAME)
+    if not os.path.exists(journal_path):
+        return None
+
+    steps = []
+    done = 0
+    with open(journal_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break  # Torn final line from a crash
+            if record['type'] == 'step':
+                steps.append((record['src'], record['dst'], record['origin']))
+            elif record['type'] == 'done':
+                done = record['index'] + 1
+    return steps, done
+
+
+def apply_journal(output_dir: str, steps: List[Step], start: int = 0,
+                  on_step: Callable[[str, str], None] = None) -> int:
+    """Apply journaled steps from index start, recording progress as it goes.
+
+    The step right after the last recorded one may already have happened
+    (crash between rename and progress write); a step whose source is gone
+    and whose destination exists is treated as done. Any other step whose
+    destination is taken by a different file raises FileExistsError rather
+    than replacing it. on_step(origin, dst) is called for every file that
+    reaches its final name, and the number of those is returned. The journal
+    is removed once every step has completed; on error it is kept so the run
+    can be resumed.
+    """
+    journal_path = os.path.join(output_dir, JOURNAL_NAME)
+    applied = 0
+    with open(journal_path, 'a', encoding='utf-8') as journal:
+        for index in range(start, len(steps)):
+            src, dst, origin = steps[index]
+            if not os.path.lexists(src) and os.path.lexists(dst) and index == start:
+                pass  # Completed just before the interruption
+            elif os.path.lexists(dst) and not os.path.samefile(src, dst):
+                # Appeared since planning; os.rename would silently replace it
+                raise FileExistsError(errno.EEXIST, 'Refusing to overwrite', dst)
+            else:
+                _move(src, dst)
+            if origin is not None:
+                applied += 1
+                if on_step:
+                    on_step(origin, dst)
+
+            journal.write(json.dumps({'type': 'done', 'index': index}) + '\n')
+            journal.flush()
+            if index % FSYNC_EVERY == 0:
+                os.fsync(journal.fileno())
+
+    os.remove(journal_path)
+    return applied
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Streaming JSONL Reports
+Appends one JSON line per processed file while a batch runs, ends with a summary
+trailer, and reads huge reports back one line at a time
+"""
+
+import argparse
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional
+
+
+class JsonlReportWriter:
+    """Append-only report sink.
+
+    Records are buffered and written in batches of flush_every, so a crash
+    loses at most one batch and memory stays flat however large the run is.
+    The first line is a header and close() appends a summary trailer; a report
+    without a trailer is from a run that did not finish, so a run that fails
+    closes with complete=False.
+    """
+
+    def __init__(self, path: str, flush_every: int = 500, **header):
+        self.path = path
+        self.flush_every = flush_every
+        self.count = 0
+        self._buffer = []
+        self._file = open(path, 'w', encoding='utf-8')
+        self._write_line({'type': 'header', 'timestamp': datetime.now().isoformat(), **header})
+        self._file.flush()
+
+    def _write_line(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    def write(self, record: Dict):
+        """Queue one per-file record"""
+        self._buffer.append(json.dumps({'type': 'file', **record}, ensure_ascii=False, default=str))
+        self.count += 1
+        if len(self._buffer) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write('\n'.join(self._buffer) + '\n')
+            self._buffer.clear()
+        self._file.flush()
+
+    def close(self, summary: Optional[Dict] = None, complete: bool = True):
+        """Flush remaining records and, if complete, write the summary trailer"""
+        if self._file.closed:
+            return
+        self.flush()
+        if complete:
+            self._write_line({'type': 'summary', 'timestamp': datetime.now().isoformat(),
+                              'records': self.count, **(summary or {})})
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        self.close(complete=exc_type is None)
+
+
+def iter_report(path: str, record_type: Optional[str] = 'file',
+                where: Optional[Callable[[Dict], bool]] = None) -> Iterator[Dict]:
+    """Yield records of one type (all types for None), optionally filtered, without loading the file"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from an interrupted run
+            if record_type is not None and record.get('type') != record_type:
+                continue
+            if where is None or where(record):
+                yield record
+
+
+def summarize_report(path: str, group_by: str = 'status') -> Dict:
+    """Aggregate a report in one streaming pass"""
+    counts = Counter()
+    total = 0
+    trailer = None
+    for record in iter_report(path, record_type=None):
+        if record.get('type') == 'file':
+            counts[record.get(group_by)] += 1
+            total += 1
+        elif record.get('type') == 'summary':
+            trailer = record
+
+    return {
+        'records': total,
+        'by_' + group_by: dict(counts),
+        'complete': trailer is not None,
+        'summary': trailer,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect a streaming JSONL batch report')
+    parser.add_argument('report', help='Report file written with --report *.jsonl')
+    parser.add_argument('--group-by', default='status', help='Field to aggregate on (default: status)')
+    parser.add_argument('--filter', nargs=2, metavar=('FIELD', 'VALUE'), action='append',
+                        help='Print matching records instead of a summary (repeatable)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.report):
+        print(f"Error: {args.report} does not exist")
+        return 1
+
+    if args.filter:
+        conditions = args.filter
+        for record in iter_report(args.report,
+                                  where=lambda r: all(str(r.get(k)) == v for k, v in conditions)):
+            print(json.dumps(record, ensure_ascii=False))
+    else:
+        print(json.dumps(summarize_report(args.report, args.group_by), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
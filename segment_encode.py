@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Segment-Parallel Video Encoding
+Splits a long source at keyframes, encodes the pieces in parallel with the same
+x264 settings and joins them losslessly into one faststart MP4
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from typing import List, Optional, Sequence
+
+from ffmpeg_scheduler import describe_failure, run_ffmpeg
+from media_info import MediaInfo, probe_command
+
+# Sources shorter than this gain little from splitting
+DEFAULT_MIN_DURATION = 300
+
+# Segments are never shorter than this, however many cores there are
+MIN_SEGMENT_SECONDS = 10
+
+# How far the joined output's duration may drift from the source's (AAC priming, rounding)
+DURATION_TOLERANCE = 0.5
+
+
+class SegmentEncodeError(Exception):
+    pass
+
+
+async def probe(filepath: str) -> MediaInfo:
+    """ffprobe the file without blocking the event loop"""
+    result = await run_ffmpeg(probe_command(filepath), capture_stdout=True)
+    if result.returncode != 0:
+        raise SegmentEncodeError(f"ffprobe {os.path.basename(filepath)} {describe_failure(result)}")
+    return MediaInfo.from_ffprobe(filepath, json.loads(result.stdout))
+
+
+def expected_layout(source: MediaInfo) -> List[str]:
+    """What a default ffmpeg MP4 conversion keeps: the first video and first audio stream"""
+    return [kind for kind in ('video', 'audio') if kind in source.layout]
+
+
+def verify_output(source: MediaInfo, output: MediaInfo) -> Optional[str]:
+    """None when the output matches the source's duration and stream layout, else why not"""
+    if abs(source.duration - output.duration) > DURATION_TOLERANCE:
+        return f"duration {output.duration:.2f}s does not match source {source.duration:.2f}s"
+    if output.layout != expected_layout(source):
+        return f"streams {output.layout} do not match expected {expected_layout(source)}"
+    return None
+
+
+async def _run(cmd: Sequence[str], what: str):
+    result = await run_ffmpeg(cmd)
+    if result.returncode != 0:
+        raise SegmentEncodeError(f"{what} {describe_failure(result)}")
+
+
+async def encode_segmented(input_path: str, output_path: str, video_args: Sequence[str],
+                           audio_args: Sequence[str], jobs: Optional[int] = None,
+                           source: Optional[MediaInfo] = None) -> int:
+    """Encode input_path to output_path in parallel segments; returns the segment count.
+
+    The source's first video stream is split without re-encoding, which cuts
+    only at keyframes, into about two segments per job so uneven segments
+    still balance out. Segments are encoded with video_args at most `jobs`
+    at a time while the audio is encoded once, whole, so there are no
+    priming gaps at the joins. The encoded segments are concatenated by
+    stream copy and muxed with the audio into a faststart MP4. The result
+    is checked against the source's duration and stream layout; on any
+    failure the output is deleted and SegmentEncodeError raised. Pass the
+    source's MediaInfo if the caller already has it, to skip probing it again.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if source is None:
+        source = await probe(input_path)
+    has_audio = source.audio is not None
+    segment_seconds = max(MIN_SEGMENT_SECONDS, source.duration / (2 * jobs))
+
+    # Scratch space next to the output, so the final mux does not cross filesystems
+    workdir = tempfile.mkdtemp(prefix='.segments-', dir=os.path.dirname(os.path.abspath(output_path)))
+    try:
+        audio_path = os.path.join(workdir, 'audio.m4a')
+        tasks = []
+        if has_audio:               # Overlaps the split and the segment encodes
+            tasks.append(asyncio.ensure_future(_run(
+                ['ffmpeg', '-i', input_path, '-map', '0:a:0', '-vn', *audio_args, audio_path],
+                'audio encode')))
+        try:
+            await _run(['ffmpeg', '-i', input_path, '-map', '0:v:0', '-c', 'copy',
+                        '-f', 'segment', '-segment_time', f"{segment_seconds:.3f}",
+                        '-segment_format', 'matroska', '-reset_timestamps', '1',
+                        os.path.join(workdir, 'source_%05d.mkv')], 'split')
+            sources = sorted(name for name in os.listdir(workdir) if name.startswith('source_'))
+            encoded = [os.path.join(workdir, f"encoded_{index:05d}.mp4") for index in range(len(sources))]
+            slots = asyncio.Semaphore(jobs)
+
+            async def encode(source_name: str, encoded_path: str):
+                async with slots:
+                    await _run(['ffmpeg', '-i', os.path.join(workdir, source_name), '-an',
+                                *video_args, encoded_path], f"segment {source_name}")
+
+            tasks += [asyncio.ensure_future(encode(name, path)) for name, path in zip(sources, encoded)]
+            await asyncio.gather(*tasks)
+        except BaseException:
+            # Stop the other encodes (killing their processes) before the scratch space goes
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        concat_list = os.path.join(workdir, 'segments.txt')
+        with open(concat_list, 'w', encoding='utf-8') as f:
+            for path in encoded:
+                f.write("file '{}'\n".format(path.replace("'", "'\\''")))
+
+        cmd = ['ffmpeg', '-f', 'concat', '-safe', '0', '-i', concat_list]
+        if has_audio:
+            cmd += ['-i', audio_path, '-map', '0:v', '-map', '1:a']
+        cmd += ['-c', 'copy', '-movflags', '+faststart', '-y', output_path]
+        await _run(cmd, 'concat')
+
+        mismatch = verify_output(source, await probe(output_path))
+        if mismatch:
+            raise SegmentEncodeError(f"verification failed: {mismatch}")
+        return len(encoded)
+    except BaseException:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+        raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
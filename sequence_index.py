@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Sequence Number Index
+Tracks the YYYYMMDD_NNN names already present in a directory so new files
+continue numbering after them instead of restarting at 001
+"""
+
+import os
+import re
+from typing import Dict
+
+# 20240125_001.jpg, photo_20240125_001.jpg and 20240125_143052_001.jpg all
+# carry a date and a per-date sequence number; camera names such as
+# IMG_20240125_043347.jpg (six-digit time, no sequence) must not match
+SEQUENCED_NAME = re.compile(r'^(?:[a-z]+_)?(\d{8})_(?:\d{6}_)?(\d{3,5})\.[A-Za-z0-9]+$')
+
+
+class SequenceIndex:
+    """Highest sequence number in use per date, built from names alone.
+
+    Building the index is a single scandir pass over entry names; no file is
+    stat'ed, opened or otherwise re-read, so the cost of an incremental run is
+    dominated by the new files rather than the size of the library.
+    """
+
+    def __init__(self, highest: Dict[str, int] = None):
+        self.highest = dict(highest or {})
+
+    @classmethod
+    def scan(cls, directory: str) -> 'SequenceIndex':
+        highest = {}
+        if os.path.isdir(directory):
+            with os.scandir(directory) as it:
+                for entry in it:
+                    m = SEQUENCED_NAME.match(entry.name)
+                    if m:
+                        date_str, seq = m.group(1), int(m.group(2))
+                        if seq > highest.get(date_str, 0):
+                            highest[date_str] = seq
+        return cls(highest)
+
+    def next(self, date_str: str) -> int:
+        """Allocate the next free sequence number for a date"""
+        seq = self.highest.get(date_str, 0) + 1
+        self.highest[date_str] = seq
+        return seq
+
+    def __len__(self) -> int:
+        return len(self.highest)
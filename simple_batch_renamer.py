@@ -5,7 +5,6 @@ Standard library only - renames files by date with chronological numbering
 """
 
 import os
-import shutil
 import argparse
 from datetime import datetime
 from pathlib import Path
@@ -13,6 +12,18 @@ import re
 import json
 from typing import Dict, List, Tuple, Optional
 
+from backup_store import BackupStore
+from dedupe import find_duplicates, duplicate_paths, report_duplicates
+from filename_dates import renamer_matcher
+from media_walker import walk_files
+from parallel_extract import extract_metadata
+from report_stream import JsonlReportWriter
+from rename_planner import RenamePlanner, JOURNAL_NAME, apply_journal, load_journal, step_originals
+from sequence_index import SequenceIndex
+
+# Files already named YYYYMMDD_NNN.ext by a previous run
+RENAMED_PATTERN = re.compile(r'\d{8}_\d{3}\.(jpg|jpeg|png|mp3|mp4|pdf|txt)$')
+
 class SimpleBatchRenamer:
     def __init__(self):
         self.supported_extensions = {
@@ -29,7 +40,7 @@ class SimpleBatchRenamer:
             'category_date_sequence': '{category}_{date}_{seq:03d}',
         }
 
-    def get_file_date(self, filepath: str) -> datetime:
+    def get_file_date(self, filepath: str, st: os.stat_result = None) -> datetime:
         """Extract date from filename patterns or file stats"""
         
         # Try filename patterns first
@@ -37,17 +48,22 @@ class SimpleBatchRenamer:
         if date:
             return date
         
+        # Reuse the stat result from the directory scan when we have one
+        if st is None:
+            try:
+                st = os.stat(filepath)
+            except OSError:
+                pass
+        
         # Fallback to file modification time
         try:
-            timestamp = os.path.getmtime(filepath)
-            return datetime.fromtimestamp(timestamp)
+            return datetime.fromtimestamp(st.st_mtime)
         except:
             pass
         
         # Fallback to file creation time
         try:
-            timestamp = os.path.getctime(filepath)
-            return datetime.fromtimestamp(timestamp)
+            return datetime.fromtimestamp(st.st_ctime)
         except:
             pass
         
@@ -56,57 +72,7 @@ class SimpleBatchRenamer:
 
     def _get_filename_date(self, filepath: str) -> Optional[datetime]:
         """Extract date from common filename patterns"""
-        filename = os.path.basename(filepath)
-        
-        patterns = [
-            # Already renamed format: 20240125_001.jpg
-            (r'(\d{8})_(\d{3})', lambda m: datetime.strptime(m.group(1), '%Y%m%d')),
-            
-            # PXL_20240125_043347823.MP.jpg
-            (r'PXL_(\d{8})_(\d{6})', lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}", '%Y%m%d%H%M%S')),
-            
-            # IMG_20240125_043347.jpg
-            (r'IMG_(\d{8})_(\d{6})', lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}", '%Y%m%d%H%M%S')),
-            
-            # Screenshot 2024-01-25 at 04.33.47.png
-            (r'Screenshot (\d{4})-(\d{2})-(\d{2}) at (\d{2})\.(\d{2})\.(\d{2})', 
-             lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}{m.group(3)}{m.group(4)}{m.group(5)}{m.group(6)}", '%Y%m%d%H%M%S')),
-            
-            # 20240125_043347.jpg
-            (r'(\d{8})_(\d{6})', lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}", '%Y%m%d%H%M%S')),
-            
-            # 2024-01-25_04-33-47.jpg
-            (r'(\d{4})-(\d{2})-(\d{2})_(\d{2})-(\d{2})-(\d{2})', 
-             lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}{m.group(3)}{m.group(4)}{m.group(5)}{m.group(6)}", '%Y%m%d%H%M%S')),
-            
-            # 20240125.jpg
-            (r'(\d{8})', lambda m: datetime.strptime(m.group(1), '%Y%m%d')),
-            
-            # 2024-01-25.jpg
-            (r'(\d{4})-(\d{2})-(\d{2})', lambda m: datetime.strptime(f"{m.group(1)}{m.group(2)}{m.group(3)}", '%Y%m%d')),
-            
-            # DSC00887.JPG (assume recent)
-            (r'^DSC\d+', lambda m: datetime(2024, 1, 1)),
-            
-            # HPIM1200.JPG (assume older)
-            (r'^HPIM\d+', lambda m: datetime(2020, 1, 1)),
-            
-            # IMG_0001.jpg
-            (r'^IMG_\d+', lambda m: datetime(2023, 6, 1)),
-            
-            # Pure numeric: 303.jpg
-            (r'^\d+$', lambda m: datetime(2022, 1, 1)),
-        ]
-        
-        for pattern, date_func in patterns:
-            match = re.search(pattern, filename)
-            if match:
-                try:
-                    return date_func(match)
-                except:
-                    continue
-        
-        return None
+        return renamer_matcher.match(os.path.basename(filepath))
 
     def detect_file_category(self, filepath: str) -> str:
         """Detect file category based on extension"""
@@ -128,6 +94,18 @@ class SimpleBatchRenamer:
         else:
             return 'file'
 
+    def probe_file(self, entry: os.DirEntry) -> Tuple[datetime, str, str]:
+        """Extract the (date, path, category) tuple used to order a scanned file"""
+        filepath = entry.path
+        # Only stat (once, cached on the entry) when the filename has no date
+        file_date = self._get_filename_date(filepath)
+        if file_date is None:
+            try:
+                file_date = self.get_file_date(filepath, entry.stat())
+            except OSError:
+                file_date = self.get_file_date(filepath)
+        return (file_date, filepath, self.detect_file_category(filepath))
+
     def generate_new_filename(self, file_date: datetime, sequence: int, 
                             pattern: str, original_path: str, 
                             category: str = None) -> str:
@@ -169,8 +147,17 @@ class SimpleBatchRenamer:
                          file_extensions: List[str] = None, 
                          dry_run: bool = False,
                          backup: bool = True,
-                         skip_existing: bool = True) -> Dict:
-        """Process all files in a directory"""
+                         skip_existing: bool = True,
+                         jobs: int = None,
+                         recursive: bool = False,
+                         incremental: bool = False,
+                         dedupe: str = None,
+                         report: JsonlReportWriter = None) -> Dict:
+        """Process all files in a directory.
+
+        With a report sink, one record per file is streamed to it as the file
+        is handled and results['details'] stays empty.
+        """
         
         if not os.path.exists(directory):
             raise ValueError(f"Directory {directory} does not exist")
@@ -181,41 +168,67 @@ class SimpleBatchRenamer:
         # Create output directory
         os.makedirs(output_dir, exist_ok=True)
         
+        # Finish an interrupted run from its journal instead of rescanning
+        journal = None if dry_run else load_journal(output_dir)
+        if journal:
+            steps, done = journal
+            print(f"Resuming interrupted rename: {done} of {len(steps)} steps already applied")
+            results = {'processed': 0, 'errors': 0, 'skipped': 0, 'details': []}
+            self._apply_journal(output_dir, steps, done, results, report)
+            return results
+        
         # Create backup directory if needed
-        backup_dir = None
+        backup_store = None
         if backup and not dry_run:
-            backup_dir = os.path.join(output_dir, 'original_backup')
-            os.makedirs(backup_dir, exist_ok=True)
+            backup_store = BackupStore(os.path.join(output_dir, 'original_backup'))
         
         # Collect files
         files_to_process = []
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
-            if os.path.isfile(filepath):
-                ext = Path(filepath).suffix.lower()
-                
-                # Skip if already in target format and skip_existing is True
-                if skip_existing and re.match(r'\d{8}_\d{3}\.(jpg|jpeg|png|mp3|mp4|pdf|txt)$', filename):
+        already_named = 0
+        for entry in walk_files(directory, recursive=recursive):
+            filename = entry.name
+            ext = os.path.splitext(filename)[1].lower()
+            
+            # Skip if already in target format and skip_existing is True
+            if skip_existing and RENAMED_PATTERN.match(filename):
+                already_named += 1
+                if not incremental:
                     print(f"Skipping already renamed file: {filename}")
+                continue
+            
+            # Filter by extensions if specified
+            if file_extensions:
+                if ext not in file_extensions:
                     continue
-                
-                # Filter by extensions if specified
-                if file_extensions:
-                    if ext not in file_extensions:
-                        continue
-                elif ext not in self.supported_extensions:
-                    continue
-                
-                files_to_process.append(filepath)
+            elif ext not in self.supported_extensions:
+                continue
+            
+            files_to_process.append(entry)
+        
+        if incremental and already_named:
+            print(f"Skipping {already_named} already renamed files")
+        
+        # Find byte-identical copies before paying for date extraction, backup and rename
+        duplicate_groups = []
+        duplicates_skipped = 0
+        if dedupe:
+            duplicate_groups = find_duplicates(
+                ((entry.path, entry.stat().st_size) for entry in files_to_process), jobs
+            )
+            report_duplicates(duplicate_groups)
+            if dedupe == 'skip':
+                duplicates = duplicate_paths(duplicate_groups)
+                files_to_process = [entry for entry in files_to_process if entry.path not in duplicates]
+                duplicates_skipped = len(duplicates)
+                if report is not None:
+                    for path, kept in duplicates.items():
+                        report.write({'original': path, 'status': 'duplicate', 'duplicate_of': kept})
         
         print(f"Found {len(files_to_process)} files to process...")
         
-        # Extract dates and sort
-        files_with_dates = []
-        for filepath in files_to_process:
-            file_date = self.get_file_date(filepath)
-            category = self.detect_file_category(filepath)
-            files_with_dates.append((file_date, filepath, category))
+        # Extract dates (in parallel) and sort
+        files_with_dates = extract_metadata(files_to_process, self.probe_file, jobs)
+        for file_date, filepath, category in files_with_dates:
             print(f"{os.path.basename(filepath)} -> {file_date.strftime('%Y-%m-%d %H:%M:%S')} ({category})")
         
         # Sort by date
@@ -225,23 +238,28 @@ class SimpleBatchRenamer:
         results = {
             'processed': 0,
             'errors': 0,
-            'skipped': 0,
-            'details': []
+            'skipped': duplicates_skipped,
+            'details': [],
+            'duplicates': duplicate_groups
         }
         
-        # Track sequences per date
-        date_sequences = {}
+        # Phase 1: compute the complete rename mapping without touching any file
+        planner = RenamePlanner(output_dir)
+        planned = []
+        
+        # Track sequences per date; incremental runs continue after the
+        # highest number already used in the output directory
+        if incremental:
+            sequences = SequenceIndex.scan(output_dir)
+            print(f"Indexed existing sequence numbers for {len(sequences)} dates")
+        else:
+            sequences = SequenceIndex()
         
         for file_date, original_path, category in files_with_dates:
             try:
                 # Get sequence number for this date
                 date_str = file_date.strftime('%Y%m%d')
-                if date_str not in date_sequences:
-                    date_sequences[date_str] = 1
-                else:
-                    date_sequences[date_str] += 1
-                
-                sequence = date_sequences[date_str]
+                sequence = sequences.next(date_str)
                 
                 # Generate new filename
                 new_filename = self.generate_new_filename(
@@ -250,51 +268,107 @@ class SimpleBatchRenamer:
                 
                 new_filepath = os.path.join(output_dir, new_filename)
                 
-                # Check if target already exists
-                if os.path.exists(new_filepath) and new_filepath != original_path:
-                    if dry_run:
-                        print(f"[DRY RUN] WARNING: Target exists: {new_filename}")
-                    else:
-                        print(f"Warning: Target exists, skipping: {new_filename}")
-                        results['skipped'] += 1
-                        continue
+                reason = planner.add(original_path, new_filepath)
+                if reason:
+                    print(f"Warning: {reason.capitalize()}, skipping: {new_filename}")
+                    results['skipped'] += 1
+                    if report is not None:
+                        report.write({'original': original_path, 'new': new_filepath,
+                                      'status': 'skipped', 'reason': reason})
+                    continue
                 
-                if dry_run:
-                    print(f"[DRY RUN] {os.path.basename(original_path)} -> {new_filename}")
-                    results['details'].append({
-                        'original': original_path,
-                        'new': new_filepath,
-                        'date': file_date.isoformat(),
-                        'category': category
-                    })
-                    results['processed'] += 1
-                else:
-                    # Backup original if requested
-                    if backup_dir and original_path != new_filepath:
-                        backup_path = os.path.join(backup_dir, os.path.basename(original_path))
-                        # Handle duplicate backup names
-                        counter = 1
-                        while os.path.exists(backup_path):
-                            name, ext = os.path.splitext(os.path.basename(original_path))
-                            backup_path = os.path.join(backup_dir, f"{name}_{counter}{ext}")
-                            counter += 1
-                        shutil.copy2(original_path, backup_path)
-                    
-                    # Rename file
-                    if original_path != new_filepath:
-                        shutil.move(original_path, new_filepath)
-                        print(f"Renamed: {os.path.basename(original_path)} -> {new_filename}")
-                    else:
-                        print(f"No change needed: {new_filename}")
-                    
-                    results['processed'] += 1
+                planned.append((file_date, original_path, category, new_filepath))
                 
             except Exception as e:
                 print(f"Error processing {original_path}: {e}")
                 results['errors'] += 1
+                if report is not None:
+                    report.write({'original': original_path, 'status': 'error', 'error': str(e)})
+        
+        steps, rejected = planner.resolve()
+        collisions = {os.path.normpath(src) for src, _ in rejected}
+        
+        if dry_run:
+            for file_date, original_path, category, new_filepath in planned:
+                new_filename = os.path.basename(new_filepath)
+                if os.path.normpath(original_path) in collisions:
+                    print(f"[DRY RUN] WARNING: Target exists: {new_filename}")
+                print(f"[DRY RUN] {os.path.basename(original_path)} -> {new_filename}")
+                detail = {
+                    'original': original_path,
+                    'new': new_filepath,
+                    'date': file_date.isoformat(),
+                    'category': category
+                }
+                if report is not None:
+                    report.write({**detail, 'status': 'planned'})
+                else:
+                    results['details'].append(detail)
+                results['processed'] += 1
+            return results
+        
+        # Phase 2: back up every original that is about to move; a file whose
+        # backup failed is left where it is (along with anything waiting on it)
+        if backup_store:
+            failed = False
+            for src in step_originals(steps):
+                try:
+                    backup_store.store(src)
+                except Exception as e:
+                    print(f"Error backing up {src}: {e}")
+                    planner.moves.pop(src, None)
+                    results['errors'] += 1
+                    failed = True
+                    if report is not None:
+                        report.write({'original': src, 'status': 'error', 'error': f"backup failed: {e}"})
+            if failed:
+                steps, rejected = planner.resolve()
+                collisions = {os.path.normpath(src) for src, _ in rejected}
+        
+        file_info = {}
+        for file_date, original_path, category, new_filepath in planned:
+            new_filename = os.path.basename(new_filepath)
+            if os.path.normpath(original_path) in collisions:
+                print(f"Warning: Target exists, skipping: {new_filename}")
+                results['skipped'] += 1
+                status = 'skipped'
+            elif os.path.normpath(original_path) == os.path.normpath(new_filepath):
+                print(f"No change needed: {new_filename}")
+                results['processed'] += 1
+                status = 'unchanged'
+            else:
+                file_info[os.path.normpath(original_path)] = (file_date, category)
+                continue
+            if report is not None:
+                report.write({'original': original_path, 'new': new_filepath, 'date': file_date.isoformat(),
+                              'category': category, 'status': status})
+        
+        # Phase 3: journal the ordered plan, then apply it with plain renames
+        if steps:
+            planner.write_journal(steps)
+            self._apply_journal(output_dir, steps, 0, results, report, file_info)
         
         return results
 
+    def _apply_journal(self, output_dir: str, steps: List, start: int, results: Dict,
+                       report: JsonlReportWriter = None, file_info: Dict = None):
+        """Apply journaled rename steps, counting each file that reaches its new name"""
+        def renamed(original_path, new_filepath):
+            print(f"Renamed: {os.path.basename(original_path)} -> {os.path.basename(new_filepath)}")
+            if report is not None:
+                record = {'original': original_path, 'new': new_filepath, 'status': 'renamed'}
+                if file_info and original_path in file_info:
+                    file_date, category = file_info[original_path]
+                    record.update(date=file_date.isoformat(), category=category)
+                report.write(record)
+        
+        try:
+            results['processed'] += apply_journal(output_dir, steps, start, on_step=renamed)
+        except OSError as e:
+            print(f"Error applying renames: {e}")
+            print(f"Journal kept at {os.path.join(output_dir, JOURNAL_NAME)}; re-run to resume")
+            results['errors'] += 1
+
     def generate_report(self, directory: str, results: Dict, output_file: str = None):
         """Generate a processing report"""
         report = {
@@ -330,7 +404,16 @@ def main():
                        help='Preview changes without applying them')
     parser.add_argument('--include-existing', action='store_true',
                        help='Include files that appear to be already renamed')
-    parser.add_argument('--report', help='Save detailed report to JSON file')
+    parser.add_argument('--report',
+                       help='Save detailed report to a JSON file, or stream it line by line to a .jsonl file')
+    parser.add_argument('--dedupe', choices=['report', 'skip'],
+                       help='Detect byte-identical files first; "skip" leaves duplicates untouched')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                       help='Number new files after the existing YYYYMMDD_NNN names in the output directory')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                       help='Also collect files from subdirectories (original_backup is always skipped)')
+    parser.add_argument('-j', '--jobs', type=int,
+                       help='Worker threads for date extraction (default: CPU count + 4, 1 = serial)')
     
     args = parser.parse_args()
     
@@ -342,6 +425,12 @@ def main():
     
     renamer = SimpleBatchRenamer()
     
+    # A .jsonl report is streamed while the batch runs instead of built in memory
+    report_sink = None
+    if args.report and args.report.endswith('.jsonl'):
+        report_sink = JsonlReportWriter(args.report, tool='simple_batch_renamer',
+                                        directory=args.directory, dry_run=args.dry_run)
+    
     try:
         results = renamer.process_directory(
             directory=args.directory,
@@ -350,7 +439,12 @@ def main():
             file_extensions=extensions,
             dry_run=args.dry_run,
             backup=not args.no_backup,
-            skip_existing=not args.include_existing
+            skip_existing=not args.include_existing,
+            jobs=args.jobs,
+            recursive=args.recursive,
+            incremental=args.incremental,
+            dedupe=args.dedupe,
+            report=report_sink
         )
         
         print(f"\n{'=' * 50}")
@@ -364,12 +458,18 @@ def main():
             print(f"\nTo apply these changes, run without --dry-run")
         
         # Generate report if requested
-        if args.report:
+        if report_sink is not None:
+            report_sink.close({key: results[key] for key in ('processed', 'errors', 'skipped')})
+            print(f"Report saved to: {args.report}")
+        elif args.report:
             renamer.generate_report(args.directory, results, args.report)
         
     except Exception as e:
         print(f"Error: {e}")
         return 1
+    finally:
+        if report_sink is not None:
+            report_sink.close(complete=False)   # No-op after a successful close(summary)
     
     return 0
 
@@ -0,0 +1,178 @@
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio_reader import read_audio_info
+
+# MPEG-1 Layer III, 44.1 kHz, stereo, no CRC: 1152 samples per frame
+MPEG1_L3 = {128: (b'\xff\xfb\x90\x00', 417), 160: (b'\xff\xfb\xa0\x00', 522)}
+SAMPLES_PER_FRAME = 1152
+SAMPLE_RATE = 44100
+
+# Side information of a stereo MPEG-1 frame; a Xing/Info header follows it
+SIDE_INFO = 32
+
+
+def mpeg_frame(kbps=128, payload=b''):
+    header, length = MPEG1_L3[kbps]
+    return (header + payload).ljust(length, b'\0')
+
+
+def syncsafe(value):
+    return bytes((value >> shift) & 0x7F for shift in (21, 14, 7, 0))
+
+
+def id3v23_frame(frame_id, text):
+    body = b'\x00' + text.encode('latin-1')
+    return frame_id + struct.pack('>I', len(body)) + b'\0\0' + body
+
+
+def atom(kind, payload):
+    return struct.pack('>I', 8 + len(payload)) + kind + payload
+
+
+class AudioFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def read(self, name, data):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return read_audio_info(path)
+
+
+class Mp3DurationTest(AudioFileTestCase):
+    def test_cbr_duration_comes_from_the_file_size(self):
+        info = self.read('cbr.mp3', mpeg_frame() * 40)
+        self.assertEqual(info['format'], 'mp3')
+        self.assertEqual(info['bitrate'], 128000)
+        self.assertEqual((info['sample_rate'], info['channels']), (SAMPLE_RATE, 2))
+        self.assertAlmostEqual(info['duration'], 40 * 417 * 8 / 128000)
+
+    def test_xing_frame_count_overrides_the_file_size(self):
+        frames, total_bytes = 1000, 300000
+        xing = b'\0' * SIDE_INFO + b'Xing' + struct.pack('>III', 3, frames, total_bytes)
+        info = self.read('vbr.mp3', mpeg_frame(payload=xing) + mpeg_frame(160) * 3 + mpeg_frame() * 3)
+
+        duration = frames * SAMPLES_PER_FRAME / SAMPLE_RATE
+        self.assertAlmostEqual(info['duration'], duration)
+        self.assertEqual(info['bitrate'], int(total_bytes * 8 / duration))
+
+    def test_lame_gapless_info_trims_encoder_delay_and_padding(self):
+        frames, delay, padding = 1000, 576, 1000
+        lame = b'LAME3.100' + b'\0' * 12 + ((delay << 12) | padding).to_bytes(3, 'big')
+        xing = b'\0' * SIDE_INFO + b'Info' + struct.pack('>II', 1, frames) + lame
+        info = self.read('gapless.mp3', mpeg_frame(payload=xing) + mpeg_frame() * 3)
+
+        self.assertAlmostEqual(info['duration'],
+                               (frames * SAMPLES_PER_FRAME - delay - padding) / SAMPLE_RATE)
+
+    def test_vbri_header(self):
+        frames, total_bytes = 2000, 500000
+        vbri = b'\0' * 32 + b'VBRI' + b'\0' * 6 + struct.pack('>II', total_bytes, frames)
+        info = self.read('vbri.mp3', mpeg_frame(payload=vbri) + mpeg_frame(160) + mpeg_frame())
+
+        duration = frames * SAMPLES_PER_FRAME / SAMPLE_RATE
+        self.assertAlmostEqual(info['duration'], duration)
+        self.assertEqual(info['bitrate'], int(total_bytes * 8 / duration))
+
+    def test_vbr_without_a_header_counts_every_frame(self):
+        data = (mpeg_frame(128) + mpeg_frame(160)) * 10
+        info = self.read('headerless.mp3', data)
+        self.assertAlmostEqual(info['duration'], 20 * SAMPLES_PER_FRAME / SAMPLE_RATE)
+        self.assertEqual(info['bitrate'], int(len(data) * 8 / info['duration']))
+
+    def test_id3v1_tag_is_not_counted_as_audio(self):
+        tail = b'TAG' + b'Old Title'.ljust(30, b'\0') + b'\0' * 94 + b'\xff'
+        info = self.read('v1.mp3', mpeg_frame() * 40 + tail)
+        self.assertAlmostEqual(info['duration'], 40 * 417 * 8 / 128000)
+        self.assertEqual(info['title'], 'Old Title')
+
+
+class Id3v2Test(AudioFileTestCase):
+    def test_unsynchronised_tag_with_extended_header(self):
+        extended = struct.pack('>I', 6) + b'\0\0' + struct.pack('>I', 0)
+        frames = (id3v23_frame(b'TIT2', 'Caf\xe9 \xff Night')
+                  + id3v23_frame(b'TPE1', 'EXTANTRA')
+                  + id3v23_frame(b'TYER', '2024') + id3v23_frame(b'TDAT', '2501')
+                  + id3v23_frame(b'TCON', '(17)'))
+        body = (extended + frames).replace(b'\xff', b'\xff\x00')
+        tag = b'ID3\x03\x00' + bytes([0x80 | 0x40]) + syncsafe(len(body)) + body
+
+        info = self.read('tagged.mp3', tag + mpeg_frame() * 40)
+        self.assertEqual(info['title'], 'Caf\xe9 \xff Night')
+        self.assertEqual(info['artist'], 'EXTANTRA')
+        self.assertEqual(info['date'], '2024-01-25')
+        self.assertEqual(info['genre'], 'Rock')
+        self.assertAlmostEqual(info['duration'], 40 * 417 * 8 / 128000)
+
+    def test_id3v24_syncsafe_frame_sizes(self):
+        body = b'\x03' + 'T\xeftle'.encode('utf-8')
+        frame = b'TIT2' + syncsafe(len(body)) + b'\0\0' + body
+        tag = b'ID3\x04\x00\x00' + syncsafe(len(frame) + 20) + frame + b'\0' * 20
+
+        info = self.read('v24.mp3', tag + mpeg_frame() * 10)
+        self.assertEqual(info['title'], 'T\xeftle')
+
+
+class M4aTest(AudioFileTestCase):
+    def build(self, mvhd):
+        ftyp = atom(b'ftyp', b'M4A \0\0\0\0M4A isom')
+        return ftyp + atom(b'moov', atom(b'mvhd', mvhd)) + atom(b'mdat', b'\0' * 16000)
+
+    def test_mvhd_version_1_has_64_bit_duration(self):
+        timescale, duration = 44100, 44100 * 90
+        mvhd = b'\x01\0\0\0' + struct.pack('>QQIQ', 0, 0, timescale, duration) + b'\0' * 80
+        info = self.read('long.m4a', self.build(mvhd))
+
+        self.assertEqual(info['format'], 'm4a')
+        self.assertAlmostEqual(info['duration'], 90.0)
+        self.assertEqual(info['bitrate'], int((16000 + 8) * 8 / 90))
+
+    def test_mvhd_version_0(self):
+        mvhd = b'\0\0\0\0' + struct.pack('>IIII', 0, 0, 1000, 2500) + b'\0' * 80
+        self.assertAlmostEqual(self.read('short.m4a', self.build(mvhd))['duration'], 2.5)
+
+
+class FlacTest(AudioFileTestCase):
+    def streaminfo(self, sample_rate, channels, total_samples):
+        packed = (sample_rate << 44) | ((channels - 1) << 41) | (15 << 36) | total_samples
+        return struct.pack('>HH', 4096, 4096) + b'\0' * 6 + packed.to_bytes(8, 'big') + b'\0' * 16
+
+    def build(self, sample_rate, channels, total_samples, audio=b'\0' * 1000):
+        block = self.streaminfo(sample_rate, channels, total_samples)
+        comment = (struct.pack('<I', 6) + b'vendor' + struct.pack('<I', 1)
+                   + struct.pack('<I', 11) + b'TITLE=Drift')
+        return (b'fLaC' + bytes([0]) + len(block).to_bytes(3, 'big') + block
+                + bytes([0x80 | 4]) + len(comment).to_bytes(3, 'big') + comment + audio)
+
+    def test_streaminfo(self):
+        info = self.read('track.flac', self.build(48000, 2, 48000 * 3))
+        self.assertEqual(info['format'], 'flac')
+        self.assertEqual((info['sample_rate'], info['channels']), (48000, 2))
+        self.assertAlmostEqual(info['duration'], 3.0)
+        self.assertEqual(info['bitrate'], int(1000 * 8 / 3))
+        self.assertEqual(info['title'], 'Drift')
+
+    def test_streaminfo_after_a_prepended_id3_tag(self):
+        tag = b'ID3\x03\x00\x00' + syncsafe(10) + b'\0' * 10
+        info = self.read('tagged.flac', tag + self.build(44100, 1, 44100 * 7))
+        self.assertEqual(info['channels'], 1)
+        self.assertAlmostEqual(info['duration'], 7.0)
+
+
+class UnknownFormatTest(AudioFileTestCase):
+    def test_unrecognised_data_returns_none(self):
+        self.assertIsNone(self.read('notes.txt', b'just some text' * 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
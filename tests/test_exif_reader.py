@@ -0,0 +1,137 @@
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from exif_reader import EXIF_IFD_POINTER, _bytes_reader, _parse_tiff, exif_date, read_exif
+
+
+def build_tiff(order, ifd0, exif=None, padding=0):
+    """TIFF bytes with IFD0 (and an Exif IFD) after padding bytes; entries are (tag, kind, value).
+
+    kind 2 values are str, kind 3 and 4 values are int. ASCII values longer
+    than four bytes are stored after the IFDs and referenced by offset.
+    """
+    def ifd_size(entries):
+        return 2 + 12 * len(entries) + 4
+
+    ifd0 = list(ifd0)
+    if exif is not None:
+        ifd0.append((EXIF_IFD_POINTER, 4, 0))   # Offset patched in below
+    ifd0_offset = 8 + padding
+    exif_offset = ifd0_offset + ifd_size(ifd0)
+    data_offset = exif_offset + (ifd_size(exif) if exif is not None else 0)
+
+    data = bytearray()
+
+    def pack_ifd(entries):
+        out = bytearray(struct.pack(order + 'H', len(entries)))
+        for tag, kind, value in entries:
+            if tag == EXIF_IFD_POINTER:
+                value = exif_offset
+            if kind == 2:
+                raw = value.encode('latin-1') + b'\0'
+                if len(raw) <= 4:
+                    field = raw.ljust(4, b'\0')
+                else:
+                    field = struct.pack(order + 'I', data_offset + len(data))
+                    data.extend(raw)
+                out += struct.pack(order + 'HHI', tag, kind, len(raw)) + field
+            elif kind == 3:
+                out += struct.pack(order + 'HHIH', tag, kind, 1, value) + b'\0\0'
+            else:
+                out += struct.pack(order + 'HHII', tag, kind, 1, value)
+        return out + struct.pack(order + 'I', 0)
+
+    body = pack_ifd(ifd0) + (pack_ifd(exif) if exif is not None else b'')
+    magic = b'II' if order == '<' else b'MM'
+    header = magic + struct.pack(order + 'HI', 42, ifd0_offset)
+    return bytes(header + b'\0' * padding + body + data)
+
+
+CAMERA_IFD0 = [(0x010F, 2, 'Canon'), (0x0110, 2, 'Canon EOS R5'), (0x0112, 3, 6),
+               (0x0132, 2, '2024:01:26 09:00:00')]
+CAMERA_EXIF = [(0x9003, 2, '2024:01:25 14:30:52')]
+
+
+class ParseTiffTest(unittest.TestCase):
+    def test_little_and_big_endian_give_the_same_tags(self):
+        for order in ('<', '>'):
+            with self.subTest(order=order):
+                tags = _parse_tiff(_bytes_reader(build_tiff(order, CAMERA_IFD0, CAMERA_EXIF)))
+                self.assertEqual(tags, {
+                    'Make': 'Canon',
+                    'Model': 'Canon EOS R5',
+                    'Orientation': 6,
+                    'DateTime': '2024:01:26 09:00:00',
+                    'DateTimeOriginal': '2024:01:25 14:30:52',
+                })
+
+    def test_short_ascii_value_is_read_inline(self):
+        tags = _parse_tiff(_bytes_reader(build_tiff('<', [(0x010F, 2, 'GoP')])))
+        self.assertEqual(tags, {'Make': 'GoP'})
+
+    def test_out_of_line_ascii_value_is_read_from_its_offset(self):
+        data = build_tiff('>', [(0x0132, 2, '2023:12:31 23:59:58')])
+        self.assertEqual(_parse_tiff(_bytes_reader(data)), {'DateTime': '2023:12:31 23:59:58'})
+
+    def test_exif_ifd_pointer_is_followed_for_the_capture_date(self):
+        tags = _parse_tiff(_bytes_reader(build_tiff('<', [], CAMERA_EXIF)))
+        self.assertEqual(tags, {'DateTimeOriginal': '2024:01:25 14:30:52'})
+        self.assertEqual(exif_date(tags), datetime(2024, 1, 25, 14, 30, 52))
+
+    def test_exif_pointer_loop_terminates(self):
+        data = bytearray(build_tiff('<', [(EXIF_IFD_POINTER, 4, 0)]))
+        struct.pack_into('<I', data, 8 + 2 + 8, 8)   # Point the Exif IFD back at IFD0
+        self.assertEqual(_parse_tiff(_bytes_reader(bytes(data))), {})
+
+    def test_bad_header_is_rejected(self):
+        with self.assertRaises(ValueError):
+            _parse_tiff(_bytes_reader(b'XX\x2a\x00\x08\x00\x00\x00'))
+        with self.assertRaises(ValueError):
+            _parse_tiff(_bytes_reader(b'II\x2b\x00\x08\x00\x00\x00'))
+
+
+class ReadExifTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _write(self, name, data):
+        path = os.path.join(self._tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_jpeg_app1_after_other_segments(self):
+        tiff = build_tiff('>', CAMERA_IFD0, CAMERA_EXIF)
+        app0 = b'\xff\xe0' + struct.pack('>H', 16) + b'JFIF\0' + b'\0' * 9
+        app1 = b'\xff\xe1' + struct.pack('>H', 2 + 6 + len(tiff)) + b'Exif\0\0' + tiff
+        path = self._write('photo.jpg', b'\xff\xd8' + app0 + app1 + b'\xff\xda\0\x02' + b'\0' * 64)
+
+        tags = read_exif(path)
+        self.assertEqual(tags['Model'], 'Canon EOS R5')
+        self.assertEqual(tags['DateTimeOriginal'], '2024:01:25 14:30:52')
+
+    def test_jpeg_without_exif_has_no_tags(self):
+        path = self._write('plain.jpg', b'\xff\xd8\xff\xda\0\x02' + b'\0' * 64)
+        self.assertEqual(read_exif(path), {})
+
+    def test_tiff_ifds_past_the_first_read(self):
+        path = self._write('scan.tif', build_tiff('<', CAMERA_IFD0, CAMERA_EXIF, padding=200 * 1024))
+        tags = read_exif(path)
+        self.assertEqual(tags['Make'], 'Canon')
+        self.assertEqual(tags['DateTimeOriginal'], '2024:01:25 14:30:52')
+
+    def test_unknown_format_returns_none(self):
+        self.assertIsNone(read_exif(self._write('notes.txt', b'hello world')))
+
+
+if __name__ == '__main__':
+    unittest.main()
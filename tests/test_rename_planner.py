@@ -0,0 +1,111 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backup_store import BackupStore, hash_file
+from rename_planner import RenamePlanner, apply_journal, step_originals
+
+
+class RenameCycleBackupTest(unittest.TestCase):
+    def test_every_original_in_a_cycle_is_backed_up(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            work = os.path.join(tmp, 'photos')
+            os.makedirs(work)
+            digests = {}
+            for name in ('A', 'B', 'C'):
+                path = os.path.join(work, name)
+                with open(path, 'w') as f:
+                    f.write(f"contents of {name}")
+                digests[name] = hash_file(path)
+
+            planner = RenamePlanner(work)
+            for src, dst in (('A', 'B'), ('B', 'C'), ('C', 'A')):
+                planner.add(os.path.join(work, src), os.path.join(work, dst))
+            steps, rejected = planner.resolve()
+            self.assertEqual(rejected, [])
+            self.assertTrue(any(origin is None for _, _, origin in steps))
+
+            store = BackupStore(os.path.join(tmp, 'backup'))
+            for src in step_originals(steps):
+                store.store(src)
+            apply_journal(work, steps)
+
+            for name, digest in digests.items():
+                record = store.find(name)
+                self.assertIsNotNone(record, f"{name} was not backed up")
+                self.assertEqual(record['sha256'], digest)
+            self.assertEqual(sorted(os.listdir(work)), ['A', 'B', 'C'])
+
+
+class RenameCollisionTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.work = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _touch(self, name, contents=''):
+        path = os.path.join(self.work, name)
+        with open(path, 'w') as f:
+            f.write(contents or name)
+        return path
+
+    def test_target_differing_only_in_case_from_an_existing_file_is_rejected(self):
+        existing = self._touch('img_0001.jpg')
+        src = self._touch('photo.jpg')
+        dst = os.path.join(self.work, 'IMG_0001.jpg')
+
+        planner = RenamePlanner(self.work)
+        planner.add(src, dst)
+        steps, rejected = planner.resolve()
+
+        self.assertEqual(steps, [])
+        self.assertEqual(rejected, [(src, dst)])
+        with open(existing) as f:
+            self.assertEqual(f.read(), 'img_0001.jpg')
+
+    def test_targets_differing_only_in_case_are_planned_once(self):
+        first = self._touch('a.jpg')
+        second = self._touch('b.jpg')
+
+        planner = RenamePlanner(self.work)
+        self.assertIsNone(planner.add(first, os.path.join(self.work, 'IMG_0001.jpg')))
+        self.assertEqual(planner.add(second, os.path.join(self.work, 'img_0001.JPG')),
+                         'target already planned')
+
+    def test_case_only_rename_of_the_same_file_is_allowed(self):
+        src = self._touch('img_0001.jpg')
+        dst = os.path.join(self.work, 'IMG_0001.jpg')
+
+        planner = RenamePlanner(self.work)
+        planner.add(src, dst)
+        steps, rejected = planner.resolve()
+        self.assertEqual(rejected, [])
+        planner.write_journal(steps)
+        apply_journal(self.work, steps)
+
+        self.assertEqual(os.listdir(self.work), ['IMG_0001.jpg'])
+
+    def test_apply_refuses_to_overwrite_a_file_created_after_planning(self):
+        src = self._touch('photo.jpg')
+        dst = os.path.join(self.work, '20240101_001.jpg')
+
+        planner = RenamePlanner(self.work)
+        planner.add(src, dst)
+        steps, _ = planner.resolve()
+        planner.write_journal(steps)
+        self._touch('20240101_001.jpg', 'arrived later')
+
+        with self.assertRaises(FileExistsError):
+            apply_journal(self.work, steps)
+        with open(dst) as f:
+            self.assertEqual(f.read(), 'arrived later')
+        self.assertTrue(os.path.exists(src))
+
+
+if __name__ == '__main__':
+    unittest.main()
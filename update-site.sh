@@ -21,7 +21,7 @@ fi
 echo "💾 Creating backup..."
 cp -r $SITE_DIR $SITE_DIR.backup.$(date +%Y%m%d_%H%M%S)
 
-# Update site files
+# Update site files (keeping the fingerprinted and precompressed copies made on the server)
 echo "📋 Updating site files..."
 rsync -av --delete \
           --exclude='.git' \
@@ -39,8 +39,21 @@ rsync -av --delete \
           --exclude='nginx-*' \
           --exclude='setup-*' \
           --exclude='update-*' \
+          --exclude='*.gz' \
+          --exclude='*.br' \
+          --exclude='.static-build.json' \
+          --exclude='.asset-fingerprints.json' \
+          --exclude='/*.[0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f][0-9a-f].*' \
           $CURRENT_DIR/ $SITE_DIR/
 
+# Point the pages at content-hashed copies of the CSS and databases
+echo "🔖 Fingerprinting assets..."
+python3 $CURRENT_DIR/fingerprint_assets.py $SITE_DIR
+
+# Minify JSON and precompress text assets (only changed files are recompressed)
+echo "🗜️  Precompressing static files..."
+python3 $CURRENT_DIR/build_static.py $SITE_DIR
+
 # Set proper permissions
 chown -R www-data:www-data $SITE_DIR
 find $SITE_DIR -type d -exec chmod 755 {} \;
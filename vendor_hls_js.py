@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+hls.js Vendoring
+Downloads the pinned hls.js release from the npm registry, checks it against the
+registry's integrity hash and writes dist/hls.min.js into the site root
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import os
+import tarfile
+import urllib.request
+
+HLS_VERSION = '1.5.17'
+REGISTRY_URL = 'https://registry.npmjs.org/hls.js/{version}'
+MEMBER = 'package/dist/hls.min.js'
+OUTPUT_NAME = 'hls.min.js'
+
+DEFAULT_SITE_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _fetch(url: str) -> bytes:
+    with urllib.request.urlopen(url, timeout=60) as response:
+        return response.read()
+
+
+def verify_integrity(data: bytes, integrity: str) -> bool:
+    """Check data against an npm/SRI integrity string ('sha512-<base64 digest>')"""
+    algorithm, _, expected = integrity.partition('-')
+    if algorithm not in ('sha256', 'sha384', 'sha512'):
+        return False
+    return base64.b64encode(hashlib.new(algorithm, data).digest()).decode('ascii') == expected
+
+
+def vendor_hls_js(site_root: str, version: str = HLS_VERSION) -> str:
+    """Write hls.min.js for version into site_root; returns its path.
+
+    Raises ValueError when the tarball does not match the registry's
+    integrity hash or lacks the minified build.
+    """
+    dist = json.loads(_fetch(REGISTRY_URL.format(version=version)))['dist']
+    tarball = _fetch(dist['tarball'])
+    if not verify_integrity(tarball, dist['integrity']):
+        raise ValueError(f"hls.js {version} tarball does not match its registry integrity hash")
+
+    with tarfile.open(fileobj=io.BytesIO(tarball), mode='r:gz') as archive:
+        try:
+            script = archive.extractfile(MEMBER).read()
+        except KeyError:
+            raise ValueError(f"hls.js {version} has no {MEMBER}")
+
+    path = os.path.join(site_root, OUTPUT_NAME)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(script)
+    os.replace(tmp, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Vendor the pinned hls.js build into the site root')
+    parser.add_argument('--site-root', default=DEFAULT_SITE_ROOT, help='Where to write hls.min.js')
+    parser.add_argument('--version', default=HLS_VERSION, help=f'hls.js version (default: {HLS_VERSION})')
+    args = parser.parse_args()
+
+    try:
+        path = vendor_hls_js(args.site_root, args.version)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Error: Could not vendor hls.js {args.version}: {e}")
+        return 1
+    print(f"Wrote {path} (hls.js {args.version}, integrity verified)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())